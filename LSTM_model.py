@@ -1,120 +1,236 @@
+import pickle
+
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense
 from utils.data_loader import DataLoader
+from utils.checkpoints import ResumableTraining, checkpoint_dir
+from utils.feature_cache import default_feature_cache
 from utils.financial_features import FinancialData
+from utils.sequence_dataset import WindowedSequence, window_ends
+from utils.storage import get_timestamp_column
+from utils.training import model_path, scalers_path, train_parallel, training_jobs
 
 
 class LSTMModel:
-    def __init__(self, symbol, interval='1d', epochs=50, batch_size=32):
+    # Indicator columns added to the raw bars; part of the feature cache key
+    SMA_WINDOWS = (5, 10, 20, 50, 100, 200)
+    RSI_WINDOW = 14
+    MACD_WINDOWS = (12, 26, 9)
+    # Bump when build_features or the scaling changes, so stale cache entries are not reused
+    FEATURE_VERSION = 1
+
+    def __init__(self, symbol, interval='1d', epochs=50, batch_size=32, lookback=60, train_fraction=0.8,
+                 feature_cache=default_feature_cache, validation_fraction=0.1, patience=5, checkpoints_dir=None,
+                 checkpoint_every=1):
         self.symbol = symbol
         self.interval = interval
-        self.epochs = epochs
+        self.epochs = epochs  # upper bound; training stops early once the validation loss plateaus
         self.batch_size = batch_size
+        self.lookback = lookback
+        self.train_fraction = train_fraction
+        self.feature_cache = feature_cache
+        self.validation_fraction = validation_fraction
+        self.patience = patience
+        self.checkpoints_dir = checkpoints_dir
+        self.checkpoint_every = checkpoint_every
+        self.training = None
         self.model = Sequential()
 
-    def prepare_data(self):
-        # Load the data
+    def reset_model(self):
+        """Discard the network (and its weights) so ``build_model`` starts from a fresh one."""
+        self.model = Sequential()
+
+    def feature_spec(self):
+        return {'version': self.FEATURE_VERSION, 'sma_windows': self.SMA_WINDOWS, 'rsi_window': self.RSI_WINDOW,
+                'macd_windows': self.MACD_WINDOWS, 'target': 'Close', 'scaler': 'minmax',
+                'train_fraction': self.train_fraction}
+
+    def build_features(self):
+        # Load only this symbol's partition for the requested interval
         loader = DataLoader()
-        interval_data_dict = loader.load_data()
-        data = interval_data_dict[self.interval].copy()
-        data = data[data['Symbol'] == self.symbol].copy()
+        data = loader.load(self.interval, symbols=[self.symbol])
+        timestamp_column = get_timestamp_column(data.columns)
+        if timestamp_column is not None:
+            data = data.set_index(timestamp_column)
 
         # Extract financial features
         financial_features = FinancialData(data.copy())
-        data.loc[:, 'SMA5'] = financial_features.moving_average(5)
-        data.loc[:, 'SMA10'] = financial_features.moving_average(10)
-        data.loc[:, 'SMA20'] = financial_features.moving_average(20)
-        data.loc[:, 'SMA50'] = financial_features.moving_average(50)
-        data.loc[:, 'SMA100'] = financial_features.moving_average(100)
-        data.loc[:, 'SMA200'] = financial_features.moving_average(200)
-        data.loc[:, 'RSI'] = financial_features.rsi()
-        data.loc[:, 'MACD'], data.loc[:, 'Signal'] = financial_features.macd()
-
-        # dataset = financial_features.get_data()
-
-        # Select features and target variable for training
-        features = data.drop(['Close', 'Symbol', 'date', 'Date'], axis=1)
-        target = data['Close']
-
-        # Remove rows with missing values
-        features = features.dropna()
+        for window in self.SMA_WINDOWS:
+            data.loc[:, f'SMA{window}'] = financial_features.moving_average(window)
+        data.loc[:, 'RSI'] = financial_features.rsi(self.RSI_WINDOW)
+        macd = financial_features.macd(*self.MACD_WINDOWS)
+        data.loc[:, 'MACD'], data.loc[:, 'Signal'] = macd['MACD'], macd['Signal']
+
+        # Remove rows with missing values, from features and target alike so they stay aligned
+        features = data.drop(['Close', 'Symbol', 'date', 'Date', 'Datetime'], axis=1, errors='ignore')
+        complete = features.notna().all(axis=1)
         # notify which rows were dropped
-        print(f'Dropped {len(data) - len(features)} rows due to missing values.')
-
-        # Scale the data
-        scaler = MinMaxScaler()
-        features_scaled = scaler.fit_transform(features)
-        target_scaled = scaler.fit_transform(target.values.reshape(-1, 1))
-
-        # Split the data into training and testing sets (e.g., 80% train, 20% test)
-        train_size = int(len(features) * 0.8)
-        X_train, X_test = features_scaled[:train_size], features_scaled[train_size:]
-        y_train, y_test = target_scaled[:train_size], target_scaled[train_size:]
-
-        # Reshape input to be 3D [samples, timesteps, features] for LSTM
-        X_train = X_train.reshape((X_train.shape[0], 1, X_train.shape[1]))
-        X_test = X_test.reshape((X_test.shape[0], 1, X_test.shape[1]))
+        print(f'Dropped {len(data) - complete.sum()} rows due to missing values.')
+        return features[complete], data.loc[complete, 'Close']
+
+    def feature_matrix(self):
+        """Unscaled ``(features, target, timestamps, columns)`` as arrays, from the feature cache when possible.
+
+        ``timestamps`` holds each row's bar time as UTC nanoseconds, or is None if the rows have no
+        timestamp. Unlike ``scale_features`` nothing is fit here, so callers that choose their own
+        training rows (e.g. walk-forward folds) can fit scalers on them without any leakage.
+        """
+        def build():
+            features, target = self.build_features()
+            arrays = {'features': features.to_numpy(dtype='float64'), 'target': target.to_numpy(dtype='float64')}
+            if not isinstance(features.index, pd.RangeIndex):
+                timestamps = pd.to_datetime(features.index, utc=True, errors='coerce')
+                if not timestamps.isna().any():
+                    arrays['timestamps'] = timestamps.asi8
+            return arrays, {'columns': list(features.columns)}, None
+
+        if self.feature_cache is None:
+            arrays, metadata, _ = build()
+        else:
+            # The split and scaling do not apply to the unscaled matrix, so they are left out of the key
+            spec = dict(self.feature_spec(), scaler=None, train_fraction=None)
+            key = self.feature_cache.key(DataLoader().source_signature(self.interval, [self.symbol]), spec)
+            # Entries for older versions of this symbol's data are replaced
+            group = self.feature_cache.key(self.interval, self.symbol, spec)
+            cached = self.feature_cache.get_or_build(key, build, group)
+            arrays, metadata = cached.arrays, cached.metadata
+        return arrays['features'], arrays['target'], arrays.get('timestamps'), metadata['columns']
+
+    def scale_features(self):
+        """Scaled feature matrix and target with their scalers, as ``(arrays, metadata, objects)``.
+
+        The scalers are fit on the training rows only; features and target get their own scaler
+        so predictions can be inverted to prices.
+        """
+        features, target = self.build_features()
+
+        # Split the rows into training and testing sets (e.g., 80% train, 20% test)
+        train_size = int(len(features) * self.train_fraction)
+
+        feature_scaler, target_scaler = MinMaxScaler(), MinMaxScaler()
+        feature_scaler.fit(features.iloc[:train_size])
+        target_scaler.fit(target.iloc[:train_size].to_frame())
+        arrays = {'features': feature_scaler.transform(features).astype('float32'),
+                  'target': target_scaler.transform(target.to_frame()).astype('float32')}
+        metadata = {'train_size': train_size, 'columns': list(features.columns)}
+        return arrays, metadata, {'feature_scaler': feature_scaler, 'target_scaler': target_scaler}
 
-        return X_train, y_train, X_test, y_test, scaler
+    def prepare_data(self):
+        """Scaled train/test look-back window datasets plus the feature and target scalers.
+
+        The scaled matrices come from the feature cache when the source data and feature spec are
+        unchanged, memory-mapped rather than loaded. Windows are cut lazily from them (see
+        ``WindowedSequence``); test windows may look back into training rows.
+        """
+        if self.feature_cache is None:
+            arrays, metadata, objects = self.scale_features()
+        else:
+            key = self.feature_cache.key(DataLoader().source_signature(self.interval, [self.symbol]),
+                                         self.feature_spec())
+            group = self.feature_cache.key(self.interval, self.symbol, self.feature_spec())
+            cached = self.feature_cache.get_or_build(key, self.scale_features, group)
+            arrays, metadata, objects = cached.arrays, cached.metadata, cached.objects
+        features, target, train_size = arrays['features'], arrays['target'], metadata['train_size']
+
+        train = WindowedSequence(features, target, self.lookback, self.batch_size, shuffle=True,
+                                 ends=window_ends(len(features), self.lookback, stop=train_size))
+        test = WindowedSequence(features, target, self.lookback, self.batch_size,
+                                ends=window_ends(len(features), self.lookback, start=train_size))
+        return train, test, objects['feature_scaler'], objects['target_scaler']
+
+    def split_validation(self, train):
+        """Hold the last ``validation_fraction`` of the training windows out to monitor early stopping."""
+        count = int(train.sample_count * self.validation_fraction)
+        if not count:
+            return train, None
+        fit = WindowedSequence(train.features, train.target, self.lookback, self.batch_size, ends=train.ends[:-count],
+                               shuffle=True)
+        validation = WindowedSequence(train.features, train.target, self.lookback, self.batch_size,
+                                      ends=train.ends[-count:])
+        return fit, validation
 
     def build_model(self, input_shape):
         self.model.add(LSTM(50, input_shape=input_shape))
         self.model.add(Dense(1))
         self.model.compile(optimizer='adam', loss='mean_squared_error')
 
-    def train_model(self, X_train, y_train):
-        self.model.fit(X_train, y_train, epochs=self.epochs, batch_size=self.batch_size, verbose=2)
-
-    def evaluate_model(self, X_test, y_test):
-        y_pred = self.model.predict(X_test)
-        mse = mean_squared_error(y_test, y_pred)
+    def train_model(self, train, epochs=None, validation=None, fold=None):
+        """Fit until the monitored loss stops improving, resuming from a checkpoint when there is one.
+
+        With ``checkpoints_dir`` set, the model and the training progress are saved every
+        ``checkpoint_every`` epochs and a later call for the same symbol and configuration (and
+        walk-forward ``fold``) continues from the last checkpoint instead of starting over.
+        """
+        epochs = epochs or self.epochs
+        directory = None
+        if self.checkpoints_dir is not None:
+            directory = checkpoint_dir(self.checkpoints_dir, self.symbol, self.interval, fold)
+        self.training = ResumableTraining(directory, monitor='val_loss' if validation is not None else 'loss',
+                                          patience=self.patience, every=self.checkpoint_every,
+                                          config={'feature_spec': self.feature_spec(), 'lookback': self.lookback,
+                                                  'batch_size': self.batch_size, 'epochs': epochs,
+                                                  'validation_fraction': self.validation_fraction})
+        restored = self.training.restore()
+        if restored is not None:
+            self.model = restored
+            print(f"Resuming {self.symbol} {self.interval} from epoch {self.training.state['epoch']}.")
+        if not self.training.state['finished']:
+            self.model.fit(train, validation_data=validation, epochs=epochs, initial_epoch=self.training.state['epoch'],
+                           callbacks=[self.training], verbose=2)
+        # The loss history of every epoch, including those run before a resume
+        return self.training.state['history']
+
+    def evaluate_model(self, test):
+        y_pred = self.model.predict(test)
+        mse = mean_squared_error(test.targets, y_pred)
         print(f'Mean Squared Error: {mse}')
+        return mse
 
     def run(self):
-        X_train, y_train, X_test, y_test, scaler = self.prepare_data()
-        self.build_model(input_shape=(X_train.shape[1], X_train.shape[2]))
-        self.train_model(X_train, y_train)
-        self.evaluate_model(X_test, y_test)
-
-
-def main(interval, symbols):
-    # Load all datasets
+        train, test, self.feature_scaler, self.target_scaler = self.prepare_data()
+        train, validation = self.split_validation(train)
+        self.build_model(input_shape=(self.lookback, train.features.shape[1]))
+        history = self.train_model(train, validation=validation)
+        mse = self.evaluate_model(test)
+        return dict({'mse': float(mse), 'final_loss': history['loss'][-1],
+                     'final_val_loss': history['val_loss'][-1] if 'val_loss' in history else None,
+                     'train_samples': train.sample_count, 'test_samples': test.sample_count,
+                     'validation_samples': validation.sample_count if validation is not None else 0},
+                    **self.training.summary(self.epochs))
+
+    def save(self, models_dir='models'):
+        """Save the network and, next to it, what inference needs to use it: scalers and look-back."""
+        path = model_path(models_dir, self.symbol, self.interval)
+        self.model.save(path)
+        with open(scalers_path(models_dir, self.symbol, self.interval), 'wb') as file:
+            pickle.dump({'feature_scaler': self.feature_scaler, 'target_scaler': self.target_scaler,
+                         'lookback': self.lookback, 'feature_spec': self.feature_spec()}, file)
+        return path
+
+
+def main(interval, symbols, max_workers=None, threads_per_worker=None, manifest_path=None, resume=None):
+    # List the available partitions without loading any price data
     loader = DataLoader()
-    interval_data_dict = loader.load_data()
-
-    # Ensure the models directory exists
-    models_dir = 'models'
-    os.makedirs(models_dir, exist_ok=True)
-
-    # If a specific interval is specified, filter the dictionary to only include that interval
-    if interval != 'all':
-        interval_data_dict = {interval: interval_data_dict.get(interval)}
-
-    # Iterate through each interval and symbol, train a model, and save the model
-    for interval, data in interval_data_dict.items():
-        if symbols != ['all']:
-            data = data[data['Symbol'].isin(symbols)]
-        unique_symbols = data['Symbol'].unique()
-        for symbol in unique_symbols:
-            print(f'Training model for {symbol} at interval {interval}...')
-            lstm_model = LSTMModel(symbol=symbol, interval=interval)
-            lstm_model.run()
 
-            # Save the model to a file
-            model_filename = f'{models_dir}/{symbol}_{interval}_model.h5'
-            lstm_model.model.save(model_filename)
-            print(f'Model for {symbol} at interval {interval} saved to {model_filename}')
+    # One job per (interval, symbol); each is trained and saved in its own worker process
+    jobs = training_jobs(loader, interval, symbols)
+    return train_parallel(jobs, models_dir='models', max_workers=max_workers, threads_per_worker=threads_per_worker,
+                          manifest_path=manifest_path, resume=resume)
 
 
 if __name__ == '__main__':
-    import os
     import argparse
 
     parser = argparse.ArgumentParser(description='Train LSTM models on financial data.')
     parser.add_argument('--interval', type=str, default='1d', help='Data interval (default: 1d). Use "all" to process all intervals.')
     parser.add_argument('--symbols', nargs='+', default=['AAPL'], help='List of symbols (default: all).') #todo: change default to all
+    parser.add_argument('--workers', type=int, default=None, help='Training processes (default: one per CPU, at most one per job).')
+    parser.add_argument('--threads-per-worker', type=int, default=None, help='Intra-op threads per process (default: CPUs / workers).')
+    parser.add_argument('--manifest', type=str, default=None, help='Run manifest path (default: models/manifests/run-<time>.json).')
+    parser.add_argument('--resume', type=str, default=None, help='Manifest of an interrupted run to resume; its trained models are skipped.')
     args = parser.parse_args()
-    main(interval=args.interval, symbols=args.symbols)
+    main(interval=args.interval, symbols=args.symbols, max_workers=args.workers,
+         threads_per_worker=args.threads_per_worker, manifest_path=args.manifest, resume=args.resume)
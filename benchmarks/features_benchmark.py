@@ -0,0 +1,75 @@
+"""Compare indicator throughput of one grouped FinancialData pass against a loop over symbols.
+
+Run from the repository root:
+
+    python -m benchmarks.features_benchmark --symbols 200 --bars 2000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.downloader import FakePriceProvider
+from utils.financial_features import FinancialData
+
+
+def make_universe(symbol_count, bars):
+    provider = FakePriceProvider(bars=bars)
+    frames = []
+    for i in range(symbol_count):
+        symbol = f'SYM{i:04d}'
+        frames.append(provider.make_bars(symbol).reset_index().assign(Symbol=symbol))
+    return pd.concat(frames, ignore_index=True)
+
+
+def compute_indicators(financial_data, window=14):
+    macd = financial_data.macd()
+    bands = financial_data.bollinger_bands(window)
+    return pd.DataFrame({
+        'Price Change': financial_data.price_change(),
+        'Price Percentage Change': financial_data.price_percentage_change(),
+        f'SMA{window}': financial_data.moving_average(window),
+        'VWAP': financial_data.vwap(),
+        'OBV': financial_data.on_balance_volume(),
+        'Volatility': financial_data.volatility(window),
+        'ROI': financial_data.roi(),
+        'RSI': financial_data.rsi(window),
+        'MACD': macd['MACD'],
+        'Signal': macd['Signal'],
+        'Bollinger Upper Band': bands['Bollinger Upper Band'],
+        'Bollinger Lower Band': bands['Bollinger Lower Band'],
+        'ATR': financial_data.calculate_atr(window),
+    })
+
+
+def main(symbol_count, bars, repeat):
+    universe = make_universe(symbol_count, bars)
+
+    grouped_times, loop_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        grouped = compute_indicators(FinancialData(universe.copy()))
+        grouped_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        looped = pd.concat([compute_indicators(FinancialData(frame.copy()))
+                            for _, frame in universe.groupby('Symbol', sort=False)])
+        loop_times.append(time.perf_counter() - start)
+
+    max_difference = np.nanmax(np.abs(grouped.to_numpy() - looped.loc[grouped.index].to_numpy()))
+    grouped_best, loop_best = min(grouped_times), min(loop_times)
+    print(f'{symbol_count} symbols x {bars} bars ({len(universe):,} rows)')
+    print(f'{"engine":<16}{"best (s)":>12}{"symbols/s":>12}')
+    print(f'{"grouped pass":<16}{grouped_best:>12.4f}{symbol_count / grouped_best:>12.1f}')
+    print(f'{"per-symbol loop":<16}{loop_best:>12.4f}{symbol_count / loop_best:>12.1f}')
+    print(f'Speed-up: {loop_best / grouped_best:.1f}x, max abs difference: {max_difference:.3g}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=200, help='Number of synthetic symbols.')
+    parser.add_argument('--bars', type=int, default=2000, help='Bars per symbol.')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions per engine.')
+    args = parser.parse_args()
+    main(args.symbols, args.bars, args.repeat)
@@ -0,0 +1,125 @@
+"""Compare peak memory of FinancialData.get_data against the previous copy-per-indicator path.
+
+Each path runs in a fresh interpreter so peak RSS is not shared between them. Run from the
+repository root:
+
+    python -m benchmarks.features_memory_benchmark --rows 2000000
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from utils.downloader import FakePriceProvider
+from utils.financial_features import FinancialData
+
+
+class LegacyFinancialData:
+    """The indicator path as it was before get_features wrote into a preallocated array."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def macd(self, short_window=12, long_window=26, signal_window=9):
+        df = self.data.copy()
+        df['MACD'] = df['Close'].ewm(span=short_window, adjust=False).mean() - df['Close'].ewm(
+            span=long_window, adjust=False).mean()
+        df['Signal'] = df['MACD'].ewm(span=signal_window, adjust=False).mean()
+        return df[['MACD', 'Signal']]
+
+    def moving_average(self, window):
+        df = self.data.copy()
+        df[f'SMA{window}'] = df['Close'].rolling(window=window).mean()
+        return df[f'SMA{window}']
+
+    def rsi(self, window):
+        delta = self.data['Close'].diff()
+        avg_gain = delta.where(delta > 0, 0).rolling(window=window).mean()
+        avg_loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def bollinger_bands(self, window):
+        sma = self.data['Close'].rolling(window=window).mean()
+        rolling_std = self.data['Close'].rolling(window=window).std()
+        self.data['Bollinger Upper Band'] = sma + (rolling_std * 2)
+        self.data['Bollinger Lower Band'] = sma - (rolling_std * 2)
+        return self.data[['Bollinger Upper Band', 'Bollinger Lower Band']]
+
+    def atr(self, window):
+        high_low = self.data['High'] - self.data['Low']
+        high_close = np.abs(self.data['High'] - self.data['Close'].shift())
+        low_close = np.abs(self.data['Low'] - self.data['Close'].shift())
+        true_range = np.max(pd.concat([high_low, high_close, low_close], axis=1), axis=1)
+        self.data['ATR'] = true_range.rolling(window=window).mean()
+        return self.data['ATR']
+
+    def get_features(self, window):
+        close, volume = self.data['Close'], self.data['Volume']
+        # The old sharpe/sortino methods required these columns on the input frame
+        self.data['ROI'] = close.pct_change()
+        self.data['Volatility'] = close.rolling(window=window).std()
+        self.data['Sharpe Ratio'] = (self.data['ROI'].rolling(window=window).mean() /
+                                     self.data['Volatility'].rolling(window=window).mean())
+        self.data['Sortino Ratio'] = (self.data['ROI'].rolling(window=window).mean() /
+                                      self.data[self.data['ROI'] < 0]['Volatility'].rolling(window=window).mean())
+        return pd.concat([
+            close.diff(), close.pct_change() * 100, self.moving_average(window), volume,
+            (close * volume).cumsum() / volume.cumsum(), (volume * ~close.diff().le(0)).astype(int).cumsum(),
+            close.rolling(window=window).std(), close.pct_change(), self.rsi(window), self.macd(),
+            self.bollinger_bands(window), self.data['Sharpe Ratio'], self.data['Sortino Ratio'], self.atr(window),
+        ], axis=1)
+
+    def get_data(self, window=14):
+        data = pd.concat([self.data, self.get_features(window)], axis=1)
+        return data.copy()
+
+
+def measure(path, rows):
+    provider = FakePriceProvider(bars=rows)
+    data = provider.make_bars('BENCH', interval='1m').reset_index().assign(Symbol='BENCH')
+    input_bytes = int(data.memory_usage(deep=True).sum())
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    if path == 'legacy':
+        result = LegacyFinancialData(data).get_data(14)
+    else:
+        result = FinancialData(data).get_data(14)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    allocations = len(tracemalloc.take_snapshot().traces)
+    tracemalloc.stop()
+
+    return {'path': path, 'elapsed': elapsed, 'input_mb': input_bytes / 1e6,
+            'output_mb': result.memory_usage(deep=True).sum() / 1e6, 'peak_traced_mb': peak / 1e6,
+            'live_allocations': allocations,
+            # ru_maxrss is in kilobytes on Linux
+            'peak_rss_delta_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1e3}
+
+
+def main(rows):
+    results = []
+    for path in ('legacy', 'current'):
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.features_memory_benchmark', '--rows', str(rows),
+                                 '--path', path], check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    print(f'{rows:,} rows')
+    print(pd.DataFrame(results).set_index('path').round(3).to_string())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000, help='Number of synthetic 1m bars.')
+    parser.add_argument('--path', choices=['legacy', 'current'], help='Measure one path in this process.')
+    args = parser.parse_args()
+    if args.path:
+        print(json.dumps(measure(args.path, args.rows)))
+    else:
+        main(args.rows)
@@ -0,0 +1,67 @@
+"""Score every symbol's latest window with its saved LSTM model: per-request loading vs the warm cache.
+
+Needs models saved by ``python LSTM_model.py`` (with their scalers) in ``--models-dir``. Run from
+the repository root:
+
+    python -m benchmarks.inference_benchmark --interval 1d --repeat 20
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.inference import BatchPredictor, ModelCache, load_saved_model, saved_models
+
+
+def latency_row(mode, latencies, elapsed, requests):
+    percentiles = np.percentile(latencies, [50, 90, 99]) * 1000
+    return {'mode': mode, 'requests': requests, 'elapsed (s)': elapsed, 'requests/s': requests / elapsed,
+            'p50 (ms)': percentiles[0], 'p90 (ms)': percentiles[1], 'p99 (ms)': percentiles[2]}
+
+
+def main(models_dir, interval, repeat, micro_batch_size):
+    targets = saved_models(models_dir, interval)
+    if not targets:
+        print(f'No saved models for interval {interval} in {models_dir}; train some with LSTM_model.py first.')
+        return
+
+    # Building the latest feature windows is data preparation, not inference, so it is not timed
+    requests = [BatchPredictor(models_dir, max_models=1).latest_request(symbol, model_interval)
+                for symbol, model_interval in targets]
+    rows = []
+
+    # Before: every request loads its model from disk and predicts a single window
+    latencies, start = [], time.perf_counter()
+    for request in requests:
+        request_start = time.perf_counter()
+        model = load_saved_model(models_dir, request.symbol, request.interval)
+        model.predict(np.asarray(request.window)[None, -model.lookback:])
+        latencies.append(time.perf_counter() - request_start)
+    rows.append(latency_row('load per request', latencies, time.perf_counter() - start, len(requests)))
+
+    predictor = BatchPredictor(cache=ModelCache(models_dir, max_models=len(targets)),
+                               micro_batch_size=micro_batch_size)
+    report = predictor.predict(requests)
+    rows.append(latency_row('batch, cold cache', report.latencies, report.elapsed, len(requests)))
+
+    latencies, elapsed = [], 0.0
+    for _ in range(repeat):
+        report = predictor.predict(requests)
+        latencies.extend(report.latencies)
+        elapsed += report.elapsed
+    rows.append(latency_row('batch, warm cache', latencies, elapsed, len(requests) * repeat))
+
+    print(f'{len(targets)} models ({interval}), micro-batch size {micro_batch_size}')
+    print(pd.DataFrame(rows).set_index('mode').round(3).to_string())
+    print(f'Cache: {predictor.cache.stats()}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--models-dir', default='models', help='Directory of saved models.')
+    parser.add_argument('--interval', default='1d', help='Model interval, or "all".')
+    parser.add_argument('--repeat', type=int, default=20, help='Warm-cache scoring rounds.')
+    parser.add_argument('--micro-batch-size', type=int, default=256, help='Windows per predict call.')
+    args = parser.parse_args()
+    main(args.models_dir, args.interval, args.repeat, args.micro_batch_size)
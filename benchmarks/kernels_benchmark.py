@@ -0,0 +1,74 @@
+"""Compare FinancialData indicator backends (pandas, NumPy, Numba) on the 1m and 1d histories.
+
+Histories are read from ``financial_data/`` and can be repeated ``--tile`` times (as extra
+symbols) to get longer inputs. Backends that are not installed are skipped. Run from the
+repository root:
+
+    python -m benchmarks.kernels_benchmark --intervals 1m 1d --tile 20
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.data_loader import DataLoader
+from utils.financial_features import FinancialData
+from utils.indicator_kernels import available_backends
+
+INDICATORS = {
+    'get_features': lambda financial_data: financial_data.get_features(14),
+    'rsi': lambda financial_data: financial_data.rsi(14),
+    'wilder rsi': lambda financial_data: financial_data.rsi(14, method='wilder'),
+    'atr': lambda financial_data: financial_data.calculate_atr(14),
+    'macd': lambda financial_data: financial_data.macd(),
+}
+
+
+def load_history(directory, interval, tile):
+    data = DataLoader(directory).load(interval, columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+    copies = [data.assign(Symbol=data['Symbol'].astype(str) + f'_{i}') for i in range(tile)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def time_indicator(data, backend, indicator, repeat):
+    compute = INDICATORS[indicator]
+    compute(FinancialData(data.copy(), backend=backend))  # Warm-up: lazy imports and JIT compilation
+    times = []
+    for _ in range(repeat):
+        financial_data = FinancialData(data.copy(), backend=backend)
+        start = time.perf_counter()
+        result = compute(financial_data)
+        times.append(time.perf_counter() - start)
+    return min(times), np.asarray(result, dtype='float64')
+
+
+def main(directory, intervals, tile, repeat):
+    backends = available_backends()
+    for interval in intervals:
+        data = load_history(directory, interval, tile)
+        print(f'\n{interval}: {data["Symbol"].nunique()} symbols, {len(data):,} rows; backends: {", ".join(backends)}')
+        rows = []
+        for indicator in INDICATORS:
+            reference_time, reference = time_indicator(data, 'pandas', indicator, repeat)
+            for backend in backends:
+                elapsed, result = ((reference_time, reference) if backend == 'pandas'
+                                   else time_indicator(data, backend, indicator, repeat))
+                scale = np.maximum(np.abs(reference), 1)
+                rows.append({'indicator': indicator, 'backend': backend, 'best (s)': elapsed,
+                             'rows/s': len(data) / elapsed, 'speed-up': reference_time / elapsed,
+                             'max rel. difference': np.nanmax(np.abs(result - reference) / scale),
+                             'nan mismatch': int((np.isnan(result) != np.isnan(reference)).sum())})
+        print(pd.DataFrame(rows).set_index(['indicator', 'backend']).to_string(
+            formatters={'best (s)': '{:.4f}'.format, 'rows/s': '{:,.0f}'.format, 'speed-up': '{:.2f}x'.format,
+                        'max rel. difference': '{:.2g}'.format}))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--directory', default='financial_data', help='Price store or CSV directory.')
+    parser.add_argument('--intervals', nargs='+', default=['1m', '1d'], help='Intervals to benchmark.')
+    parser.add_argument('--tile', type=int, default=20, help='Repeat each history this many times.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed repetitions per backend.')
+    args = parser.parse_args()
+    main(args.directory, args.intervals, args.tile, args.repeat)
@@ -0,0 +1,95 @@
+"""Time the Pipeline page's library introspection and step adding, cold (first run) and warm (reruns).
+
+Cold runs clear the introspection cache and the step registry first, which is what every page
+rerun paid before they existed. Run from the repository root:
+
+    python -m benchmarks.pipeline_introspection_benchmark --repeat 20
+"""
+import argparse
+import importlib
+import statistics
+import time
+
+import pandas as pd
+
+from models.Pipeline import Pipeline
+from utils.introspection import clear_introspection_cache, get_module_functions_info, step_registry
+
+PAGE_MODULES = ('data_manipulation', 'exploratory_analysis', 'visualization', 'reporting')
+
+# Shaped like the code mitosheet generates for a spreadsheet edit
+GENERATED_STEP = '''
+def function_{index}(data):
+    data.insert(1, 'new-column-{index}', 0)
+    data['new-column-{index}'] = data['A'] * {index}
+    return data
+'''
+
+
+def timed(function, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def clear_caches():
+    clear_introspection_cache()
+    step_registry.clear()
+
+
+def main(repeat, steps):
+    modules = []
+    for name in PAGE_MODULES:
+        try:
+            modules.append(importlib.import_module(f'utils.pipeline_utils.{name}'))
+        except ImportError as e:
+            print(f'Skipping {name}: {e}')
+
+    def build_libraries():
+        return {module.__name__: get_module_functions_info(module) for module in modules}
+
+    def add_library_steps():
+        pipeline = Pipeline(pd.DataFrame({'A': range(10)}))
+        for functions in build_libraries().values():
+            for info in functions.values():
+                pipeline.add_step(info)
+
+    sources = [GENERATED_STEP.format(index=index) for index in range(steps)]
+
+    def add_generated_steps():
+        pipeline = Pipeline(pd.DataFrame({'A': range(10)}))
+        for source in sources:
+            pipeline.add_step(source)
+
+    def display_steps():
+        pipeline = Pipeline(pd.DataFrame({'A': range(10)}))
+        for source in sources:
+            pipeline.add_step(source)
+        return [step.source_code for step in pipeline.steps]
+
+    function_count = sum(len(functions) for functions in build_libraries().values())
+    rows = []
+    for name, function in [('page import: introspect modules', build_libraries),
+                           ('add every library function as a step', add_library_steps),
+                           (f'add {steps} generated steps', add_generated_steps),
+                           (f'add and display {steps} generated steps', display_steps)]:
+        rows.append({'operation': name, 'cold (ms)': timed(function, repeat, setup=clear_caches),
+                     'warm (ms)': timed(function, repeat)})
+    results = pd.DataFrame(rows).set_index('operation')
+    results['speedup'] = results['cold (ms)'] / results['warm (ms)']
+    print(f'{len(modules)} modules, {function_count} functions, median of {repeat} runs')
+    print(results.round(3).to_string())
+    print(f'Step registry: {step_registry.stats()}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement.')
+    parser.add_argument('--steps', type=int, default=50, help='Generated steps added per run.')
+    args = parser.parse_args()
+    main(args.repeat, args.steps)
@@ -0,0 +1,92 @@
+"""Compare peak memory of materialized 3D look-back windows against WindowedSequence batches.
+
+Features are computed from the 1m histories in ``financial_data/``, repeated ``--tile`` times (as
+extra symbols) for a longer input. Windows never span two symbols. Each path runs one epoch over
+every window in a fresh interpreter. Run from the repository root:
+
+    python -m benchmarks.sequence_memory_benchmark --lookback 60 --tile 10
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.data_loader import DataLoader
+from utils.financial_features import FinancialData
+from utils.sequence_dataset import WindowedSequence, window_ends
+
+
+def load_features(directory, interval, tile):
+    data = DataLoader(directory).load(interval, columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+    data = pd.concat([data.assign(Symbol=data['Symbol'].astype(str) + f'_{i}') for i in range(tile)],
+                     ignore_index=True)
+    financial_data = FinancialData(data)
+    features = financial_data.get_features(14).fillna(0).to_numpy(dtype='float32')
+    return features, financial_data.data['Close'].to_numpy(dtype='float32'), financial_data.symbol_positions
+
+
+def measure(path, directory, interval, tile, lookback, batch_size):
+    features, target, positions = load_features(directory, interval, tile)
+    ends = window_ends(len(features), lookback, positions=positions)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    checksum = 0.0
+    if path == 'materialized':
+        # The (samples, lookback, features) array a reshape-based pipeline hands to Model.fit
+        windows = sliding_window_view(features, lookback, axis=0).transpose(0, 2, 1)[ends - lookback + 1].copy()
+        targets = target[ends]
+        for batch in range(0, len(windows), batch_size):
+            checksum += float(windows[batch:batch + batch_size, -1, 0].sum() + targets[batch:batch + batch_size].sum())
+    else:
+        sequence = WindowedSequence(features, target, lookback, batch_size, ends=ends)
+        for batch in range(len(sequence)):
+            windows, targets = sequence[batch]
+            checksum += float(windows[:, -1, 0].sum() + targets.sum())
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'path': path, 'rows': len(features), 'features': features.shape[1], 'samples': len(ends),
+            'elapsed': elapsed, 'input_mb': features.nbytes / 1e6, 'peak_traced_mb': peak / 1e6,
+            # ru_maxrss is in kilobytes on Linux
+            'peak_rss_delta_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1e3,
+            'checksum': checksum}
+
+
+def main(directory, interval, tile, lookback, batch_size):
+    results = []
+    for path in ('materialized', 'windowed'):
+        output = subprocess.run([sys.executable, '-m', 'benchmarks.sequence_memory_benchmark', '--path', path,
+                                 '--directory', directory, '--interval', interval, '--tile', str(tile),
+                                 '--lookback', str(lookback), '--batch-size', str(batch_size)],
+                                check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    results = pd.DataFrame(results).set_index('path')
+    print(f'{interval}, lookback {lookback}, batch size {batch_size}')
+    print(results.round(3).to_string())
+    if not np.isclose(results.loc['materialized', 'checksum'], results.loc['windowed', 'checksum'], rtol=1e-6):
+        print('Warning: the two paths produced different batches.')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--directory', default='financial_data', help='Price store or CSV directory.')
+    parser.add_argument('--interval', default='1m', help='Interval to load.')
+    parser.add_argument('--tile', type=int, default=10, help='Repeat the history this many times.')
+    parser.add_argument('--lookback', type=int, default=60, help='Look-back window length.')
+    parser.add_argument('--batch-size', type=int, default=32, help='Samples per batch.')
+    parser.add_argument('--path', choices=['materialized', 'windowed'], help='Measure one path in this process.')
+    args = parser.parse_args()
+    if args.path:
+        print(json.dumps(measure(args.path, args.directory, args.interval, args.tile, args.lookback, args.batch_size)))
+    else:
+        main(args.directory, args.interval, args.tile, args.lookback, args.batch_size)
@@ -0,0 +1,59 @@
+"""Compare load time and on-disk size of the legacy CSV files against the columnar store.
+
+Run from the repository root:
+
+    python -m benchmarks.storage_benchmark --directory financial_data --repeat 5
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from utils.data_loader import DataLoader
+from utils.storage import PriceStore, list_csv_files, migrate_csv_directory
+
+
+def time_load(directory, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # Without the shared frame cache, so every repetition reads from disk
+        DataLoader(directory, cache=None).load_data()
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings)
+
+
+def main(directory, repeat):
+    csv_files = list_csv_files(directory)
+    if not csv_files:
+        raise SystemExit(f'No *_data.csv files found in {directory}')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the two layouts in separate directories so each loader only sees one format
+        csv_dir = os.path.join(tmp, 'csv')
+        store_dir = os.path.join(tmp, 'store')
+        os.makedirs(csv_dir)
+        for _, _, path in csv_files:
+            shutil.copy(path, csv_dir)
+        store = PriceStore(store_dir)
+        migrated, _ = migrate_csv_directory(csv_dir, store)
+
+        csv_size = sum(os.path.getsize(path) for _, _, path in csv_files)
+        store_size = store.size_on_disk()
+        csv_best, csv_mean = time_load(csv_dir, repeat)
+        store_best, store_mean = time_load(store_dir, repeat)
+
+    print(f'Files: {len(csv_files)} CSV, {len(migrated)} partitions migrated')
+    print(f'{"format":<10}{"size (MB)":>12}{"best (s)":>12}{"mean (s)":>12}')
+    print(f'{"csv":<10}{csv_size / 1e6:>12.2f}{csv_best:>12.4f}{csv_mean:>12.4f}')
+    print(f'{"parquet":<10}{store_size / 1e6:>12.2f}{store_best:>12.4f}{store_mean:>12.4f}')
+    print(f'Size ratio: {csv_size / max(store_size, 1):.1f}x smaller, load speed-up: {csv_best / store_best:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--directory', default='financial_data', help='Directory holding the CSV files.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed loads per format.')
+    args = parser.parse_args()
+    main(args.directory, args.repeat)
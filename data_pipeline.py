@@ -1,3 +1,4 @@
+import logging
 from random import sample
 from random import seed
 
@@ -7,6 +8,16 @@ import pandas as pd
 from tqdm import tqdm
 import re
 
+from utils.downloader import ConcurrentDownloader
+from utils.metadata_cache import SymbolMetadataCache, fetch_yahoo_info
+from utils.storage import PriceStore, get_timestamp_column, normalize_price_frame
+from utils.universe import ConstituentUniverse
+
+logger = logging.getLogger(__name__)
+
+# EMAs never fully forget their seed; after this many spans its weight is below 1e-8 of the value
+EMA_WARMUP_SPANS = 10
+
 
 def moving_average(data, window):
     return data['Close'].rolling(window=window).mean()
@@ -28,17 +39,45 @@ def macd(data, short_window, long_window, signal_window):
     return macd, signal
 
 
-def get_sp500_constituents():
-    url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
-    tables = pd.read_html(url)
-    sp500_table = tables[0]  # The first table on the page is the list of S&P 500 companies
-    tickers = sp500_table['Symbol'].tolist()
-    return tickers
+def add_indicators(data, ma_windows=None, rsi_window=None, macd_windows=None):
+    # Calculate and add moving averages
+    if ma_windows:
+        for window in ma_windows:
+            data[f'MA{window}'] = moving_average(data, window)
+
+    # Calculate and add RSI
+    if rsi_window:
+        data[f'RSI{rsi_window}'] = rsi(data, rsi_window)
+
+    # Calculate and add MACD and Signal line
+    if macd_windows:
+        macd_short, macd_long, macd_signal = macd_windows
+        data['MACD'], data['Signal'] = macd(data, macd_short, macd_long, macd_signal)
+
+    return data
+
+
+def indicator_lookback(ma_windows=None, rsi_window=None, macd_windows=None):
+    """Number of preceding bars needed to recompute the indicators of new bars."""
+    lookback = [1]
+    if ma_windows:
+        lookback.append(max(ma_windows))
+    if rsi_window:
+        lookback.append(rsi_window + 1)
+    if macd_windows:
+        lookback.append(EMA_WARMUP_SPANS * max(macd_windows))
+    return max(lookback)
+
+
+def get_sp500_constituents(as_of=None, refresh=False, universe=None):
+    # Served from the local snapshot; the Wikipedia page is only scraped when the snapshot is stale
+    universe = universe if universe is not None else ConstituentUniverse()
+    return universe.constituents(as_of=as_of, refresh=refresh)
 
 
 def download_ticker_data(symbol, period="5y", start=None, end=None, interval="1m", ma_windows=None,
-                         rsi_window=14, macd_windows=(12, 26, 9)):
-    stock_info = StockInfo(symbol)
+                         rsi_window=14, macd_windows=(12, 26, 9), store=None, price_provider=None):
+    stock_info = StockInfo(symbol, price_provider=price_provider)
     data = stock_info.extract_features(period=period, start=start, end=end, interval=interval,ma_windows=ma_windows,
                                        rsi_window=rsi_window, macd_windows=macd_windows)
 
@@ -46,32 +85,84 @@ def download_ticker_data(symbol, period="5y", start=None, end=None, interval="1m
     cleaned_symbol = re.sub(r'[^a-zA-Z]', '', symbol)
     data['Symbol'] = cleaned_symbol
 
-    # Save the data to a CSV file for this symbol
-    file_name = f'financial_data/{cleaned_symbol}_{interval}_data.csv'
-    data.to_csv(file_name)
+    # Save the data to the columnar store partition for this symbol
+    store = store if store is not None else PriceStore()
+    store.write(data, interval, cleaned_symbol)
     return data
 
 
-def download_multiple_tickers(symbols, period="5y", start=None, end=None, interval='1m', ma_windows=None,
-                              rsi_window=None, macd_windows=None):
-    # Initialize tqdm progress bar
-    progress_bar = tqdm(total=len(symbols), desc="Downloading Data", unit="stock")
+def refresh_ticker_data(symbol, interval="1m", ma_windows=None, rsi_window=14, macd_windows=(12, 26, 9),
+                        store=None, price_provider=None, period="max"):
+    """Fetch only the bars after the last stored one and append them to the store.
+
+    The fetch starts at the last stored timestamp, so the boundary bar is fetched again and
+    replaces the stored copy. Indicators are recomputed over just enough stored history to cover
+    their look-back windows. Symbols without stored history get a full download.
+    """
+    store = store if store is not None else PriceStore()
+    cleaned_symbol = re.sub(r'[^a-zA-Z]', '', symbol)
+    last_timestamp = store.last_timestamp(interval, cleaned_symbol)
+    if last_timestamp is None:
+        return download_ticker_data(symbol, period=period, interval=interval, ma_windows=ma_windows,
+                                    rsi_window=rsi_window, macd_windows=macd_windows, store=store,
+                                    price_provider=price_provider)
+
+    stock_info = StockInfo(symbol, price_provider=price_provider)
+    new_data = stock_info.get_data(start=last_timestamp, interval=interval)
+    if new_data.empty:
+        return new_data
+    new_data['date'] = pd.to_datetime(pd.to_datetime(new_data.index).strftime('%Y-%m-%d'))
+    new_data['Symbol'] = cleaned_symbol
+    new_data = normalize_price_frame(new_data)
+    timestamp_column = get_timestamp_column(new_data.columns)
+    first_new = new_data[timestamp_column].min()
+
+    # Recompute indicators over the stored tail plus the new bars, then keep only the new bars
+    tail = store.read_tail(interval, cleaned_symbol, indicator_lookback(ma_windows, rsi_window, macd_windows))
+    tail = tail[tail[timestamp_column] < first_new]
+    raw_columns = [column for column in new_data.columns if column in tail.columns]
+    combined = pd.concat([tail[raw_columns], new_data], ignore_index=True)
+    combined = add_indicators(combined, ma_windows=ma_windows, rsi_window=rsi_window, macd_windows=macd_windows)
+    new_rows = combined[combined[timestamp_column] >= first_new].reset_index(drop=True)
+
+    store.append(new_rows, interval, cleaned_symbol)
+    return new_rows
 
-    for symbol in symbols:
-        download_ticker_data(symbol, period=period, start=start, end=end, interval=interval, ma_windows=ma_windows,
-                             rsi_window=rsi_window, macd_windows=macd_windows)
-        # Update the progress bar
-        progress_bar.update(1)
 
-    # Close the progress bar
+def download_multiple_tickers(symbols, period="5y", start=None, end=None, interval='1m', ma_windows=None,
+                              rsi_window=None, macd_windows=None, max_workers=8, requests_per_second=None,
+                              max_retries=3, store=None, price_provider=None, incremental=False):
+    def fetch(symbol):
+        if incremental:
+            return refresh_ticker_data(symbol, interval=interval, ma_windows=ma_windows, rsi_window=rsi_window,
+                                       macd_windows=macd_windows, store=store, price_provider=price_provider,
+                                       period=period)
+        return download_ticker_data(symbol, period=period, start=start, end=end, interval=interval,
+                                    ma_windows=ma_windows, rsi_window=rsi_window, macd_windows=macd_windows,
+                                    store=store, price_provider=price_provider)
+
+    downloader = ConcurrentDownloader(fetch, max_workers=max_workers, requests_per_second=requests_per_second,
+                                      max_retries=max_retries)
+
+    # Initialize tqdm progress bar, updated as each symbol completes
+    progress_bar = tqdm(total=len(symbols), desc="Downloading Data", unit="stock")
+    report = downloader.download(symbols, on_complete=lambda outcome: progress_bar.update(1))
     progress_bar.close()
 
+    logger.info(report)
+    for outcome in report.failed():
+        logger.warning("Failed to download %s after %d attempts: %r", outcome.symbol, outcome.attempts, outcome.error)
+    return report
+
 
 # To get a single dataset with a group of symbols from Yahoo Finance
 def build_dataset(num_samples=None, seeded=False, custom_symbols=None, start=None, end=None,
-                  period="5y", ma_windows=None, rsi_window=14, macd_windows=(12, 26, 9)):
-    symbols = custom_symbols if custom_symbols else get_sp500_constituents()
-    combined_data = []
+                  period="5y", ma_windows=None, rsi_window=14, macd_windows=(12, 26, 9), max_workers=8,
+                  requests_per_second=None, max_retries=3, price_provider=None, metadata_cache=None,
+                  refresh_universe=False, as_of=None):
+    symbols = custom_symbols if custom_symbols else get_sp500_constituents(as_of=as_of, refresh=refresh_universe)
+    if metadata_cache is None:
+        metadata_cache = SymbolMetadataCache(fetch=getattr(price_provider, 'info', fetch_yahoo_info))
 
     if num_samples is None:
         num_samples = len(symbols)
@@ -86,30 +177,43 @@ def build_dataset(num_samples=None, seeded=False, custom_symbols=None, start=Non
     else:
         selected_symbols = sample(symbols, num_samples)
 
-    # Initialize tqdm progress bar
-    progress_bar = tqdm(total=num_samples, desc="Building Dataset", unit="stock")
+    # Warm the metadata cache for the whole selection in one concurrent batch
+    metadata_cache.get_many(selected_symbols, max_workers=max_workers, requests_per_second=requests_per_second,
+                            max_retries=max_retries)
 
-    text_features = {}
-    for symbol in selected_symbols:
-        stock_info = StockInfo(symbol)
+    def fetch(symbol):
+        stock_info = StockInfo(symbol, price_provider=price_provider, metadata_cache=metadata_cache)
         data = stock_info.extract_features(period=period, start=start, end=end, ma_windows=ma_windows,
                                            rsi_window=rsi_window, macd_windows=macd_windows)
 
         # Add a column to identify the stock symbol in the combined dataset
-        cleaned_symbol = re.sub(r'[^a-zA-Z]', '', symbol)
-        data['Symbol'] = cleaned_symbol
+        data['Symbol'] = re.sub(r'[^a-zA-Z]', '', symbol)
 
         # Extract text features
-        text_features[cleaned_symbol] = stock_info.extract_text_features()
+        return data, stock_info.extract_text_features()
 
-        # Add the data to the list of dataframes
-        combined_data.append(data)
-        # Update the progress bar
-        progress_bar.update(1)
+    downloader = ConcurrentDownloader(fetch, max_workers=max_workers, requests_per_second=requests_per_second,
+                                      max_retries=max_retries)
 
-    # Close the progress bar
+    # Initialize tqdm progress bar, updated as each symbol completes
+    progress_bar = tqdm(total=num_samples, desc="Building Dataset", unit="stock")
+    report = downloader.download(selected_symbols, on_complete=lambda outcome: progress_bar.update(1))
     progress_bar.close()
 
+    logger.info(report)
+    logger.info("Symbol metadata cache: %s", metadata_cache.stats())
+    for outcome in report.failed():
+        logger.warning("Skipping %s after %d failed attempts: %r", outcome.symbol, outcome.attempts, outcome.error)
+    if not report.succeeded():
+        raise RuntimeError("No symbols could be downloaded.")
+
+    combined_data = []
+    text_features = {}
+    for outcome in report.succeeded():
+        data, text = outcome.data
+        text_features[re.sub(r'[^a-zA-Z]', '', outcome.symbol)] = text
+        combined_data.append(data)
+
     # Concatenate all dataframes into a single dataframe
     combined_df = pd.concat(combined_data, ignore_index=True)
 
@@ -118,55 +222,55 @@ def build_dataset(num_samples=None, seeded=False, custom_symbols=None, start=Non
 
 class StockInfo:
 
-    def __init__(self, ticker_symbol):
+    def __init__(self, ticker_symbol, price_provider=None, metadata_cache=None):
         self.ticker_symbol = ticker_symbol
         self.ticker = yf.Ticker(ticker_symbol)
+        # Anything with a yfinance-style history() method, e.g. utils.downloader.FakePriceProvider
+        self.price_provider = price_provider
+        # Optional utils.metadata_cache.SymbolMetadataCache shared across StockInfo instances
+        self.metadata_cache = metadata_cache
+        self._info = None
 
     def get_info(self):
-        return self.ticker.info
+        # Fetch the info payload once; every accessor below reads from it
+        if self._info is None:
+            if self.metadata_cache is not None:
+                self._info = self.metadata_cache.get(self.ticker_symbol)
+            else:
+                self._info = self.ticker.info
+        return self._info
 
     def get_industry(self):
-        return self.ticker.info.get('industry', None)
+        return self.get_info().get('industry', None)
 
     def get_short_name(self):
-        return self.ticker.info.get('shortName', None)
+        return self.get_info().get('shortName', None)
 
     def get_long_name(self):
-        return self.ticker.info.get('longName', None)
+        return self.get_info().get('longName', None)
 
     def get_description(self):
-        return self.ticker.info.get('longBusinessSummary', None)
+        return self.get_info().get('longBusinessSummary', None)
 
     def get_sector(self):
-        return self.ticker.info.get('sector', None)
+        return self.get_info().get('sector', None)
 
     def get_data(self, period="1y", start=None, end=None, interval="1m"):
+        if self.price_provider is not None:
+            return self.price_provider.history(self.ticker_symbol, period=period, start=start, end=end,
+                                               interval=interval, auto_adjust=True)
         return self.ticker.history(period=period, start=start, end=end, interval=interval, auto_adjust=True)
 
     def extract_features(self, period="1y", start=None, end=None, interval="1m", ma_windows=None, rsi_window=None,
                          macd_windows=None):
 
-        # Fetch historical data using yfinance
-        data = self.ticker.history(period=period, start=start, end=end, interval=interval, auto_adjust=True)
+        # Fetch historical data using yfinance (or the configured price provider)
+        data = self.get_data(period=period, start=start, end=end, interval=interval)
 
         # Add a date column with only the date part
         data['date'] = pd.to_datetime(pd.to_datetime(data.index).strftime('%Y-%m-%d'))
 
-        # Calculate and add moving averages
-        if ma_windows:
-            for window in ma_windows:
-                data[f'MA{window}'] = moving_average(data, window)
-
-        # Calculate and add RSI
-        if rsi_window:
-            data[f'RSI{rsi_window}'] = rsi(data, rsi_window)
-
-        # Calculate and add MACD and Signal line
-        if macd_windows:
-            macd_short, macd_long, macd_signal = macd_windows
-            data['MACD'], data['Signal'] = macd(data, macd_short, macd_long, macd_signal)
-
-        return data
+        return add_indicators(data, ma_windows=ma_windows, rsi_window=rsi_window, macd_windows=macd_windows)
 
     def extract_text_features(self):
         description = self.get_description()
@@ -210,8 +314,10 @@ class StockInfo:
 
 if __name__ == "__main__":
     symbols_list = ['AAPL', 'MSFT', 'GOOG', 'AMZN', 'FB', 'TSLA', 'NVDA', 'ADBE']
-    download_multiple_tickers(symbols_list, period="max", interval='1d')
-    download_multiple_tickers(symbols_list, period="max", interval='1m')
+    # Symbols already in the store only fetch the bars after their last stored one
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    download_multiple_tickers(symbols_list, period="max", interval='1d', incremental=True)
+    download_multiple_tickers(symbols_list, period="max", interval='1m', incremental=True)
     # download_multiple_tickers(symbols_list, period="max", interval='1d', ma_windows=(5, 10), rsi_window=14, macd_windows=(12, 26, 9))
     # dataset = build_dataset(period='max', seeded=True, custom_symbols=('AAPL', 'MSFT', 'GOOG', 'AMZN', 'FB', 'TSLA', 'NVDA', 'ADBE'))
     #
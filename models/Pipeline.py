@@ -1,19 +1,30 @@
 import functools
 from typing import Callable, Union, Dict, Any
 
-import matplotlib.pyplot as plt
+import pandas as pd
 
+from utils.chunked_execution import fit_two_pass, iter_chunks, step_streaming, stream_steps, write_parquet_chunks
 from utils.introspection import FunctionMetadata, create_executable_function, get_string_from_step_function
+from utils.pipeline_plan import check_plan, plan_from_steps, read_plan, step_from_dict, write_plan
+from utils.step_cache import NullStepCache, StepCache, copy_data, fingerprint, step_key
+from utils.step_profiling import StepProfiler
+
+_MISSING = object()
 
 
 class Pipeline:
-    def __init__(self, data=None):
+    def __init__(self, data=None, cache=None):
         self.original_data = data
         self.intermediate_data = data  # Holds the data as it's transformed by each step
         self.steps = []
         self.current_step = 0
+        # Step outputs by content key, kept across runs (and Streamlit reruns, with the pipeline in session state);
+        # cache=False turns caching off, e.g. for one-off batch runs
+        self.cache = StepCache() if cache is None else NullStepCache() if cache is False else cache
+        self.last_run = None
 
-    def add_step(self, func_info: Union[str, Dict, Callable, FunctionMetadata], param_values: Dict[str, Any] = None, func_name: str = None):
+    def add_step(self, func_info: Union[str, Dict, Callable, FunctionMetadata], param_values: Dict[str, Any] = None, func_name: str = None,
+                 streaming: Dict[str, Any] = None):
         func_metadata = None
 
         if isinstance(func_info, FunctionMetadata):
@@ -23,55 +34,208 @@ class Pipeline:
             if func is not None:
                 func_metadata = FunctionMetadata(func)
         elif isinstance(func_info, Dict):
-            func = create_executable_function(func_info['source_code'])
-            if func is not None:
-                func_metadata = FunctionMetadata(func)
+            # Uses the dict's function, or the compiled function interned for its source
+            func_metadata = FunctionMetadata(func_info)
+            if func_metadata.func is None:
+                func_metadata = None
         elif callable(func_info):
             func_metadata = FunctionMetadata(func_info)
 
         if func_name is not None:
-            func_metadata = FunctionMetadata(func_info)
+            if func_metadata is None:
+                func_metadata = FunctionMetadata(func_info)
             func_metadata.func_name = func_name
 
         if func_metadata is not None:
             if param_values is not None:
-                # Update the parameter values in the FunctionMetadata object
-                for param_name, value in param_values.items():
-                    matching_param = next((param for param in func_metadata.params if param.name == param_name), None)
-                    if matching_param is not None:
-                        matching_param.value = value
-                    else:
-                        print(f"Warning: Parameter {param_name} is not recognized by the function {func_metadata.func_name}")
+                self._set_param_values(func_metadata, param_values)
+            if streaming is not None:
+                # Overrides the function's own declaration (see utils.chunked_execution)
+                func_metadata.streaming = streaming
 
             self.steps.append(func_metadata)
 
+    @staticmethod
+    def _set_param_values(func_metadata, param_values):
+        # Update the parameter values in the FunctionMetadata object
+        for param_name, value in param_values.items():
+            matching_param = next((param for param in func_metadata.params if param.name == param_name), None)
+            if matching_param is not None:
+                matching_param.value = value
+            else:
+                print(f"Warning: Parameter {param_name} is not recognized by the function {func_metadata.func_name}")
+
+    def update_step(self, step_index, param_values):
+        """Change a step's parameter values; only it and the steps after it run again."""
+        if 0 <= step_index < len(self.steps):
+            self._set_param_values(self.steps[step_index], param_values)
+
     def add_column_operation(self, func, *args, **kwargs):
         wrapper = functools.wraps(func)(lambda data: func(data, *args, **kwargs))
+        # wraps also copies a signature the function presents (e.g. two-pass steps); the wrapper only takes the data
+        wrapper.__dict__.pop('__signature__', None)
         function_meta = FunctionMetadata(wrapper)
         function_meta.func_name = wrapper.__name__ = "data = " + func.__name__
+        function_meta.column_operation = (func, args, kwargs)  # what the wrapper binds, for saving the plan
+        if 'fit' in (getattr(wrapper, 'streaming', None) or {}):
+            # functools.wraps copied a two-pass declaration, but the wrapper cannot pass a fitted state on
+            wrapper.streaming = {'mode': 'global'}
         self.steps.append(function_meta)
 
     def remove_step(self, step_index):
         if 0 <= step_index < len(self.steps):
             self.steps.pop(step_index)
 
-    def run(self):
-        self.intermediate_data = self.original_data  # Reset to original data at the start of each run
+    def step_keys(self):
+        """Cache key of every step's output.
+
+        Each key hashes the previous key (the original data's fingerprint for the first step), the
+        step's code and its parameter values, so editing or removing step k changes the keys of
+        steps k and later only.
+        """
+        if not self.cache.enabled:
+            return [None] * len(self.steps)
+        key = fingerprint(self.original_data)
+        keys = []
         for step in self.steps:
-            # Assume each function in the pipeline returns the transformed data
-            self.intermediate_data = step(self.intermediate_data)
+            key = step_key(key, step)
+            keys.append(key)
+        return keys
+
+    def run(self, memory='rss', profile_path=None):
+        """Run the pipeline, resuming after the last step whose output is still cached.
+
+        ``last_run`` then holds a run report with each step's time, memory and shape; ``memory``
+        picks how peak memory is measured (see ``utils.step_profiling.StepProfiler``). With
+        ``profile_path``, steps run under cProfile and the slowest step's statistics are written there.
+        """
+        keys = self.step_keys()
+        # Reset to original data at the start of each run, unless a later intermediate is cached
+        start, data = 0, self.original_data
+        for index in range(len(keys) - 1, -1, -1):
+            cached = self.cache.get(keys[index], _MISSING)
+            if cached is not _MISSING:
+                start, data = index + 1, cached
+                break
+        profiler = StepProfiler(memory, profile=profile_path is not None)
+        with profiler:
+            for index in range(start):
+                # Only the step the run resumes from had its output loaded
+                profiler.cached(index, self.steps[index], data if index == start - 1 else None)
+            # The original data and cached outputs are shared; steps modify one private copy of them
+            data = copy_data(data)
+            for index in range(start, len(self.steps)):
+                # Assume each function in the pipeline returns the transformed data
+                data = profiler.run(index, self.steps[index], data)
+                self._store(keys[index], data)
+            self.intermediate_data = data
+        self.last_run = self._run_report(profiler, profile_path)
+        return self.last_run
 
     def step_generator(self):
         self.intermediate_data = self.original_data  # Reset to original data at the start of step-by-step execution
+        self.current_step = 0
         while self.current_step < len(self.steps):
             yield self.steps[self.current_step]
             self.current_step += 1
 
-    def run_step_by_step(self):
+    def run_step_by_step(self, memory='rss', profile_path=None):
+        keys = self.step_keys()
         gen = self.step_generator()
-        for step in gen:
-            # Assume each function in the pipeline returns the transformed data
-            self.intermediate_data = step(self.intermediate_data)
+        profiler = StepProfiler(memory, profile=profile_path is not None)
+        with profiler:
+            shared = True  # whether intermediate_data is the original data or a cached output
+            for step in gen:
+                data = self.cache.get(keys[self.current_step], _MISSING)
+                if data is _MISSING:
+                    # Assume each function in the pipeline returns the transformed data
+                    data = profiler.run(self.current_step, step,
+                                        copy_data(self.intermediate_data) if shared else self.intermediate_data)
+                    self._store(keys[self.current_step], data)
+                    shared = False
+                else:
+                    profiler.cached(self.current_step, step, data)
+                    shared = True
+                self.intermediate_data = data
+            if shared:
+                self.intermediate_data = copy_data(self.intermediate_data)
+        self.last_run = self._run_report(profiler, profile_path)
+        return self.last_run
+
+    def _store(self, key, data):
+        # The next step may modify its input in place, so the cache keeps its own copy
+        if self.cache.enabled:
+            self.cache.put(key, copy_data(data))
+
+    @staticmethod
+    def _run_report(profiler, profile_path):
+        report = profiler.report()
+        if profile_path is not None:
+            report['profile_path'] = profiler.dump_slowest(profile_path)
+        return report
+
+    def stream(self, source, chunksize=100_000, materialize=False):
+        """Run the pipeline chunk by chunk over ``source``, yielding output chunks as they are ready.
+
+        ``source`` is a DataFrame, a CSV or Parquet path, or a callable returning an iterator of
+        DataFrames. Steps run according to their streaming declaration (see
+        ``utils.chunked_execution``): row-local steps per chunk, window steps per chunk plus the
+        rows they look back on, two-pass steps after a first pass over the source (through the
+        steps before them) to fit their state. Memory then stays bounded by the chunk size. Steps
+        without a declaration need all rows at once and are refused unless ``materialize``.
+        """
+        states = {}
+        for index, step in enumerate(self.steps):
+            streaming = step_streaming(step) or {}
+            if 'fit' in streaming:
+                chunks = stream_steps(self.steps[:index], iter_chunks(source, chunksize), chunksize, states,
+                                      materialize)
+                states[index] = fit_two_pass(step, chunks)
+        yield from stream_steps(self.steps, iter_chunks(source, chunksize), chunksize, states, materialize)
+
+    def run_streaming(self, source, output=None, chunksize=100_000, materialize=False):
+        """Stream the pipeline over ``source`` into a Parquet file at ``output``, or into one DataFrame.
+
+        Returns the number of rows written, or the DataFrame when there is no ``output``.
+        """
+        chunks = self.stream(source, chunksize, materialize)
+        if output is None:
+            self.intermediate_data = pd.concat(list(chunks))
+            return self.intermediate_data
+        return write_parquet_chunks(chunks, output)
+
+    def streaming_modes(self):
+        """How each step would run in ``stream``: row, window, two-pass or materialized."""
+        modes = []
+        for step in self.steps:
+            streaming = step_streaming(step) or {'mode': 'global'}
+            modes.append('two-pass' if 'fit' in streaming else
+                         'materialized' if streaming['mode'] == 'global' else streaming['mode'])
+        return modes
+
+    def to_plan(self):
+        """The steps as a JSON-serializable plan: function references or source, code hashes and parameters."""
+        return plan_from_steps(self.steps)
+
+    def save_plan(self, path):
+        write_plan(self.to_plan(), path)
+
+    @classmethod
+    def from_plan(cls, plan, data=None, verify=True, cache=None):
+        """Rebuild a pipeline from a plan; step sources go through the compile cache and nothing is run."""
+        check_plan(plan)
+        pipeline = cls(data, cache=cache)
+        for entry in plan['steps']:
+            step, args, params = step_from_dict(entry, verify)
+            if args is not None:
+                pipeline.add_column_operation(step, *args, **params)
+            else:
+                pipeline.add_step(step, params)
+        return pipeline
+
+    @classmethod
+    def load_plan(cls, path, data=None, verify=True, cache=None):
+        return cls.from_plan(read_plan(path), data, verify, cache)
 
     def display_architecture(self):
         for i, step in enumerate(self.steps, 1):
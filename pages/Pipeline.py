@@ -1,5 +1,8 @@
 import enum
+import json
+import os
 import re
+import tempfile
 
 import numpy as np
 import streamlit as st
@@ -11,6 +14,7 @@ from mitosheet.streamlit.v1 import spreadsheet
 from utils.pipeline_utils import reporting, data_manipulation, exploratory_analysis, visualization, coercion
 from utils.streamlit_utils import with_sidebar
 from utils.introspection import get_module_functions_info, FunctionMetadata
+from utils.step_profiling import report_table
 import matplotlib
 
 # Dictionary to hold libraries
@@ -22,6 +26,14 @@ libraries_dict = {
 }
 
 
+# Step memory measures offered for pipeline runs (see utils.step_profiling.StepProfiler)
+MEMORY_MEASURES = {
+    'Python allocations (slower)': 'tracemalloc',
+    'Process peak (fast, includes other sessions)': 'rss',
+    'Off': None
+}
+
+
 # Load Data step
 def reset_pipeline(data):
     st.session_state['data'] = data
@@ -304,9 +316,59 @@ def render():
                     st.button(f'Remove Step {index + 1}', on_click=lambda: pipeline.remove_step(index))
 
             # Button to run the pipeline
+            col1, col2 = st.columns(2)
+            with col1:
+                # Python allocations by default: the process peak also counts the other sessions the server runs
+                memory = MEMORY_MEASURES[st.selectbox('Measure step memory', list(MEMORY_MEASURES))]
+            with col2:
+                profile = st.checkbox('Profile the slowest step')
             if st.button('Run Pipeline'):
-                pipeline.run()
-                st.write('Pipeline executed.')
+                profile_path = os.path.join(tempfile.gettempdir(), f'pipeline-{os.getpid()}-slowest.prof') if profile else None
+                try:
+                    pipeline.run(memory=memory, profile_path=profile_path)
+                except ValueError as e:
+                    st.error(f'Pipeline failed: {e}')
+                else:
+                    st.write('Pipeline executed.')
+
+            # Run report of the last run, kept with the pipeline across reruns
+            if pipeline.last_run is not None:
+                run_report = pipeline.last_run
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric('Steps run', run_report['executed'], f"{run_report['cached']} cached", delta_color='off')
+                col2.metric('Step time', f"{run_report['step_time']:.3f}s")
+                col3.metric('CPU time', f"{run_report['cpu_time']:.3f}s")
+                col4.metric('Peak memory', f"{run_report['peak_memory'] / (1 << 20):.1f} MB"
+                            if run_report['peak_memory'] is not None else '-')
+                table = report_table(run_report)
+                for column in ('peak_memory', 'output_bytes'):
+                    table[column] = table[column] / (1 << 20)
+                st.dataframe(table.rename(columns={'wall_time': 'wall time (s)', 'cpu_time': 'CPU time (s)',
+                                                   'peak_memory': 'peak memory (MB)',
+                                                   'output_bytes': 'output (MB)'}))
+                if run_report['profile_path'] and os.path.exists(run_report['profile_path']):
+                    with open(run_report['profile_path'], 'rb') as profile_file:
+                        st.download_button(f"Download Profile of Step {run_report['slowest_step']}", profile_file.read(),
+                                           file_name='slowest_step.prof', mime='application/octet-stream')
+
+            # Save the steps as a plan, or replace them with a saved one (nothing is run until asked)
+            col1, col2 = st.columns(2)
+            with col1:
+                try:
+                    st.download_button('Save Pipeline Plan', json.dumps(pipeline.to_plan(), indent=1),
+                                       file_name='pipeline_plan.json', mime='application/json')
+                except ValueError as e:
+                    st.warning(f'This pipeline cannot be saved: {e}')
+            with col2:
+                plan_file = st.file_uploader('Load Pipeline Plan', type=['json'])
+                if plan_file is not None and st.button('Replace Steps with Plan'):
+                    try:
+                        loaded = Pipeline.from_plan(json.load(plan_file), data, cache=pipeline.cache)
+                    except (ValueError, KeyError, ImportError, AttributeError) as e:
+                        st.error(f'Could not load the plan: {e}')
+                    else:
+                        st.session_state['pipeline'] = loaded
+                        st.rerun()
 
         # Generate Report
         with st.expander("Report Generator"):
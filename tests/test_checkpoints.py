@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('tensorflow')
+
+from tensorflow import keras
+
+from utils.checkpoints import ResumableTraining, checkpoint_dir
+
+
+def tiny_model():
+    model = keras.Sequential([keras.Input(shape=(2,)), keras.layers.Dense(1)])
+    model.compile(optimizer='adam', loss='mse')
+    return model
+
+
+def run_epochs(callback, model, val_losses, start=0):
+    """Drive ``callback`` like ``fit`` would, setting the weights to the epoch number before each epoch end."""
+    callback.set_model(model)
+    model.stop_training = False
+    for epoch, val_loss in enumerate(val_losses, start):
+        model.set_weights([np.full_like(weights, epoch) for weights in model.get_weights()])
+        callback.on_epoch_end(epoch, {'loss': 1.0, 'val_loss': val_loss})
+        if model.stop_training:
+            break
+    callback.on_train_end()
+
+
+@pytest.mark.parametrize('directory', [False, True])
+def test_early_stopping_restores_the_best_weights(tmp_path, directory):
+    model = tiny_model()
+    callback = ResumableTraining(str(tmp_path / 'run') if directory else None, patience=2)
+
+    run_epochs(callback, model, [3.0, 2.0, 1.0, 1.5, 1.2, 0.5])
+
+    # Epoch 2 (the third) is best; two epochs without improvement stop the run before the last
+    assert callback.state['epoch'] == 5 and callback.state['stopped_early']
+    assert callback.summary(10) == {'epochs_run': 5, 'epochs_saved': 5, 'best_epoch': 3, 'stopped_early': True,
+                                    'resumed_from': None}
+    assert all((weights == 2).all() for weights in model.get_weights())
+
+
+def test_restore_resumes_the_saved_run_and_discards_other_configs(tmp_path):
+    directory = str(tmp_path / checkpoint_dir('checkpoints', 'AAPL', '1d', fold=1))
+    assert directory.endswith('AAPL_1d_fold1')
+    first = ResumableTraining(directory, patience=3, every=2, config={'lookback': 60})
+    first.set_model(tiny_model())
+    for epoch, val_loss in enumerate([3.0, 2.0, 2.5]):
+        first.on_epoch_end(epoch, {'val_loss': val_loss})
+
+    resumed = ResumableTraining(directory, patience=3, every=2, config={'lookback': 60})
+    model = resumed.restore()
+
+    # Saved every second epoch, so the third is lost with the interrupted run
+    assert model is not None
+    assert (resumed.state['epoch'], resumed.state['resumed_from'], resumed.state['best']) == (2, 2, 2.0)
+    assert resumed.state['history'] == {'val_loss': [3.0, 2.0]}
+    assert ResumableTraining(directory, config={'lookback': 30}).restore() is None
+    assert ResumableTraining(directory, config={'lookback': 60}).restore() is None
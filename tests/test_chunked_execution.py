@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from utils.chunked_execution import write_parquet_chunks
+
+
+def test_write_parquet_chunks_widens_column_missing_in_first_chunk(tmp_path):
+    path = str(tmp_path / 'out.parquet')
+    chunks = [pd.DataFrame({'price': [1, 2], 'note': [np.nan, np.nan]}),
+              pd.DataFrame({'price': [3.5, 4], 'note': ['x', None]}, index=[2, 3])]
+
+    assert write_parquet_chunks(iter(chunks), path) == 4
+
+    written = pd.read_parquet(path)
+    assert written['price'].tolist() == [1.0, 2.0, 3.5, 4.0]
+    assert written['note'].tolist() == [None, None, 'x', None]
+    assert os.listdir(tmp_path) == ['out.parquet']
+
+
+def test_write_parquet_chunks_keeps_index_when_widening(tmp_path):
+    path = str(tmp_path / 'out.parquet')
+    data = pd.DataFrame({'note': [np.nan, np.nan, 'a', 'b']},
+                        index=pd.date_range('2020-01-01', periods=4, tz='UTC', name='Date'))
+
+    write_parquet_chunks(iter([data.iloc[:2], data.iloc[2:]]), path)
+
+    pd.testing.assert_index_equal(pd.read_parquet(path).index, data.index, check_exact=True)
+
+
+def test_write_parquet_chunks_casts_to_explicit_schema(tmp_path):
+    path = str(tmp_path / 'out.parquet')
+    schema = pa.schema([('price', pa.float64()), ('note', pa.string())])
+    chunks = [pd.DataFrame({'price': [1, 2], 'note': [None, None]}),
+              pd.DataFrame({'price': [3, 4], 'note': ['x', 'y']})]
+
+    write_parquet_chunks(iter(chunks), path, schema=schema)
+
+    written = pd.read_parquet(path)
+    assert written['price'].dtype == np.float64
+    assert written['note'].tolist() == [None, None, 'x', 'y']
+
+
+def test_write_parquet_chunks_rejects_changed_columns(tmp_path):
+    path = str(tmp_path / 'out.parquet')
+    chunks = [pd.DataFrame({'price': [1.0]}), pd.DataFrame({'volume': ['x']})]
+
+    with pytest.raises(ValueError, match='same columns'):
+        write_parquet_chunks(iter(chunks), path)
+    assert os.listdir(tmp_path) == []
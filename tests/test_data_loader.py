@@ -0,0 +1,69 @@
+import os
+
+import pandas as pd
+
+from utils.data_loader import DataLoader, FrameCache
+from utils.downloader import FakePriceProvider
+
+
+def write_csv(directory, symbol, bars=30):
+    data = FakePriceProvider(bars=bars).make_bars(symbol)
+    data['Symbol'] = symbol
+    data.to_csv(os.path.join(directory, f'{symbol}_1d_data.csv'))
+
+
+def test_rewritten_file_is_a_miss_and_drops_the_stale_entry(tmp_path):
+    write_csv(tmp_path, 'AAPL')
+    cache = FrameCache()
+    loader = DataLoader(str(tmp_path), cache=cache)
+
+    first = loader.load('1d', ['AAPL'])
+    pd.testing.assert_frame_equal(loader.load('1d', ['AAPL']), first)
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (1, 1)
+
+    write_csv(tmp_path, 'AAPL', bars=40)
+    reloaded = loader.load('1d', ['AAPL'])
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 1)
+    assert len(first) == 30 and len(reloaded) == 40
+    assert stats['bytes'] == reloaded.memory_usage(index=True, deep=True).sum()
+
+
+def test_touched_file_is_a_miss(tmp_path):
+    write_csv(tmp_path, 'AAPL')
+    cache = FrameCache()
+    loader = DataLoader(str(tmp_path), cache=cache)
+    loader.load('1d', ['AAPL'])
+
+    path = os.path.join(tmp_path, 'AAPL_1d_data.csv')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    loader.load('1d', ['AAPL'])
+
+    assert (cache.stats()['misses'], cache.stats()['entries']) == (2, 1)
+
+
+def test_least_recently_used_frames_are_evicted_past_max_bytes():
+    frames = {key: pd.DataFrame({'Close': range(100)}) for key in 'abc'}
+    nbytes = frames['a'].memory_usage(index=True, deep=True).sum()
+    cache = FrameCache(max_bytes=2 * nbytes)
+    signature = lambda key: ((f'/data/{key}.csv', 0, 0),)
+    load = lambda key: cache.get_or_load(signature(key), None, lambda: frames[key])
+
+    load('a'), load('b'), load('a'), load('c')
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['entries']) == (1, 3, 1, 2)
+    assert stats['bytes'] == 2 * nbytes
+    # 'b' was the least recently used, so loading it again is a miss
+    load('b')
+    assert cache.stats()['misses'] == 4
+
+
+def test_frames_larger_than_the_cache_are_not_kept():
+    cache = FrameCache(max_bytes=10)
+
+    cache.get_or_load((('/data/a.csv', 0, 0),), None, lambda: pd.DataFrame({'Close': range(100)}))
+
+    assert cache.stats()['entries'] == 0 and cache.stats()['bytes'] == 0
@@ -0,0 +1,53 @@
+import logging
+
+from data_pipeline import download_multiple_tickers
+from utils.downloader import ConcurrentDownloader, FakePriceProvider, RateLimiter
+from utils.storage import PriceStore
+
+
+def test_failing_symbol_is_reported_without_aborting_the_batch():
+    provider = FakePriceProvider(bars=20, failures={'MSFT': 2, 'BAD': 100})
+    delays = []
+    downloader = ConcurrentDownloader(provider.history, max_workers=4, max_retries=3, backoff=0.5, jitter=0,
+                                      sleep=delays.append)
+
+    report = downloader.download(['AAPL', 'BAD', 'MSFT', 'AAPL'])
+
+    summary = report.summary().set_index('symbol')
+    assert summary.index.tolist() == ['AAPL', 'BAD', 'MSFT']
+    assert summary['status'].tolist() == ['ok', 'failed', 'ok']
+    assert summary['attempts'].tolist() == [1, 4, 3]
+    assert summary.loc['MSFT', 'rows'] == 20
+    assert isinstance(report.outcomes['BAD'].error, ConnectionError)
+    assert [outcome.symbol for outcome in report.failed()] == ['BAD']
+    # Exponential backoff after each failed attempt but the last: 2 for MSFT, 3 for BAD
+    assert sorted(delays) == [0.5, 0.5, 1.0, 1.0, 2.0]
+    assert provider.calls == {'AAPL': 1, 'BAD': 4, 'MSFT': 3}
+
+
+def test_backoff_is_capped():
+    downloader = ConcurrentDownloader(None, backoff=1, max_backoff=5, jitter=0)
+
+    assert [downloader.backoff_delay(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+
+
+def test_rate_limiter_spaces_requests():
+    now, sleeps = [0.0], []
+    limiter = RateLimiter(requests_per_second=4, clock=lambda: now[0], sleep=sleeps.append)
+
+    for _ in range(3):
+        limiter.wait()
+
+    assert sleeps == [0.25, 0.5]
+
+
+def test_download_multiple_tickers_returns_the_report(tmp_path, caplog):
+    provider = FakePriceProvider(bars=20, failures={'BAD': 100})
+
+    with caplog.at_level(logging.WARNING, logger='data_pipeline'):
+        report = download_multiple_tickers(['AAPL', 'BAD'], interval='1d', max_retries=1,
+                                           store=PriceStore(str(tmp_path)), price_provider=provider)
+
+    assert [outcome.status for outcome in report.outcomes.values()] == ['ok', 'failed']
+    assert PriceStore(str(tmp_path)).symbols('1d') == ['AAPL']
+    assert 'Failed to download BAD after 2 attempts' in caplog.text
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.downloader import FakePriceProvider
+from utils.factor_exposures import RollingExposures, pairwise_exposures, returns_matrix
+from utils.financial_features import FinancialData
+
+
+def returns(rows=200, symbols=('AAPL', 'MSFT', 'SPY'), seed=0):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0, 0.01, rows)
+    data = pd.DataFrame({symbol: 0.5 * (i + 1) * market + rng.normal(0, 0.01, rows)
+                         for i, symbol in enumerate(symbols)},
+                        index=pd.date_range('2024-01-01', periods=rows, freq='D'))
+    # Missing returns, e.g. trading halts or bars one symbol does not have
+    for i, symbol in enumerate(symbols):
+        data.iloc[rng.choice(rows, 10 * i + 5, replace=False), i] = np.nan
+    return data
+
+
+def naive_regression(y, x, window, min_periods):
+    """Beta, correlation, alpha and idiosyncratic volatility from one least-squares fit per window."""
+    rows = []
+    for end in range(len(y)):
+        ys, xs = y[max(end - window + 1, 0):end + 1], x[max(end - window + 1, 0):end + 1]
+        both = ~np.isnan(ys) & ~np.isnan(xs)
+        ys, xs = ys[both], xs[both]
+        n = len(ys)
+        if n < max(min_periods, 2) or np.var(xs) == 0:
+            rows.append((np.nan, np.nan, np.nan, np.nan))
+            continue
+        beta, alpha = np.polyfit(xs, ys, 1)
+        residuals = ys - (alpha + beta * xs)
+        volatility = np.sqrt(residuals @ residuals / (n - 2)) if n > 2 else np.nan
+        rows.append((beta, np.corrcoef(xs, ys)[0, 1], alpha, volatility))
+    return np.array(rows)
+
+
+@pytest.mark.parametrize('window, min_periods', [(20, None), (30, 10)])
+def test_rolling_exposures_match_per_window_regression(window, min_periods):
+    data = returns()
+
+    exposures = RollingExposures(data, 'SPY', window, min_periods)
+
+    for symbol in data.columns:
+        expected = naive_regression(data[symbol].to_numpy(), data['SPY'].to_numpy(), window,
+                                    window if min_periods is None else min_periods)
+        for column, name in enumerate(('beta', 'correlation', 'alpha', 'idiosyncratic_volatility')):
+            np.testing.assert_allclose(getattr(exposures, name)[symbol].to_numpy(), expected[:, column],
+                                       rtol=1e-7, atol=1e-9, err_msg=f'{name} of {symbol}')
+
+
+def test_rolling_exposures_take_a_benchmark_series():
+    data = returns()
+    # Benchmark returns outside the frame, on a longer index
+    benchmark = pd.concat([data['SPY'], pd.Series([0.01], index=[data.index[-1] + pd.Timedelta(days=1)])])
+
+    exposures = RollingExposures(data.drop(columns='SPY'), benchmark, 20)
+
+    expected = RollingExposures(data, 'SPY', 20)
+    pd.testing.assert_frame_equal(exposures.beta, expected.beta[['AAPL', 'MSFT']])
+    pd.testing.assert_frame_equal(exposures.alpha, expected.alpha[['AAPL', 'MSFT']])
+
+
+def test_pairwise_exposures_match_pairwise_complete_statistics():
+    data = returns()
+    window = 50
+
+    exposures = pairwise_exposures(data, window, end=data.index[120], min_periods=30)
+
+    # With missing returns no pair has a full window of observations
+    assert pairwise_exposures(data, window, end=data.index[120])['beta'].isna().all(axis=None)
+    values = data.iloc[71:121]
+    for a in data.columns:
+        for b in data.columns:
+            both = values[list({a, b})].dropna()
+            covariance = np.cov(both[a], both[b])
+            assert exposures['observations'].loc[a, b] == len(both)
+            np.testing.assert_allclose(exposures['covariance'].loc[a, b], covariance[0, 1], rtol=1e-9)
+            np.testing.assert_allclose(exposures['correlation'].loc[a, b], np.corrcoef(both[a], both[b])[0, 1],
+                                       rtol=1e-9)
+            np.testing.assert_allclose(exposures['beta'].loc[a, b], covariance[0, 1] / covariance[1, 1], rtol=1e-9)
+
+
+def prices(symbols, bars=150):
+    frames = []
+    for symbol in symbols:
+        data = FakePriceProvider(bars=bars).make_bars(symbol).reset_index()
+        data['Symbol'] = symbol
+        frames.append(data)
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_financial_data_beta_against_symbol_and_series():
+    data = prices(['AAPL', 'MSFT', 'SPY'])
+    spy = data[data['Symbol'] == 'SPY'].set_index('Date')['Close']
+
+    by_symbol = FinancialData(data.copy()).beta(20, benchmark='SPY')
+    by_series = FinancialData(data.copy()).beta(20, benchmark=spy)
+
+    pd.testing.assert_series_equal(by_series, by_symbol)
+    aapl = data[data['Symbol'] == 'AAPL']
+    expected = naive_regression(aapl['Close'].pct_change().to_numpy(), spy.pct_change().to_numpy(), 20, 20)[:, 0]
+    np.testing.assert_allclose(by_symbol[aapl.index].to_numpy(), expected, rtol=1e-7)
+    assert returns_matrix(data).columns.tolist() == ['AAPL', 'MSFT', 'SPY']
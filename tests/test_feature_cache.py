@@ -0,0 +1,41 @@
+import os
+import time
+
+import numpy as np
+
+from utils.feature_cache import FeatureMatrixCache
+
+
+def test_put_replaces_entries_of_the_same_group(tmp_path):
+    cache = FeatureMatrixCache(str(tmp_path))
+    cache.put('old', {'features': np.zeros(10)}, group='AAPL')
+    cache.put('other', {'features': np.zeros(10)}, group='MSFT')
+
+    entry = cache.put('new', {'features': np.ones(10)}, group='AAPL')
+
+    assert cache.keys() == ['new', 'other']
+    np.testing.assert_array_equal(entry['features'], np.ones(10))
+
+
+def test_put_prunes_least_recently_used_entries_past_max_bytes(tmp_path):
+    cache = FeatureMatrixCache(str(tmp_path), max_bytes=3 * 8200)  # three arrays with their .npy headers
+    for key in ('a', 'b', 'c'):
+        cache.put(key, {'features': np.zeros(1000)})
+    # Reading 'a' makes 'b' the least recently used
+    past = time.time() - 60
+    for key in ('a', 'b', 'c'):
+        os.utime(os.path.join(cache.entry_path(key), 'metadata.json'), (past, past))
+    cache.get('a')
+
+    cache.put('d', {'features': np.zeros(1000)})
+
+    assert cache.keys() == ['a', 'c', 'd']
+    assert cache.size_on_disk() <= 3 * 8200 + 3 * 1000  # plus the metadata files
+
+
+def test_new_entry_is_kept_even_when_larger_than_max_bytes(tmp_path):
+    cache = FeatureMatrixCache(str(tmp_path), max_bytes=100)
+
+    cache.put('big', {'features': np.zeros(1000)})
+
+    assert cache.keys() == ['big']
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.downloader import FakePriceProvider
+from utils.financial_features import FinancialData
+
+
+def prices(symbols, bars=120):
+    frames = []
+    for symbol in symbols:
+        data = FakePriceProvider(bars=bars).make_bars(symbol).reset_index(drop=True)
+        data['Symbol'] = symbol
+        frames.append(data)
+    return pd.concat(frames, ignore_index=True)
+
+
+@pytest.mark.parametrize('backend', ['pandas', 'numpy'])
+def test_multi_symbol_features_match_per_symbol_features(backend):
+    data = prices(['AAPL', 'MSFT', 'GOOG'])
+    # Interleaved rows are sorted by symbol first
+    shuffled = data.iloc[np.argsort(np.tile(np.arange(120), 3), kind='stable')]
+
+    combined = FinancialData(shuffled, backend=backend).get_features()
+
+    expected = pd.concat([FinancialData(group.copy(), backend=backend).get_features()
+                          for _, group in data.groupby('Symbol', sort=False)])
+    pd.testing.assert_frame_equal(combined.loc[expected.index], expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize('backend', ['pandas', 'numpy'])
+def test_time_ordered_multi_symbol_frame_matches_per_symbol_features(backend):
+    # Bars of all symbols interleaved by time under a RangeIndex, as read from a combined dataset
+    data = prices(['AAPL', 'MSFT', 'GOOG'])
+    data = data.iloc[np.argsort(np.tile(np.arange(120), 3), kind='stable')]
+    data.index = pd.RangeIndex(len(data))
+
+    combined = FinancialData(data, backend=backend).get_features()
+
+    expected = pd.concat([FinancialData(data[data['Symbol'] == symbol].copy(), backend=backend).get_features()
+                          for symbol in ['AAPL', 'MSFT', 'GOOG']])
+    pd.testing.assert_frame_equal(combined, expected, rtol=1e-9)
+
+
+def test_symbol_positions_follow_the_reordered_rows():
+    data = prices(['AAPL', 'MSFT'], bars=3)
+    data = data.iloc[[0, 3, 1, 4, 2, 5]]
+
+    financial_data = FinancialData(data)
+
+    assert financial_data.data['Symbol'].tolist() == ['AAPL'] * 3 + ['MSFT'] * 3
+    assert financial_data.symbol_positions.tolist() == [0, 1, 2, 0, 1, 2]
+    assert FinancialData(prices(['AAPL'], bars=3)).symbol_positions is None
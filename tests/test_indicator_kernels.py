@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.financial_features import _group_positions
+from utils.indicator_kernels import NumpyKernels
+
+
+def make_values(symbols=3, length=400, gaps=True, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=symbols * length).cumsum() + 100
+    if gaps:
+        values[rng.random(len(values)) < 0.02] = np.nan
+        values[0] = values[length] = np.nan  # symbols starting on a gap
+    codes = np.repeat(np.arange(symbols), length)
+    return values, codes, _group_positions(codes)
+
+
+def pandas_reference(values, codes, compute):
+    return pd.Series(values).groupby(codes).transform(compute).to_numpy()
+
+
+def kernel_backends():
+    backends = [NumpyKernels()]
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        backends.append(pytest.param(None, marks=pytest.mark.skip(reason='numba is not installed')))
+    else:
+        from utils.indicator_kernels import NumbaKernels
+        backends.append(NumbaKernels())
+    return backends
+
+
+@pytest.fixture(params=kernel_backends(), ids=lambda kernels: getattr(kernels, 'name', 'numba'))
+def kernels(request):
+    return request.param
+
+
+@pytest.mark.parametrize('gaps', [False, True])
+def test_ewm_mean_matches_pandas(kernels, gaps):
+    values, codes, positions = make_values(gaps=gaps)
+
+    result = kernels.ewm_mean(values, 0.1, positions)
+
+    expected = pandas_reference(values, codes, lambda s: s.ewm(alpha=0.1, adjust=False).mean())
+    np.testing.assert_allclose(result, expected, rtol=1e-10)
+
+
+@pytest.mark.parametrize('gaps', [False, True])
+def test_rolling_mean_matches_pandas(kernels, gaps):
+    values, codes, positions = make_values(gaps=gaps)
+
+    result = kernels.rolling_mean(values, 14, positions)
+
+    expected = pandas_reference(values, codes, lambda s: s.rolling(14).mean())
+    np.testing.assert_allclose(result, expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize('gaps', [False, True])
+def test_rolling_std_matches_pandas(kernels, gaps):
+    values, codes, positions = make_values(gaps=gaps)
+
+    result = kernels.rolling_std(values, 14, positions)
+
+    expected = pandas_reference(values, codes, lambda s: s.rolling(14).std())
+    np.testing.assert_allclose(result, expected, rtol=1e-7)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from sklearn.preprocessing import MinMaxScaler
+
+from utils.inference import BatchPredictor, LoadedModel, ModelCache, PredictionRequest, saved_models
+
+
+class FirstFeature:
+    """Predicts the scaled target as the last scaled value of the first feature; counts its calls."""
+
+    def __init__(self):
+        self.shapes = []
+
+    def predict_on_batch(self, windows):
+        self.shapes.append(windows.shape)
+        return windows[:, -1, :1]
+
+
+class Loader:
+    def __init__(self, lookback=3, missing=()):
+        self.lookback = lookback
+        self.missing = missing
+        self.loaded = []
+
+    def __call__(self, models_dir, symbol, interval):
+        self.loaded.append((symbol, interval))
+        if symbol in self.missing:
+            raise FileNotFoundError(f'No model for {symbol}')
+        # Features span [0, 10] and the target [100, 200], so a feature value x is predicted as 100 + 10x
+        feature_scaler = MinMaxScaler().fit(np.array([[0.0, 0.0], [10.0, 1.0]]))
+        target_scaler = MinMaxScaler().fit(np.array([[100.0], [200.0]]))
+        return LoadedModel(symbol, interval, FirstFeature(), feature_scaler, target_scaler, self.lookback)
+
+
+def test_model_cache_evicts_the_least_recently_used_model():
+    load = Loader()
+    cache = ModelCache(max_models=2, load=load)
+
+    for symbol in ['AAPL', 'MSFT', 'AAPL', 'TSLA', 'MSFT', 'AAPL']:
+        cache.get(symbol, '1d')
+
+    # TSLA evicts MSFT (AAPL was used more recently), then MSFT evicts AAPL
+    assert [symbol for symbol, _ in load.loaded] == ['AAPL', 'MSFT', 'TSLA', 'MSFT', 'AAPL']
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['loaded']) == (1, 5, 3, 2)
+
+
+def window(last, rows=5):
+    """An unscaled ``(rows, 2)`` window whose first feature ends at ``last``."""
+    return np.column_stack([np.linspace(0, last, rows), np.zeros(rows)])
+
+
+def test_batch_predictor_groups_requests_per_model_in_micro_batches():
+    load = Loader(missing=('FB',))
+    predictor = BatchPredictor(cache=ModelCache(load=load), micro_batch_size=2)
+    requests = [PredictionRequest('AAPL', '1d', window(1)), PredictionRequest('MSFT', '1d', window(2)),
+                PredictionRequest('AAPL', '1d', window(3)), PredictionRequest('FB', '1d', window(4)),
+                PredictionRequest('AAPL', '1h', window(5)), PredictionRequest('AAPL', '1d', window(6))]
+
+    report = predictor.predict(requests)
+
+    # Every model is loaded once, in order of its first request
+    assert load.loaded == [('AAPL', '1d'), ('MSFT', '1d'), ('FB', '1d'), ('AAPL', '1h')]
+    assert predictor.cache.get('AAPL', '1d').model.shapes == [(2, 3, 2), (1, 3, 2)]
+    assert report.predictions[:3] == pytest.approx([110.0, 120.0, 130.0])
+    assert report.predictions[3] is None and report.errors[3] == 'FileNotFoundError: No model for FB'
+    assert report.predictions[4:] == pytest.approx([150.0, 160.0])
+    assert [error is None for error in report.errors] == [True, True, True, False, True, True]
+    assert all(latency is not None for latency in report.latencies)
+    assert report.summary()['prediction'].isna().sum() == 1
+
+
+def test_windows_longer_than_the_lookback_use_their_latest_rows():
+    predictor = BatchPredictor(cache=ModelCache(load=Loader(lookback=3)))
+
+    report = predictor.predict([PredictionRequest('AAPL', '1d', window(5, rows=10))])
+
+    assert predictor.cache.get('AAPL', '1d').model.shapes == [(1, 3, 2)]
+    assert report.predictions == pytest.approx([150.0])
+
+
+def test_saved_models_parse_symbol_and_interval(tmp_path):
+    for name in ['AAPL_1d_model.h5', 'BRK_B_1h_model.h5', 'MSFT_1d_model.h5', 'AAPL_1d_scalers.pkl', 'notes.txt']:
+        (tmp_path / name).touch()
+
+    assert saved_models(tmp_path) == [('AAPL', '1d'), ('BRK_B', '1h'), ('MSFT', '1d')]
+    assert saved_models(tmp_path, interval='1d') == [('AAPL', '1d'), ('MSFT', '1d')]
@@ -0,0 +1,91 @@
+import pytest
+
+import utils.metadata_cache as metadata_cache
+from utils.downloader import FakePriceProvider
+from utils.metadata_cache import SymbolMetadataCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+class FlakyInfo:
+    """FakePriceProvider.info that fails for the symbols in ``down``."""
+
+    def __init__(self):
+        self.provider = FakePriceProvider()
+        self.down = set()
+
+    def __call__(self, symbol):
+        if symbol in self.down:
+            raise ConnectionError(f'{symbol} is down')
+        return self.provider.info(symbol)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(metadata_cache, 'time', clock)
+    return clock
+
+
+def test_payloads_are_fetched_once_and_persisted(tmp_path, clock):
+    fetch = FlakyInfo()
+    path = str(tmp_path / 'metadata.sqlite3')
+    cache = SymbolMetadataCache(path, ttl=60, fetch=fetch)
+
+    assert cache.get('AAPL')['shortName'] == 'AAPL Inc.'
+    cache.get('AAPL')
+    # A new cache (e.g. another process) reads the payload from SQLite
+    assert SymbolMetadataCache(path, ttl=60, fetch=fetch).get('AAPL')['shortName'] == 'AAPL Inc.'
+
+    assert fetch.provider.calls == {'AAPL': 1}
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'stale_hits': 0, 'in_memory': 1}
+
+
+def test_expired_payloads_are_refetched(tmp_path, clock):
+    fetch = FlakyInfo()
+    cache = SymbolMetadataCache(str(tmp_path / 'metadata.sqlite3'), ttl=60, fetch=fetch)
+    cache.get('AAPL')
+
+    clock.now += 59
+    cache.get('AAPL')
+    clock.now += 1
+    cache.get('AAPL')
+
+    assert fetch.provider.calls == {'AAPL': 2}
+
+
+def test_stale_payload_is_served_when_the_refetch_fails(tmp_path, clock):
+    fetch = FlakyInfo()
+    cache = SymbolMetadataCache(str(tmp_path / 'metadata.sqlite3'), ttl=60, fetch=fetch)
+    info = cache.get('AAPL')
+    fetch.down = {'AAPL', 'MSFT'}
+    clock.now += 120
+
+    assert cache.get('AAPL') == info
+    assert cache.stats()['stale_hits'] == 1
+    with pytest.raises(ConnectionError):
+        cache.get('MSFT')
+
+
+def test_get_many_fetches_only_missing_and_expired_symbols(tmp_path, clock):
+    fetch = FlakyInfo()
+    cache = SymbolMetadataCache(str(tmp_path / 'metadata.sqlite3'), ttl=60, fetch=fetch)
+    cache.get('AAPL')
+    clock.now += 30
+    cache.get('MSFT')
+    clock.now += 40  # AAPL has expired, MSFT has not
+    fetch.down = {'AAPL', 'GOOG'}
+
+    infos = cache.get_many(['GOOG', 'MSFT', 'AAPL', 'NVDA', 'MSFT'], max_retries=0)
+
+    # GOOG failed without a cached copy; AAPL's refetch failed, so its stale copy is served
+    assert list(infos) == ['MSFT', 'AAPL', 'NVDA']
+    assert infos['NVDA']['shortName'] == 'NVDA Inc.'
+    assert fetch.provider.calls == {'AAPL': 1, 'MSFT': 1, 'NVDA': 1}
+    assert cache.stats() == {'hits': 1, 'misses': 5, 'stale_hits': 1, 'in_memory': 3}
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from models.Pipeline import Pipeline
+from utils.pipeline_utils.data_manipulation import normalize, replace_nan
+
+ADD_RANGE = '''
+def add_range(data, high='High', low='Low'):
+    data['Range'] = data[high] - data[low]
+    return data
+'''
+
+
+def prices(rows=1_000, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, rows).cumsum()
+    data = pd.DataFrame({'Close': close, 'High': close + rng.uniform(0, 1, rows), 'Low': close - 1,
+                         'Volume': rng.integers(1_000, 10_000, rows).astype('float64')})
+    data.loc[rng.choice(rows, 20, replace=False), 'Volume'] = np.nan
+    return data
+
+
+def pipeline(data=None):
+    pipeline = Pipeline(data, cache=False)
+    pipeline.add_step(replace_nan, {'value': 0})
+    pipeline.add_step(ADD_RANGE, streaming={'mode': 'row'})
+    pipeline.add_step(normalize, {'columns': ['Close', 'Volume', 'Range']})
+    return pipeline
+
+
+def test_chunked_normalize_matches_in_memory_normalize(tmp_path):
+    data = prices()
+    in_memory = pipeline(data)
+    in_memory.run(memory=None)
+
+    streamed = pipeline().run_streaming(data, chunksize=128)
+    output = str(tmp_path / 'out.parquet')
+    rows = pipeline().run_streaming(data, output, chunksize=128)
+
+    assert rows == len(data)
+    pd.testing.assert_frame_equal(streamed, in_memory.intermediate_data)
+    pd.testing.assert_frame_equal(pd.read_parquet(output), in_memory.intermediate_data)
+    assert in_memory.intermediate_data[['Close', 'Volume', 'Range']].agg(['min', 'max']).values.tolist() == \
+        [[0, 0, 0], [1, 1, 1]]
+
+
+def test_saved_plan_loads_into_an_equivalent_pipeline(tmp_path):
+    data = prices()
+    original = pipeline(data)
+    original.add_column_operation(normalize, ['High'])
+    path = str(tmp_path / 'plan.json')
+
+    original.save_plan(path)
+    loaded = Pipeline.load_plan(path, data, cache=False)
+
+    assert loaded.to_plan()['steps'] == original.to_plan()['steps']
+    original.run(memory=None)
+    loaded.run(memory=None)
+    pd.testing.assert_frame_equal(loaded.intermediate_data, original.intermediate_data)
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+import utils.step_profiling as step_profiling
+from utils.introspection import FunctionMetadata
+from utils.step_profiling import StepProfiler
+
+
+def add_total(data):
+    data['Total'] = data.sum(axis=1)
+    return data
+
+
+def run_step(memory):
+    profiler = StepProfiler(memory)
+    with profiler:
+        profiler.run(0, FunctionMetadata(add_total), pd.DataFrame({'a': range(1000), 'b': range(1000)}))
+    return profiler.report()
+
+
+@pytest.mark.parametrize('memory', ['rss', 'tracemalloc'])
+def test_steps_are_measured(memory):
+    report = run_step(memory)
+
+    step = report['step_reports'][0]
+    assert (step['rows_in'], step['columns_in'], step['rows_out'], step['columns_out']) == (1000, 2, 1000, 3)
+    assert step['peak_memory'] >= 0 and step['wall_time'] >= 0
+
+
+def test_unreadable_rss_peak_is_reported_as_unknown(monkeypatch):
+    monkeypatch.setattr(step_profiling, 'reset_peak_rss', lambda: 0)
+    monkeypatch.setattr(step_profiling, 'peak_rss', lambda: None)
+
+    report = run_step('rss')
+
+    assert report['memory_method'] == 'rss'
+    assert report['step_reports'][0]['peak_memory'] is None and report['peak_memory'] is None
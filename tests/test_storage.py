@@ -0,0 +1,32 @@
+import os
+
+import pandas as pd
+
+from utils.downloader import FakePriceProvider
+from utils.storage import PriceStore, migrate_csv_directory
+
+
+def test_migrated_csv_reads_back_like_the_csv(tmp_path):
+    bars = FakePriceProvider(bars=50).make_bars('AAPL')
+    bars['Symbol'] = 'AAPL'
+    path = tmp_path / 'AAPL_1d_data.csv'
+    bars.to_csv(path)
+
+    migrated, skipped = migrate_csv_directory(str(tmp_path))
+
+    assert migrated == [('AAPL', '1d')] and skipped == []
+    stored = PriceStore(str(tmp_path)).read('1d', 'AAPL')
+    expected = pd.read_csv(path)
+    pd.testing.assert_index_equal(stored.columns, expected.columns)
+    pd.testing.assert_series_equal(stored['Date'], pd.to_datetime(expected['Date'], utc=True))
+    pd.testing.assert_frame_equal(stored.drop(columns=['Date', 'Symbol']), expected.drop(columns=['Date', 'Symbol']))
+    assert stored['Symbol'].tolist() == expected['Symbol'].tolist()
+
+
+def test_migration_skips_stored_partitions_unless_overwritten(tmp_path):
+    FakePriceProvider(bars=10).make_bars('MSFT').to_csv(tmp_path / 'MSFT_1d_data.csv')
+    migrate_csv_directory(str(tmp_path))
+
+    assert migrate_csv_directory(str(tmp_path)) == ([], [('MSFT', '1d', 'already stored')])
+    assert migrate_csv_directory(str(tmp_path), overwrite=True, remove_csv=True) == ([('MSFT', '1d')], [])
+    assert not os.path.exists(tmp_path / 'MSFT_1d_data.csv')
@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.financial_features import FinancialData
+from utils.streaming_indicators import EMA, StreamingFeatures, StreamingIndicator
+
+# Sharpe and Sortino ratios have no streaming counterpart
+FEATURES = [name for name in FinancialData.feature_names() if name not in ('Sharpe Ratio', 'Sortino Ratio')]
+
+
+def bars(rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, rows).cumsum()
+    return pd.DataFrame({'Close': close, 'High': close + rng.uniform(0, 1, rows),
+                         'Low': close - rng.uniform(0, 1, rows), 'Volume': rng.integers(1_000, 10_000, rows)},
+                        index=pd.date_range('2024-01-01', periods=rows, freq='D'))
+
+
+def test_streaming_features_match_batch_features():
+    data = bars()
+    expected = FinancialData(data.copy()).get_features()[FEATURES]
+
+    streamed = StreamingFeatures().update_frame(data)[FEATURES]
+
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False, rtol=1e-9)
+
+
+def test_restored_snapshot_continues_like_an_uninterrupted_stream():
+    data = bars()
+    uninterrupted = StreamingFeatures(bollinger_window=20)
+    expected = uninterrupted.update_frame(data)
+
+    first = StreamingFeatures(bollinger_window=20)
+    head = first.update_frame(data.iloc[:150])
+    restored = StreamingIndicator.restore(json.loads(json.dumps(first.snapshot())))
+    tail = restored.update_frame(data.iloc[150:])
+
+    pd.testing.assert_frame_equal(pd.concat([head, tail]), expected)
+
+
+def test_ema_matches_pandas_over_gaps():
+    values = [np.nan, np.nan, 1.0, np.nan, np.nan, 3.0, 3.0, 5.0, np.nan, 2.0, 4.0]
+    ema = EMA(3)
+    head = ema.update_many(values[:4])
+    # A snapshot taken inside a gap keeps the decayed weight
+    restored = StreamingIndicator.restore(json.loads(json.dumps(ema.snapshot())))
+
+    streamed = head + restored.update_many(values[4:])
+
+    np.testing.assert_allclose(streamed, pd.Series(values).ewm(span=3, adjust=False).mean(), rtol=1e-12)
+
+
+def test_streaming_features_match_batch_features_over_a_gap():
+    data = bars()
+    data.iloc[100:103, data.columns.get_loc('Close')] = np.nan
+    expected = FinancialData(data.copy()).get_features()[FEATURES]
+
+    streamed = StreamingFeatures().update_frame(data)[FEATURES]
+
+    # Streamed returns do not carry the last close over the gap (see StreamingFeatures)
+    returns = ['Price Percentage Change', 'ROI']
+    assert streamed[returns].iloc[100:104].isna().all(axis=None)
+    pd.testing.assert_frame_equal(streamed.drop(columns=returns), expected.drop(columns=returns),
+                                  check_dtype=False, rtol=1e-9)
@@ -0,0 +1,69 @@
+import json
+import os
+
+from utils.training import train_parallel, train_symbol, training_jobs
+
+
+class FakeLoader:
+    def intervals(self):
+        return ['1d', '1h']
+
+    def symbols(self, interval):
+        return {'1d': ['AAPL', 'MSFT', 'TSLA'], '1h': ['AAPL']}[interval]
+
+
+def test_training_jobs_cover_the_stored_partitions():
+    assert training_jobs(FakeLoader()) == [('1d', 'AAPL'), ('1d', 'MSFT'), ('1d', 'TSLA')]
+    assert training_jobs(FakeLoader(), 'all', ['AAPL', 'TSLA']) == [('1d', 'AAPL'), ('1d', 'TSLA'), ('1h', 'AAPL')]
+
+
+def stub_train(interval, symbol, models_dir, epochs, batch_size):
+    """Stands in for ``train_symbol`` in the pool workers; BAD fails and CRASH kills its worker."""
+    if symbol == 'CRASH':
+        os._exit(1)
+    entry = {'interval': interval, 'symbol': symbol, 'status': 'succeeded',
+             'model_path': os.path.join(models_dir, f'{symbol}_{interval}_model.h5'),
+             'metrics': {'epochs_saved': 2, 'threads': os.environ['OMP_NUM_THREADS']}, 'error': None}
+    if symbol == 'BAD':
+        entry.update(status='failed', model_path=None, metrics=None, error='ValueError: no data')
+    return entry
+
+
+def statuses(manifest):
+    return {entry['symbol']: entry['status'] for entry in manifest['jobs']}
+
+
+def test_failed_and_crashed_jobs_are_recorded_and_the_others_finish(tmp_path):
+    jobs = [('1d', symbol) for symbol in ['AAPL', 'BAD', 'CRASH', 'MSFT']]
+
+    manifest = train_parallel(jobs, str(tmp_path), max_workers=2, threads_per_worker=1, epochs=3, train=stub_train)
+
+    assert statuses(manifest) == {'AAPL': 'succeeded', 'BAD': 'failed', 'CRASH': 'failed', 'MSFT': 'succeeded'}
+    assert (manifest['succeeded'], manifest['failed'], manifest['epochs_saved']) == (2, 2, 4)
+    crashed = next(entry for entry in manifest['jobs'] if entry['symbol'] == 'CRASH')
+    assert crashed['error'].startswith('Worker process died')
+    # Workers are capped to their share of threads
+    assert {entry['metrics']['threads'] for entry in manifest['jobs'] if entry['metrics']} == {'1'}
+    manifests = list((tmp_path / 'manifests').glob('run-*.json'))
+    assert len(manifests) == 1 and json.loads(manifests[0].read_text())['jobs'] == manifest['jobs']
+
+
+def test_resume_skips_the_jobs_that_succeeded(tmp_path):
+    first = train_parallel([('1d', 'AAPL'), ('1d', 'BAD')], str(tmp_path), max_workers=1, threads_per_worker=1,
+                           manifest_path=str(tmp_path / 'run.json'), train=stub_train)
+    succeeded = first['jobs'][[entry['symbol'] for entry in first['jobs']].index('AAPL')]
+
+    resumed = train_parallel([('1d', 'AAPL'), ('1d', 'BAD'), ('1d', 'MSFT')], str(tmp_path), max_workers=1,
+                             threads_per_worker=1, train=stub_train, resume=str(tmp_path / 'run.json'))
+
+    assert resumed['jobs'][0] == succeeded
+    assert [entry['symbol'] for entry in resumed['jobs'][1:]] == ['BAD', 'MSFT']
+    assert resumed['resumed_from'] == str(tmp_path / 'run.json')
+    assert json.loads((tmp_path / 'run.json').read_text())['jobs'] == resumed['jobs']
+
+
+def test_train_symbol_reports_errors_instead_of_raising(tmp_path):
+    entry = train_symbol('1d', 'NO_SUCH_SYMBOL', str(tmp_path), epochs=1)
+
+    assert entry['status'] == 'failed' and entry['model_path'] is None
+    assert entry['error'] and 'Traceback' in entry['traceback']
@@ -0,0 +1,63 @@
+import json
+import time
+
+import pytest
+
+from utils.universe import ConstituentUniverse
+
+# Today's members and the changes that led to them, oldest first
+SNAPSHOT = {'constituents': ['AAPL', 'MSFT', 'NVDA', 'TSLA'],
+            'changes': [{'date': '2019-03-01', 'added': 'MSFT', 'removed': None},
+                        {'date': '2020-12-21', 'added': 'TSLA', 'removed': 'AIV'},
+                        {'date': '2022-06-01', 'added': 'NVDA', 'removed': 'XRX'},
+                        {'date': '2022-06-01', 'added': None, 'removed': 'FB'}]}
+
+
+def offline(*args):
+    raise ConnectionError('no network')
+
+
+@pytest.fixture
+def universe(tmp_path):
+    path = tmp_path / 'sp500_constituents.json'
+    path.write_text(json.dumps(dict(SNAPSHOT, fetched_at=time.time())))
+    return ConstituentUniverse(str(path), fetch=offline)
+
+
+@pytest.mark.parametrize('as_of, members', [
+    (None, ['AAPL', 'MSFT', 'NVDA', 'TSLA']),
+    ('2023-01-01', ['AAPL', 'MSFT', 'NVDA', 'TSLA']),
+    # Changes on the as-of date have already happened
+    ('2022-06-01', ['AAPL', 'MSFT', 'NVDA', 'TSLA']),
+    ('2022-05-31', ['AAPL', 'FB', 'MSFT', 'TSLA', 'XRX']),
+    ('2020-12-20', ['AAPL', 'AIV', 'FB', 'MSFT', 'XRX']),
+    ('2019-01-01', ['AAPL', 'AIV', 'FB', 'XRX']),
+])
+def test_constituents_as_of_undo_later_changes(universe, as_of, members):
+    assert universe.constituents(as_of=as_of) == members
+
+
+def test_stale_snapshot_is_used_when_the_refresh_fails(tmp_path):
+    path = tmp_path / 'sp500_constituents.json'
+    path.write_text(json.dumps(dict(SNAPSHOT, fetched_at=0)))
+    universe = ConstituentUniverse(str(path), fetch=offline)
+
+    with pytest.warns(UserWarning, match='Could not refresh constituents'):
+        assert universe.constituents() == SNAPSHOT['constituents']
+
+
+def test_refresh_writes_the_snapshot(tmp_path):
+    path = tmp_path / 'sp500_constituents.json'
+    universe = ConstituentUniverse(str(path), fetch=lambda: (['MSFT', 'AAPL'], list(reversed(SNAPSHOT['changes']))))
+
+    assert universe.constituents(as_of='2020-01-01') == ['AAPL', 'AIV', 'FB', 'MSFT', 'XRX']
+    saved = json.loads(path.read_text())
+    assert saved['constituents'] == ['AAPL', 'MSFT']
+    assert [change['date'] for change in saved['changes']] == ['2019-03-01', '2020-12-21', '2022-06-01', '2022-06-01']
+
+
+def test_missing_snapshot_without_network_raises(tmp_path):
+    universe = ConstituentUniverse(str(tmp_path / 'sp500_constituents.json'), fetch=offline)
+
+    with pytest.raises(RuntimeError, match='No constituent snapshot'):
+        universe.constituents()
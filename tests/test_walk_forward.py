@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.walk_forward import WalkForward, fold_summary, fold_table, walk_forward_folds
+
+
+def bounds(folds):
+    return [(fold.train_start, fold.train_stop, fold.test_start, fold.test_stop) for fold in folds]
+
+
+def test_expanding_folds_train_on_everything_before_their_test_block():
+    assert bounds(walk_forward_folds(100, 3)) == [(0, 25, 25, 50), (0, 50, 50, 75), (0, 75, 75, 100)]
+
+
+def test_rolling_folds_keep_the_first_fold_training_size_and_leave_a_gap():
+    assert bounds(walk_forward_folds(100, 3, mode='rolling', gap=2)) == \
+        [(0, 23, 25, 50), (25, 48, 50, 75), (50, 73, 75, 100)]
+    assert bounds(walk_forward_folds(100, 2, test_size=10, mode='rolling', train_size=30)) == \
+        [(50, 80, 80, 90), (60, 90, 90, 100)]
+
+
+def test_too_few_rows_for_the_folds_raise():
+    with pytest.raises(ValueError, match='too few'):
+        walk_forward_folds(10, 3, min_train_size=5)
+    with pytest.raises(ValueError, match='Unknown walk-forward mode'):
+        walk_forward_folds(100, 3, mode='sliding')
+
+
+class StubNetwork:
+    """Predicts the scaled target as the previous row's scaled value of the first feature."""
+
+    def __init__(self):
+        self.layers = []
+
+    def predict(self, sequence, verbose=0):
+        return np.concatenate([sequence[batch][0][:, -2, :1] for batch in range(len(sequence))])
+
+
+class StubModel:
+    """The parts of LSTMModel that WalkForward uses; records what each fold trained on."""
+
+    def __init__(self, features, target, lookback=5, epochs=3):
+        self.features, self.target = features, target
+        self.lookback, self.batch_size, self.epochs = lookback, 8, epochs
+        self.model = StubNetwork()
+        self.trained = []
+
+    def feature_matrix(self):
+        return self.features, self.target, None, ['x']
+
+    def reset_model(self):
+        self.model = StubNetwork()
+
+    def build_model(self, input_shape):
+        self.model.layers.append(input_shape)
+
+    def train_model(self, train, epochs=None, fold=None):
+        self.trained.append({'fold': fold, 'epochs': epochs, 'features': train.features, 'ends': train.ends})
+        return {'loss': [0.1] * epochs}
+
+
+@pytest.mark.parametrize('warm_start', [True, False])
+def test_folds_fit_on_their_training_rows_only(warm_start):
+    # The target is the feature itself, so the stub predicts the previous row's value
+    values = np.arange(60, dtype='float64')
+    model = StubModel(values.reshape(-1, 1), values)
+
+    rows = WalkForward(3, warm_start=warm_start, fine_tune_epochs=1).evaluate(model)
+
+    assert [row['fold'] for row in rows] == [fold['fold'] for fold in model.trained] == [0, 1, 2]
+    assert [row['warm_start'] for row in rows] == [False, warm_start, warm_start]
+    assert [row['epochs'] for row in rows] == [3, 1, 1] if warm_start else [3, 3, 3]
+    for row, fold in zip(rows, model.trained):
+        # Scaled on the training rows, the last training row maps to 1; training windows end inside them
+        assert fold['features'][fold['ends'][-1], 0] == pytest.approx(1.0)
+        # train_end is the last training row, inclusive
+        assert row['train_samples'] == row['train_end'] - row['train_start'] - model.lookback + 2
+        assert row['test_samples'] == 15 and row['mae'] == pytest.approx(1.0)
+
+
+def test_fold_summary_skips_failed_folds():
+    table = fold_table([{'interval': '1d', 'symbol': 'AAPL', 'fold': 1, 'mse': 3.0, 'error': None},
+                        {'interval': '1d', 'symbol': 'AAPL', 'fold': 0, 'mse': 1.0, 'error': None},
+                        {'interval': '1d', 'symbol': 'AAPL', 'fold': 2, 'error': 'ValueError: no data'}])
+
+    assert table['fold'].tolist() == [0, 1, 2]
+    summary = fold_summary(table)
+    assert summary.loc[('1d', 'AAPL'), ('mse', 'mean')] == 2.0
+    assert pd.isna(table.loc[2, 'mse'])
@@ -0,0 +1,114 @@
+import json
+import math
+import os
+import shutil
+
+from tensorflow.keras.callbacks import Callback
+from tensorflow.keras.models import load_model
+
+from utils.file_utils import write_json
+
+MODEL_FILE = 'checkpoint.keras'
+BEST_WEIGHTS_FILE = 'best.weights.h5'
+STATE_FILE = 'state.json'
+
+
+def checkpoint_dir(checkpoints_dir, symbol, interval, fold=None):
+    # Walk-forward folds train separate models, so each gets its own directory
+    name = f'{symbol}_{interval}' if fold is None else f'{symbol}_{interval}_fold{fold}'
+    return os.path.join(checkpoints_dir, name)
+
+
+class ResumableTraining(Callback):
+    """Early stopping plus periodic checkpoints that let an interrupted ``fit`` carry on where it stopped.
+
+    Training stops once ``monitor`` has not improved by ``min_delta`` for ``patience`` epochs, and
+    the best weights are restored at the end. With a ``directory``, every ``every`` epochs the
+    whole model (weights and optimizer state) is saved there together with the epoch, the early
+    stopping counters and the loss history; ``restore`` loads them back so a new ``fit`` can
+    continue from ``initial_epoch``. ``config`` describes the run (features, look-back, ...); a
+    checkpoint saved with a different one is discarded instead of resumed.
+    """
+
+    def __init__(self, directory=None, monitor='val_loss', patience=5, min_delta=0.0, every=1, config=None):
+        super().__init__()
+        self.directory = directory
+        self.monitor = monitor
+        self.patience = patience
+        self.min_delta = min_delta
+        self.every = every
+        self.config = json.loads(json.dumps(config or {}, default=str))
+        self.state = self.initial_state()
+
+    def initial_state(self):
+        return {'config': self.config, 'epoch': 0, 'best': math.inf, 'best_epoch': None, 'wait': 0,
+                'stopped_early': False, 'finished': False, 'resumed_from': None, 'history': {}}
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def restore(self):
+        """The checkpointed model, or None when there is no usable checkpoint."""
+        if self.directory is None or not os.path.exists(self.path(STATE_FILE)):
+            return None
+        with open(self.path(STATE_FILE)) as file:
+            state = json.load(file)
+        if state.get('config') != self.config or not os.path.exists(self.path(MODEL_FILE)):
+            print(f'Discarding checkpoint in {self.directory}: it was saved for a different run.')
+            self.clear()
+            return None
+        model = load_model(self.path(MODEL_FILE))
+        self.state = dict(state, resumed_from=state['epoch'])
+        return model
+
+    def clear(self):
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self.state = self.initial_state()
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # The model is written before the state, so a saved state never points past the saved model
+        tmp_path = self.path(f'tmp-{MODEL_FILE}')
+        self.model.save(tmp_path)
+        os.replace(tmp_path, self.path(MODEL_FILE))
+        write_json(self.state, self.path(STATE_FILE))
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs or {}
+        for name, value in logs.items():
+            self.state['history'].setdefault(name, []).append(float(value))
+        self.state['epoch'] = epoch + 1
+
+        current = logs.get(self.monitor)
+        if current is not None and current < self.state['best'] - self.min_delta:
+            self.state.update(best=float(current), best_epoch=epoch + 1, wait=0)
+            if self.directory is not None:
+                os.makedirs(self.directory, exist_ok=True)
+                self.model.save_weights(self.path(BEST_WEIGHTS_FILE))
+            else:
+                self._best_weights = self.model.get_weights()
+        elif current is not None:
+            self.state['wait'] += 1
+            if self.state['wait'] >= self.patience:
+                self.state['stopped_early'] = True
+                self.model.stop_training = True
+
+        if self.directory is not None and (self.model.stop_training or (epoch + 1) % self.every == 0):
+            self.save()
+
+    def on_train_end(self, logs=None):
+        if self.state['best_epoch'] is not None and self.state['best_epoch'] < self.state['epoch']:
+            if self.directory is not None:
+                self.model.load_weights(self.path(BEST_WEIGHTS_FILE))
+            else:
+                self.model.set_weights(self._best_weights)
+        self.state['finished'] = True
+        if self.directory is not None:
+            self.save()
+
+    def summary(self, max_epochs):
+        """Epoch counts of the run, for the training metrics and manifest."""
+        return {'epochs_run': self.state['epoch'], 'epochs_saved': max(0, max_epochs - self.state['epoch']),
+                'best_epoch': self.state['best_epoch'], 'stopped_early': self.state['stopped_early'],
+                'resumed_from': self.state['resumed_from']}
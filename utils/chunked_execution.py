@@ -0,0 +1,229 @@
+import functools
+import inspect
+import os
+
+import pandas as pd
+
+from utils.step_cache import copy_data
+
+STREAMING_MODES = ('row', 'window', 'global')
+
+
+def row_local(func):
+    """Declare a step whose output rows depend only on the same input rows; it runs chunk by chunk."""
+    func.streaming = {'mode': 'row'}
+    return func
+
+
+def rolling_window(lookback):
+    """Declare a step whose rows depend on up to ``lookback`` preceding rows (e.g. a rolling mean of
+    ``lookback + 1`` rows). It must return one row per input row; chunks are extended with the
+    previous chunk's last ``lookback`` rows and those rows are dropped from the output again."""
+    def decorate(func):
+        func.streaming = {'mode': 'window', 'lookback': lookback}
+        return func
+    return decorate
+
+
+def two_pass(fit, combine):
+    """Declare a global step computed from whole-data statistics, streamed in two passes.
+
+    The first pass calls ``fit(chunk, **params)`` on every chunk and ``combine(partials)`` on the
+    results; the second runs the step on every chunk with ``state=`` the combined statistics. The
+    decorated function takes that ``state`` argument, but the step it returns does not show it
+    (the Pipeline page asks for every parameter it shows): run in memory without one, it fits
+    the state on the whole input first.
+    """
+    def decorate(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def step(data, *args, state=None, **kwargs):
+            if state is None:
+                state = combine([fit(data, *args, **kwargs)])
+            return func(data, *args, state=state, **kwargs)
+
+        step.__signature__ = signature.replace(parameters=[param for param in signature.parameters.values()
+                                                           if param.name != 'state'])
+        step.streaming = {'mode': 'global', 'fit': fit, 'combine': combine}
+        return step
+    return decorate
+
+
+def global_step(func):
+    """Declare a step that needs every row at once; streaming it means loading the whole input."""
+    func.streaming = {'mode': 'global'}
+    return func
+
+
+def step_streaming(step):
+    """A step's streaming declaration, or None when it has none."""
+    return getattr(step, 'streaming', None) or getattr(step.func, 'streaming', None)
+
+
+def iter_chunks(source, chunksize):
+    """DataFrames of at most ``chunksize`` rows from a DataFrame, a CSV or Parquet path, or a
+    callable returning an iterator of DataFrames. Each call starts from the beginning again."""
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+    elif isinstance(source, (str, os.PathLike)):
+        extension = os.path.splitext(os.fspath(source))[1].lower()
+        if extension == '.csv':
+            yield from pd.read_csv(source, chunksize=chunksize)
+        elif extension == '.parquet':
+            import pyarrow.parquet as pq
+
+            offset = 0
+            for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+                chunk = batch.to_pandas()
+                if isinstance(chunk.index, pd.RangeIndex):
+                    # Keep row labels increasing across batches, as they are for CSV chunks
+                    chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+                offset += len(chunk)
+                yield chunk
+        else:
+            raise ValueError(f'Cannot stream {source}: only CSV and Parquet files are supported.')
+    elif callable(source):
+        yield from source()
+    else:
+        raise TypeError(f'Cannot stream a {type(source).__name__}; pass a DataFrame, a file path or a callable.')
+
+
+def _row_stream(step, chunks):
+    for chunk in chunks:
+        yield step.apply(copy_data(chunk))
+
+
+def _window_stream(step, chunks, lookback):
+    carry = None
+    for chunk in chunks:
+        data = chunk if carry is None or not lookback else pd.concat([carry, chunk])
+        output = step.apply(copy_data(data))
+        if len(output) != len(data):
+            raise ValueError(f'Window step {step.func_name} returned {len(output)} rows for {len(data)}; window '
+                             f'steps must return one row per input row.')
+        yield output.iloc[len(data) - len(chunk):]
+        # The tail may span several short chunks, so it is taken from the extended input
+        carry = data.iloc[len(data) - min(lookback, len(data)):] if lookback else None
+
+
+def _transform_stream(step, chunks, state):
+    for chunk in chunks:
+        yield step.apply(copy_data(chunk), state=state)
+
+
+def _materialized_stream(step, chunks, chunksize):
+    data = pd.concat(list(chunks))
+    yield from iter_chunks(step.apply(data), chunksize)
+
+
+def stream_steps(steps, chunks, chunksize, states, materialize=False):
+    """Chain ``steps`` over an iterator of chunks as generators; nothing runs until it is iterated.
+
+    ``states`` holds the fitted state of two-pass steps by position.
+    """
+    for index, step in enumerate(steps):
+        streaming = step_streaming(step) or {'mode': 'global'}
+        if streaming['mode'] == 'row':
+            chunks = _row_stream(step, chunks)
+        elif streaming['mode'] == 'window':
+            chunks = _window_stream(step, chunks, streaming['lookback'])
+        elif 'fit' in streaming:
+            chunks = _transform_stream(step, chunks, states[index])
+        elif materialize:
+            chunks = _materialized_stream(step, chunks, chunksize)
+        else:
+            raise ValueError(f'Step {step.func_name} needs all rows at once; pass materialize=True to load the '
+                             f'whole input for it.')
+    return chunks
+
+
+def fit_two_pass(step, chunks):
+    """First pass of a two-pass step: its ``fit`` on every chunk, then ``combine``."""
+    streaming = step_streaming(step)
+    params = step.apply_params()
+    return streaming['combine']([streaming['fit'](chunk, **params) for chunk in chunks])
+
+
+def _widened_type(current, new):
+    import pyarrow as pa
+
+    if current.equals(new) or pa.types.is_null(new):
+        return current
+    if pa.types.is_null(current):
+        return new
+    if pa.types.is_integer(current) and pa.types.is_integer(new):
+        return pa.int64()
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in (current, new)):
+        return pa.float64()
+    return pa.string()
+
+
+def _widened_schema(current, new):
+    """A schema both ``current`` and ``new`` can be cast to: integers and floats widen to float64,
+    other conflicting types to string."""
+    import pyarrow as pa
+
+    if current.names != new.names:
+        raise ValueError(f'Chunks must all have the same columns; got {new.names} after {current.names}.')
+    # The pandas metadata of the first chunk is kept, so the index is restored on reading
+    return pa.schema([field.with_type(_widened_type(field.type, new.field(index).type))
+                      for index, field in enumerate(current)], metadata=current.metadata)
+
+
+def write_parquet_chunks(chunks, path, schema=None):
+    """Write chunks to one Parquet file as they arrive; returns the number of rows written.
+
+    Every chunk is cast to ``schema`` when one is given. Otherwise the first chunk sets the schema
+    and later chunks that do not fit it widen it (see ``_widened_schema``), e.g. a column that was
+    all missing in the first chunk and holds strings later. Widening copies the row groups written
+    so far into a new file one batch at a time, so memory stays bounded by the chunk size.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    writer, rows, preserve_index, generation = None, 0, None, 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, pd.Series):
+                chunk = chunk.to_frame()
+            chunk = chunk.rename(columns=str)
+            if preserve_index is None:
+                # Row numbers are not worth storing; meaningful labels (e.g. timestamps) are
+                preserve_index = not isinstance(chunk.index, pd.RangeIndex)
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=preserve_index)
+                writer = pq.ParquetWriter(tmp_path, table.schema)
+            else:
+                try:
+                    # Later chunks may infer narrower types (e.g. no NaN, so int); cast them to the schema
+                    table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=preserve_index)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, KeyError):  # KeyError: a column is missing
+                    if schema is not None:
+                        raise
+                    table = pa.Table.from_pandas(chunk, preserve_index=preserve_index)
+                    widened = _widened_schema(writer.schema, table.schema)
+                    writer.close()
+                    generation += 1
+                    widened_path = f'{path}.tmp-{os.getpid()}-{generation}'
+                    writer = pq.ParquetWriter(widened_path, widened)
+                    written, tmp_path = tmp_path, widened_path
+                    for batch in pq.ParquetFile(written).iter_batches():
+                        writer.write_table(pa.Table.from_batches([batch]).cast(widened))
+                    os.remove(written)
+                    table = table.cast(widened)
+            writer.write_table(table)
+            rows += len(chunk)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+    if writer is None:
+        raise ValueError('The pipeline produced no chunks to write.')
+    writer.close()
+    os.replace(tmp_path, path)
+    return rows
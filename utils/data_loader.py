@@ -1,37 +1,188 @@
-import pandas as pd
 import os
-import re
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils.storage import PriceStore, get_timestamp_column, list_csv_files, to_utc_timestamp
+
+
+class FrameCache:
+    """Thread-safe LRU cache of loaded frames, bounded by their in-memory size.
+
+    Keys start with the (path, mtime, size) signature of the files a frame was read from, so a
+    file that changes on disk is simply a miss and its stale entries are dropped.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_load(self, signature, query, load):
+        key = (signature, query)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+        frame = load()
+        nbytes = int(frame.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            paths = {path for path, _, _ in signature}
+            # Any entry for the same files with an older signature can never be hit again
+            for stale_key in [k for k in self._entries
+                              if k[0] != signature and paths & {path for path, _, _ in k[0]}]:
+                self._pop(stale_key)
+            if nbytes <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (frame, nbytes)
+                self.current_bytes += nbytes
+                while self.current_bytes > self.max_bytes:
+                    self._pop(next(iter(self._entries)))
+                    self.evictions += 1
+        return frame
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'bytes': self.current_bytes, 'max_bytes': self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def _pop(self, key):
+        _, nbytes = self._entries.pop(key)
+        self.current_bytes -= nbytes
+
+
+# Shared by every DataLoader in the process (and therefore by every Streamlit session)
+default_cache = FrameCache()
+
+
+def file_signature(paths):
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
 
 
 class DataLoader:
-    def __init__(self, directory='financial_data'):
+    def __init__(self, directory='financial_data', cache=default_cache):
         self.directory = directory
+        self.store = PriceStore(directory)
+        # Pass cache=None to always read from disk
+        self.cache = cache
 
-    def load_data(self):
-        # List all files in the directory
-        files = [f for f in os.listdir(self.directory) if f.endswith('_data.csv')]
-
-        # Organize files by interval
-        interval_files = {}
-        for file in files:
-            # Extract interval from the file name using regex
-            interval_match = re.search(r'_(\w+)_data\.csv', file)
-            if interval_match:
-                interval = interval_match.group(1)
-                if interval not in interval_files:
-                    interval_files[interval] = []
-                interval_files[interval].append(file)
+    def list_sources(self):
+        # Organize sources by interval; columnar partitions take precedence over legacy CSV files
+        interval_sources = {}
+        for interval in self.store.intervals():
+            for symbol in self.store.symbols(interval):
+                interval_sources.setdefault(interval, {})[symbol] = ('store', symbol)
+        for symbol, interval, file_path in list_csv_files(self.directory):
+            interval_sources.setdefault(interval, {}).setdefault(symbol, ('csv', file_path))
+        return interval_sources
+
+    def intervals(self):
+        return sorted(self.list_sources())
+
+    def symbols(self, interval):
+        return sorted(self.list_sources().get(interval, {}))
+
+    def load(self, interval, symbols=None, columns=None, start=None, end=None):
+        """Load one interval, opening only the files of ``symbols`` and reading only ``columns``.
+
+        ``start`` and ``end`` bound the bar timestamp (inclusive); naive values are taken to be UTC.
+        The 'Symbol' column is always returned so multi-symbol frames stay distinguishable.
+        """
+        sources = self.list_sources().get(interval)
+        if sources is None:
+            raise KeyError(f"No data found for interval {interval}")
+        if symbols is not None:
+            if isinstance(symbols, str):
+                symbols = [symbols]
+            sources = {symbol: sources[symbol] for symbol in symbols if symbol in sources}
+
+        datasets = []
+        for symbol, (kind, location) in sorted(sources.items()):
+            datasets.append(self._read_source(interval, symbol, kind, location, columns, start, end))
+
+        # Skip header-only files so they don't widen the frame or demote column dtypes to object
+        datasets = [df for df in datasets if not df.empty] or datasets
+        if not datasets:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(datasets, ignore_index=True)
 
+    def load_data(self):
         # Load and concatenate datasets for each interval
-        interval_data = {}
-        for interval, file_list in interval_files.items():
-            datasets = []
-            for file in file_list:
-                file_path = os.path.join(self.directory, file)
-                df = pd.read_csv(file_path)
-                datasets.append(df)
-            # Concatenate all datasets for this interval into a single DataFrame
-            interval_data[interval] = pd.concat(datasets, ignore_index=True)
-
-        return interval_data
+        return {interval: self.load(interval) for interval in self.intervals()}
+
+    def source_signature(self, interval, symbols=None):
+        """Path, mtime and size of every file backing ``interval`` (limited to ``symbols``).
+
+        Changes whenever any of that data is rewritten or appended to, so it can key derived caches.
+        """
+        sources = self.list_sources().get(interval, {})
+        if symbols is not None:
+            symbols = [symbols] if isinstance(symbols, str) else symbols
+            sources = {symbol: sources[symbol] for symbol in symbols if symbol in sources}
+        return tuple((symbol, file_signature(self._source_paths(interval, symbol, kind, location)))
+                     for symbol, (kind, location) in sorted(sources.items()))
+
+    def _source_paths(self, interval, symbol, kind, location):
+        return self.store.partition_files(interval, symbol) if kind == 'store' else [location]
+
+    def _read_source(self, interval, symbol, kind, location, columns, start, end):
+        paths = self._source_paths(interval, symbol, kind, location)
+        if kind == 'store':
+            load = lambda: self._read_store(interval, symbol, columns, start, end)
+        else:
+            load = lambda: self._read_csv(location, columns, start, end)
+        if self.cache is None:
+            return load()
+        query = (tuple(columns) if columns is not None else None,
+                 None if start is None else to_utc_timestamp(start),
+                 None if end is None else to_utc_timestamp(end))
+        return self.cache.get_or_load(file_signature(paths), query, load)
+
+    def _read_store(self, interval, symbol, columns, start, end):
+        if columns is not None:
+            available = self.store.schema(interval, symbol).names
+            columns = [column for column in _with_symbol(columns) if column in available]
+        return self.store.read(interval, symbol, columns=columns, start=start, end=end)
+
+    @staticmethod
+    def _read_csv(file_path, columns, start, end):
+        # CSV has no pushdown: parse only the needed columns, then filter rows in memory
+        wanted = None
+        if columns is not None:
+            wanted = set(_with_symbol(columns))
+            if start is not None or end is not None:
+                wanted.update(['Datetime', 'Date'])
+        df = pd.read_csv(file_path, usecols=None if wanted is None else (lambda column: column in wanted))
+        if not df.empty and (start is not None or end is not None):
+            timestamps = pd.to_datetime(df[get_timestamp_column(df.columns)], utc=True)
+            mask = pd.Series(True, index=df.index)
+            if start is not None:
+                mask &= timestamps >= to_utc_timestamp(start)
+            if end is not None:
+                mask &= timestamps <= to_utc_timestamp(end)
+            df = df[mask].reset_index(drop=True)
+        if columns is not None:
+            df = df[[column for column in _with_symbol(columns) if column in df.columns]]
+        return df
+
 
+def _with_symbol(columns):
+    columns = list(columns)
+    return columns if 'Symbol' in columns else columns + ['Symbol']
@@ -0,0 +1,196 @@
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+
+class RateLimiter:
+    """Spaces request starts at least ``1 / requests_per_second`` apart across all threads."""
+
+    def __init__(self, requests_per_second=None, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = self.clock()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            self.sleep(slot - now)
+
+
+class DownloadOutcome:
+    def __init__(self, symbol, status, attempts, elapsed, data=None, error=None):
+        self.symbol = symbol
+        self.status = status
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.data = data
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.status == 'ok'
+
+    def to_dict(self):
+        return {'symbol': self.symbol, 'status': self.status, 'attempts': self.attempts,
+                'elapsed': self.elapsed, 'rows': len(self.data) if hasattr(self.data, '__len__') else None,
+                'error': None if self.error is None else repr(self.error)}
+
+
+class DownloadReport:
+    def __init__(self, outcomes, elapsed):
+        self.outcomes = outcomes
+        self.elapsed = elapsed
+
+    def succeeded(self):
+        return [outcome for outcome in self.outcomes.values() if outcome.ok]
+
+    def failed(self):
+        return [outcome for outcome in self.outcomes.values() if not outcome.ok]
+
+    def summary(self):
+        """Per-symbol outcomes as a DataFrame, in the order the symbols were requested."""
+        return pd.DataFrame([outcome.to_dict() for outcome in self.outcomes.values()],
+                            columns=['symbol', 'status', 'attempts', 'elapsed', 'rows', 'error'])
+
+    def __str__(self):
+        retries = sum(outcome.attempts - 1 for outcome in self.outcomes.values())
+        throughput = len(self.outcomes) / self.elapsed if self.elapsed else float('inf')
+        return (f"{len(self.succeeded())}/{len(self.outcomes)} symbols downloaded in {self.elapsed:.2f}s "
+                f"({throughput:.1f} symbols/s, {retries} retries, {len(self.failed())} failed)")
+
+
+class ConcurrentDownloader:
+    """Runs ``fetch(symbol)`` for many symbols on a bounded thread pool with rate limiting and retries.
+
+    Failed attempts are retried with exponential backoff (``backoff * 2 ** (attempt - 1)``, capped at
+    ``max_backoff``, plus up to ``jitter`` of random spread). A symbol that still fails is reported
+    in the summary instead of aborting the whole batch.
+    """
+
+    def __init__(self, fetch, max_workers=8, requests_per_second=None, max_retries=3, backoff=0.5,
+                 max_backoff=30.0, jitter=0.1, retry_on=(Exception,), sleep=time.sleep):
+        self.fetch = fetch
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(requests_per_second, sleep=sleep)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_on = retry_on
+        self.sleep = sleep
+
+    def backoff_delay(self, attempt):
+        delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        return delay * (1 + random.uniform(0, self.jitter))
+
+    def download_one(self, symbol):
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            self.rate_limiter.wait()
+            try:
+                data = self.fetch(symbol)
+                return DownloadOutcome(symbol, 'ok', attempt, time.perf_counter() - start, data=data)
+            except self.retry_on as e:
+                if attempt > self.max_retries:
+                    return DownloadOutcome(symbol, 'failed', attempt, time.perf_counter() - start, error=e)
+                self.sleep(self.backoff_delay(attempt))
+
+    def download(self, symbols, on_complete=None):
+        start = time.perf_counter()
+        symbols = list(dict.fromkeys(symbols))
+        outcomes = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.download_one, symbol): symbol for symbol in symbols}
+            for future in as_completed(futures):
+                outcome = future.result()
+                outcomes[outcome.symbol] = outcome
+                if on_complete is not None:
+                    on_complete(outcome)
+        # Keep the report in request order regardless of completion order
+        ordered = {symbol: outcomes[symbol] for symbol in symbols}
+        return DownloadReport(ordered, time.perf_counter() - start)
+
+
+class FakePriceProvider:
+    """Offline stand-in for yfinance price history, for testing throughput and retry behavior.
+
+    Bars are a deterministic random walk per symbol starting at ``first_bar``; raising ``bars``
+    publishes new bars without changing the existing ones. ``latency`` simulates the round trip,
+    ``failures`` maps a symbol to how many of its first calls fail, and ``failure_rate`` makes
+    any call fail at random.
+    """
+
+    def __init__(self, bars=500, latency=0.0, failure_rate=0.0, failures=None, seed=0,
+                 first_bar='2022-01-03 09:30'):
+        self.bars = bars
+        self.first_bar = first_bar
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failures = dict(failures or {})
+        self.seed = seed
+        self.calls = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def history(self, symbol, period="1y", start=None, end=None, interval="1d", auto_adjust=True):
+        with self._lock:
+            self.calls[symbol] = self.calls.get(symbol, 0) + 1
+            call_number = self.calls[symbol]
+            random_failure = self._random.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if call_number <= self.failures.get(symbol, 0) or random_failure:
+            raise ConnectionError(f"Simulated failure fetching {symbol} (call {call_number})")
+        return self.make_bars(symbol, interval, start=start, end=end)
+
+    def info(self, symbol):
+        with self._lock:
+            self.calls[symbol] = self.calls.get(symbol, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        return {'symbol': symbol, 'shortName': f'{symbol} Inc.', 'longName': f'{symbol} Incorporated',
+                'industry': 'Software', 'sector': 'Technology',
+                'longBusinessSummary': f'{symbol} is a simulated company used for offline testing.'}
+
+    def make_bars(self, symbol, interval="1d", start=None, end=None):
+        frequency = 'min' if interval == '1m' else 'B'
+        index_name = 'Datetime' if interval == '1m' else 'Date'
+        index = pd.date_range(start=pd.Timestamp(self.first_bar, tz='America/New_York'), periods=self.bars,
+                              freq=frequency, name=index_name)
+        # One generator per column keeps each series a stable prefix as ``bars`` grows
+        rngs = [np.random.default_rng([zlib.crc32(symbol.encode()), self.seed, column]) for column in range(4)]
+        close = 100 * np.exp(np.cumsum(rngs[0].normal(0, 0.01, self.bars)))
+        spread = np.abs(rngs[1].normal(0, 0.005, self.bars)) * close
+        data = pd.DataFrame({
+            'Open': close + rngs[2].normal(0, 0.002, self.bars) * close,
+            'High': close + spread,
+            'Low': close - spread,
+            'Close': close,
+            'Volume': rngs[3].integers(1_000, 1_000_000, self.bars),
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        }, index=index)
+        if start is not None:
+            data = data[data.index >= _localize(start, index.tz)]
+        if end is not None:
+            data = data[data.index < _localize(end, index.tz)]
+        return data
+
+
+def _localize(value, tz):
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize(tz) if timestamp.tzinfo is None else timestamp
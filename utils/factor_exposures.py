@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from utils.storage import get_timestamp_column
+
+
+def returns_matrix(data, close_column='Close', symbol_column='Symbol', timestamp_column=None):
+    """Simple returns as a time x symbol frame, one column per symbol.
+
+    Bars are aligned on the timestamp column (or the index if there is none). A symbol with no bar
+    at some timestamp gets NaN there, and its next return spans the gap only if both closes exist.
+    """
+    timestamp_column = timestamp_column or get_timestamp_column(data.columns)
+    timestamps = data[timestamp_column] if timestamp_column else data.index.to_series(index=data.index)
+    symbols = data[symbol_column] if symbol_column in data.columns else pd.Series('', index=data.index)
+    closes = pd.DataFrame({'timestamp': timestamps.to_numpy(), 'symbol': symbols.to_numpy(),
+                           'close': data[close_column].to_numpy()})
+    prices = closes.pivot_table(index='timestamp', columns='symbol', values='close', aggfunc='last', dropna=False)
+    prices.columns.name = symbol_column
+    return prices.pct_change(fill_method=None)
+
+
+def _window_sums(values, window):
+    # Trailing window sums from one cumulative sum: S[t] - S[t - window]
+    cumulative = np.cumsum(values, axis=0)
+    sums = np.empty_like(cumulative)
+    sums[:window] = cumulative[:window]
+    np.subtract(cumulative[window:], cumulative[:-window], out=sums[window:])
+    return sums
+
+
+class RollingExposures:
+    """Rolling beta, correlation, alpha and idiosyncratic volatility of every column of ``returns``
+    against ``benchmark``, computed in one vectorized pass.
+
+    ``returns`` is a time x symbol frame (see ``returns_matrix``); ``benchmark`` is a column of it or
+    a return series on the same index. Window sums of x, y, x², y² and xy come from cumulative
+    sums, so the cost does not depend on ``window``. A window only uses rows where both the symbol
+    and the benchmark have a return; windows with fewer than ``min_periods`` such rows are NaN.
+    Every result is a time x symbol frame with the index and columns of ``returns``.
+    """
+
+    def __init__(self, returns, benchmark, window=60, min_periods=None):
+        if not isinstance(benchmark, pd.Series):
+            benchmark = returns[benchmark]
+        self.returns = returns
+        self.benchmark = benchmark.reindex(returns.index)
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+
+        # Column-major so that every cumulative sum runs over contiguous memory
+        y = np.array(returns.to_numpy(dtype='float64'), order='F')
+        x = self.benchmark.to_numpy(dtype='float64')
+        valid = ~np.isnan(y) & ~np.isnan(x)[:, None]
+        # Centering on the full-sample means keeps the cumulative sums small, which limits
+        # cancellation when window sums are taken as differences of them
+        x_mean = np.nanmean(x)
+        y_mean = np.nanmean(np.where(valid, y, np.nan), axis=0)
+        x = valid * np.nan_to_num(x - x_mean)[:, None]
+        y -= y_mean
+        y[~valid] = 0.0
+
+        n = _window_sums(valid.astype('float64'), window)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_x = _window_sums(x, window) / n
+            mean_y = _window_sums(y, window) / n
+            # Sums of squared deviations from the window means
+            sxy = _window_sums(x * y, window) - n * mean_x * mean_y
+            sxx = np.maximum(_window_sums(np.square(x, out=x), window) - n * np.square(mean_x), 0.0)
+            syy = np.maximum(_window_sums(np.square(y, out=y), window) - n * np.square(mean_y), 0.0)
+            del x, y
+
+            # Windows without enough observations or without benchmark variance have no exposure
+            undefined = (n < max(self.min_periods, 2)) | (sxx <= 0)
+            beta = sxy / sxx
+            beta[undefined] = np.nan
+            correlation = np.clip(sxy / np.sqrt(sxx * syy), -1, 1)
+            correlation[undefined | (syy <= 0)] = np.nan
+            # Residual sum of squares of the window regression, with n - 2 degrees of freedom
+            idiosyncratic_volatility = np.sqrt(np.maximum(syy - beta * sxy, 0.0) / (n - 2))
+            idiosyncratic_volatility[n <= 2] = np.nan
+            # Intercept in the original units: mean(y) - beta * mean(x)
+            alpha = mean_y + y_mean - beta * (mean_x + x_mean)
+
+        self.observations = self._frame(n)
+        self.beta = self._frame(beta)
+        self.correlation = self._frame(correlation)
+        self.idiosyncratic_volatility = self._frame(idiosyncratic_volatility)
+        self.alpha = self._frame(alpha)
+
+    def _frame(self, values):
+        return pd.DataFrame(values, index=self.returns.index, columns=self.returns.columns)
+
+    def to_long(self):
+        """All exposures as one frame with a (timestamp, symbol) row index."""
+        return pd.DataFrame({name: getattr(self, name).stack(dropna=False) for name in
+                             ('beta', 'correlation', 'alpha', 'idiosyncratic_volatility', 'observations')})
+
+
+def pairwise_exposures(returns, window=60, end=None, min_periods=None):
+    """Covariance, correlation and beta between every pair of symbols over one trailing window.
+
+    The window is the ``window`` rows ending at ``end`` (default: the last row). Each pair uses the
+    rows where both symbols have a return. ``beta.loc[a, b]`` is the beta of ``a`` against ``b``.
+    """
+    min_periods = window if min_periods is None else min_periods
+    stop = len(returns) if end is None else returns.index.get_loc(end) + 1
+    values = returns.iloc[max(stop - window, 0):stop].to_numpy(dtype='float64')
+    valid = (~np.isnan(values)).astype('float64')
+    values = np.where(valid > 0, values, 0.0)
+
+    # Pairwise-complete sums as matrix products: entry (i, j) only counts rows where both are valid
+    n = valid.T @ valid
+    sum_x = values.T @ valid
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sxx = np.maximum((values * values).T @ valid - sum_x * sum_x / n, 0.0)
+        sxy = values.T @ values - sum_x * sum_x.T / n
+        covariance = sxy / (n - 1)
+        correlation = np.clip(sxy / np.sqrt(sxx * sxx.T), -1, 1)
+        beta = sxy / sxx.T
+
+    enough = n >= max(min_periods, 2)
+    symbols = returns.columns
+    frame = lambda matrix: pd.DataFrame(np.where(enough, matrix, np.nan), index=symbols, columns=symbols)
+    return {'covariance': frame(covariance), 'correlation': frame(correlation), 'beta': frame(beta),
+            'observations': pd.DataFrame(n, index=symbols, columns=symbols)}
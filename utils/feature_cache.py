@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+
+class CachedFeatures:
+    """One cache entry: named arrays (memory-mapped read-only by default), metadata and objects."""
+
+    def __init__(self, key, arrays, metadata, objects):
+        self.key = key
+        self.arrays = arrays
+        self.metadata = metadata
+        self.objects = objects
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+
+class FeatureMatrixCache:
+    """Prepared model inputs stored on disk as ``.npy`` files, one directory per key.
+
+    The key hashes whatever determines the arrays (typically ``DataLoader.source_signature``, the
+    feature specification and the split parameters), so any change to them builds a new entry.
+    Entries are written to a temporary directory and renamed into place, which makes them safe to
+    build concurrently from several processes: the first finished build wins and later readers
+    memory-map the same files instead of each holding a copy.
+
+    Stale entries are pruned when a new one is stored. Entries stored with the same ``group``
+    (e.g. one symbol's features, keyed by an older source signature) are replaced by the new
+    one, and the least recently used entries are deleted while the cache exceeds ``max_bytes``.
+    Readers still holding a memory map of a deleted entry keep their data (on POSIX systems).
+    """
+
+    def __init__(self, directory='database/feature_cache', mmap_mode='r', max_bytes=4 << 30):
+        self.directory = directory
+        self.mmap_mode = mmap_mode
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts):
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        path = self.entry_path(key)
+        if not os.path.exists(os.path.join(path, 'metadata.json')):
+            return None
+        try:
+            with open(os.path.join(path, 'metadata.json')) as file:
+                metadata = json.load(file)
+            # The metadata's modification time records when the entry was last used, for pruning
+            os.utime(os.path.join(path, 'metadata.json'))
+        except FileNotFoundError:  # pruned meanwhile
+            return None
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=self.mmap_mode)
+                  for name in metadata['arrays']}
+        objects = {}
+        if os.path.exists(os.path.join(path, 'objects.pkl')):
+            with open(os.path.join(path, 'objects.pkl'), 'rb') as file:
+                objects = pickle.load(file)
+        return CachedFeatures(key, arrays, metadata['metadata'], objects)
+
+    def put(self, key, arrays, metadata=None, objects=None, group=None):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix=f'.{key}.', dir=self.directory)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(array))
+            if objects:
+                with open(os.path.join(tmp_path, 'objects.pkl'), 'wb') as file:
+                    pickle.dump(objects, file)
+            size = sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path))
+            # Written last: an entry only counts as present once its metadata exists
+            with open(os.path.join(tmp_path, 'metadata.json'), 'w') as file:
+                json.dump({'arrays': list(arrays), 'metadata': metadata or {}, 'created_at': time.time(),
+                           'group': group, 'size': size}, file, default=str)
+            os.rename(tmp_path, self.entry_path(key))
+        except OSError:
+            # Another process stored the same key first; its entry is equivalent
+            if not os.path.exists(os.path.join(self.entry_path(key), 'metadata.json')):
+                raise
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.prune(keep=key, group=group)
+        return self.get(key)
+
+    def get_or_build(self, key, build, group=None):
+        """Return the entry for ``key``, calling ``build()`` -> ``(arrays, metadata, objects)`` on a miss."""
+        cached = self.get(key)
+        with self._lock:
+            if cached is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached is not None:
+            return cached
+        arrays, metadata, objects = build()
+        return self.put(key, arrays, metadata, objects, group)
+
+    def keys(self):
+        if not os.path.isdir(self.directory):
+            return []
+        # Dot-prefixed directories are entries still being written
+        return sorted(name for name in os.listdir(self.directory)
+                      if not name.startswith('.') and os.path.exists(os.path.join(self.directory, name, 'metadata.json')))
+
+    def invalidate(self, key=None):
+        for name in [key] if key is not None else self.keys():
+            shutil.rmtree(self.entry_path(name), ignore_errors=True)
+
+    def _entries(self):
+        # (last used, size, group, key) of every entry
+        entries = []
+        for key in self.keys():
+            path = os.path.join(self.entry_path(key), 'metadata.json')
+            try:
+                with open(path) as file:
+                    info = json.load(file)
+                entries.append((os.path.getmtime(path), info.get('size', 0), info.get('group'), key))
+            except (FileNotFoundError, ValueError):  # removed, or still being replaced
+                continue
+        return entries
+
+    def prune(self, keep=None, group=None):
+        """Delete entries superseded in ``group`` by ``keep``, then the least recently used ones past
+        ``max_bytes``; ``keep`` itself is never deleted. Returns the deleted keys."""
+        entries = sorted(self._entries())
+        deleted = [key for _, _, entry_group, key in entries
+                   if group is not None and entry_group == group and key != keep]
+        total = sum(size for _, size, _, key in entries if key not in deleted)
+        for _, size, _, key in entries:
+            if self.max_bytes is None or total <= self.max_bytes:
+                break
+            if key != keep and key not in deleted:
+                deleted.append(key)
+                total -= size
+        for key in deleted:
+            self.invalidate(key)
+        return deleted
+
+    def size_on_disk(self):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(self.directory) for name in names)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.keys())}
+
+
+default_feature_cache = FeatureMatrixCache()
@@ -0,0 +1,81 @@
+class FeatureNode:
+    def __init__(self, name, inputs, compute, output=True):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.compute = compute
+        # Intermediate nodes (output=False) are shared building blocks, not features on their own
+        self.output = output
+
+
+class FeatureGraph:
+    """A DAG of named computations where each node declares the nodes it reads.
+
+    ``evaluate`` runs only the nodes the requested features depend on, computes every shared
+    intermediate once, and drops an intermediate as soon as its last consumer has run.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+
+    def add(self, name, inputs, compute, output=True):
+        if name in self.nodes:
+            raise ValueError(f"Node {name} is already defined.")
+        self.nodes[name] = FeatureNode(name, inputs, compute, output)
+        return self
+
+    def outputs(self):
+        return [name for name, node in self.nodes.items() if node.output]
+
+    def plan(self, names):
+        """Nodes needed for ``names``, in an order where every node follows its inputs."""
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name not in self.nodes:
+                raise KeyError(f"Unknown feature {name}. Available features: {self.outputs()}")
+            if name in visiting:
+                raise ValueError(f"Feature graph has a cycle through {name}.")
+            visiting.add(name)
+            for input_name in self.nodes[name].inputs:
+                visit(input_name)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in names:
+            visit(name)
+        return order
+
+    def evaluate(self, names, on_result=None):
+        """Compute ``names`` and return ``{name: value}``.
+
+        With ``on_result(name, value)`` each requested value is handed over as soon as it is
+        computed instead of being collected, so it can be written out and released early.
+        """
+        names = list(dict.fromkeys(names))
+        order = self.plan(names)
+        requested = set(names)
+        remaining_consumers = {name: 0 for name in order}
+        for name in order:
+            for input_name in self.nodes[name].inputs:
+                remaining_consumers[input_name] += 1
+
+        values, results = {}, {}
+        for name in order:
+            node = self.nodes[name]
+            value = node.compute(*(values[input_name] for input_name in node.inputs))
+            if name in requested:
+                if on_result is not None:
+                    on_result(name, value)
+                else:
+                    results[name] = value
+            values[name] = value
+            for input_name in node.inputs:
+                remaining_consumers[input_name] -= 1
+                if remaining_consumers[input_name] == 0:
+                    del values[input_name]
+            if remaining_consumers[name] == 0:
+                del values[name]
+        return results
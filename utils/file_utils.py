@@ -0,0 +1,18 @@
+import json
+import os
+import tempfile
+
+
+def write_json(value, path, indent=2, default=None):
+    """Write ``value`` as JSON to ``path`` atomically: readers see the old file or the new one, never a partial write."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.json.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as file:
+            json.dump(value, file, indent=indent, default=default)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -1,22 +1,110 @@
 import pandas as pd
 import numpy as np
+from pandas.api.indexers import BaseIndexer
+
+from utils.factor_exposures import RollingExposures, returns_matrix
+from utils.feature_graph import FeatureGraph
+from utils.indicator_kernels import get_kernels
+from utils.storage import get_timestamp_column
 
 
 class FinancialData:
-    def __init__(self, data, close_column='Close', volume_column='Volume', high_column='High', low_column='Low'):
-        self.data = data
+    """Technical indicators over a price frame.
+
+    If the frame holds several symbols (``symbol_column``), every indicator is computed per symbol
+    in one vectorized pass: rolling windows are clipped at each symbol's first row, diff and shift
+    results are masked there, and cumulative sums and EMAs use grouped operations. Rows of one
+    symbol must be contiguous and in time order; a frame whose symbols are interleaved is stably
+    sorted by symbol first.
+
+    ``backend`` selects how rolling means, rolling standard deviations and EMAs are computed:
+    ``'pandas'`` (default), ``'numpy'`` or ``'numba'``; see ``utils.indicator_kernels``.
+    """
+
+    def __init__(self, data, close_column='Close', volume_column='Volume', high_column='High', low_column='Low',
+                 symbol_column='Symbol', backend='pandas'):
         self.close_column = close_column
         self.volume_column = volume_column
         self.high_column = high_column
         self.low_column = low_column
+        self.symbol_column = symbol_column
+        self.data = data
+        self.backend = backend
+        self._kernels = get_kernels(backend)
+        self._keys = None
+        self._positions = None
+        if symbol_column in data.columns and data[symbol_column].nunique(dropna=False) > 1:
+            codes = pd.factorize(data[symbol_column], use_na_sentinel=False)[0]
+            if not _is_contiguous(codes):
+                order = np.argsort(codes, kind='stable')
+                self.data = data.iloc[order]
+                codes = codes[order]
+            self._keys = codes
+            self._positions = _group_positions(codes)
+
+    @property
+    def symbol_positions(self):
+        """Each row's position within its symbol (in the row order of ``self.data``), or None for one symbol."""
+        return self._positions
+
+    def _mask_warmup(self, result, periods):
+        # Rows that would reach back into the previous symbol become NaN
+        if self._keys is None or periods <= 0:
+            return result
+        return result.mask(self._positions < periods)
+
+    def _rolling(self, series, window, how='mean', keys=None):
+        if self._kernels is not None:
+            positions = self._kernel_positions(len(series), keys)
+            kernel = self._kernels.rolling_mean if how == 'mean' else self._kernels.rolling_std
+            return pd.Series(kernel(series.to_numpy(dtype='float64'), window, positions), index=series.index,
+                             name=series.name)
+        if self._keys is None:
+            return getattr(series.rolling(window=window), how)()
+        positions = self._positions if keys is None else _group_positions(keys)
+        # Windows are clipped at each symbol's first row, which also restarts pandas' running sums
+        indexer = _GroupWindowIndexer(window_size=window, group_starts=np.arange(len(positions)) - positions)
+        return getattr(series.rolling(indexer, min_periods=window), how)()
+
+    def _diff(self, series, periods=1):
+        return self._mask_warmup(series.diff(periods), periods)
+
+    def _shift(self, series, periods=1):
+        return self._mask_warmup(series.shift(periods), periods)
+
+    def _pct_change(self, series):
+        return self._mask_warmup(series.pct_change(), 1)
+
+    def _cumsum(self, series):
+        if self._keys is None:
+            return series.cumsum()
+        return series.groupby(self._keys, sort=False).cumsum()
+
+    def _ewm_mean(self, series, span=None, alpha=None):
+        if self._kernels is not None:
+            alpha = 2 / (span + 1) if alpha is None else alpha
+            result = self._kernels.ewm_mean(series.to_numpy(dtype='float64'), alpha, self._kernel_positions(len(series)))
+            return pd.Series(result, index=series.index, name=series.name)
+        if self._keys is None:
+            return series.ewm(span=span, alpha=alpha, adjust=False).mean()
+        # Groups are contiguous, so the grouped result is already in row order
+        result = series.groupby(self._keys, sort=False).ewm(span=span, alpha=alpha, adjust=False).mean()
+        return pd.Series(result.to_numpy(), index=series.index, name=series.name)
+
+    def _kernel_positions(self, length, keys=None):
+        if keys is not None:
+            return _group_positions(keys)
+        return self._positions if self._positions is not None else np.arange(length)
 
     def macd(self, short_window=12, long_window=26, signal_window=9):
         self.validate_columns(self.close_column)
-        df = self.data.copy()
-        df['MACD'] = df[self.close_column].ewm(span=short_window, adjust=False).mean() - df[self.close_column].ewm(
-            span=long_window, adjust=False).mean()
-        df['Signal'] = df['MACD'].ewm(span=signal_window, adjust=False).mean()
-        return df[['MACD', 'Signal']]
+        close = self.data[self.close_column]
+        macd = self._macd(self._ewm_mean(close, short_window), self._ewm_mean(close, long_window))
+        return pd.DataFrame({'MACD': macd, 'Signal': self._ewm_mean(macd, signal_window)})
+
+    @staticmethod
+    def _macd(short_ema, long_ema):
+        return (short_ema - long_ema).rename('MACD')
 
     def validate_columns(self, *columns):
         for column in columns:
@@ -25,17 +113,15 @@ class FinancialData:
 
     def price_change(self):
         self.validate_columns(self.close_column)
-        return self.data[self.close_column].diff()
+        return self._diff(self.data[self.close_column])
 
     def price_percentage_change(self):
         self.validate_columns(self.close_column)
-        return self.data[self.close_column].pct_change() * 100
+        return self._pct_change(self.data[self.close_column]) * 100
 
     def moving_average(self, window):
         self.validate_columns(self.close_column)
-        df = self.data.copy()
-        df[f'SMA{window}'] = df[self.close_column].rolling(window=window).mean()
-        return df[f'SMA{window}']
+        return self._rolling(self.data[self.close_column], window).rename(f'SMA{window}')
 
     def trading_volume(self):
         self.validate_columns(self.volume_column)
@@ -43,53 +129,101 @@ class FinancialData:
 
     def vwap(self):
         self.validate_columns(self.close_column, self.volume_column)
-        return (self.data[self.close_column] * self.data[self.volume_column]).cumsum() / self.data[self.volume_column].cumsum()
+        return self._vwap(self.data[self.close_column], self.data[self.volume_column])
+
+    def _vwap(self, close, volume):
+        return self._cumsum(close * volume) / self._cumsum(volume)
 
     def on_balance_volume(self):
         self.validate_columns(self.close_column, self.volume_column)
-        obv = (self.data[self.volume_column] * ~self.data[self.close_column].diff().le(0)).astype(int)
-        return obv.cumsum()
+        return self._obv(self.data[self.volume_column], self._diff(self.data[self.close_column]))
+
+    def _obv(self, volume, price_change):
+        return self._cumsum((volume * ~price_change.le(0)).astype(int))
 
     def volatility(self, window=14):
         self.validate_columns(self.close_column)
-        return self.data[self.close_column].rolling(window=window).std()
+        return self._rolling(self.data[self.close_column], window, 'std')
+
+    def beta(self, window=14, benchmark=None):
+        """Rolling beta of each row's symbol against ``benchmark``, aligned to the rows of ``self.data``.
 
-    def beta(self, window=14):
-        # todo: systematic risk assessment
-        pass
+        ``benchmark`` is a symbol in the frame or a Series of benchmark closes indexed by timestamp.
+        Returns are aligned on the bar timestamp (the Datetime/Date column, else the index); see
+        ``utils.factor_exposures.RollingExposures`` for correlation and idiosyncratic volatility.
+        """
+        if benchmark is None:
+            raise ValueError("beta needs a benchmark: a symbol in the data or a Series of benchmark closes.")
+        self.validate_columns(self.close_column)
+        returns = returns_matrix(self.data, self.close_column, self.symbol_column)
+        if isinstance(benchmark, pd.Series):
+            benchmark = benchmark.reindex(returns.index).pct_change(fill_method=None)
+        exposures = RollingExposures(returns, benchmark, window)
+
+        timestamp_column = get_timestamp_column(self.data.columns)
+        timestamps = self.data[timestamp_column] if timestamp_column else self.data.index
+        symbols = (self.data[self.symbol_column] if self.symbol_column in self.data.columns
+                   else pd.Series('', index=self.data.index))
+        rows = returns.index.get_indexer(timestamps)
+        columns = returns.columns.get_indexer(symbols)
+        return pd.Series(exposures.beta.to_numpy()[rows, columns], index=self.data.index, name='Beta')
 
     def roi(self):
         self.validate_columns(self.close_column)
-        return self.data[self.close_column].pct_change()
+        return self._pct_change(self.data[self.close_column])
 
-    def rsi(self, window=14):
+    def rsi(self, window=14, method='sma'):
+        """RSI from simple rolling means of gains and losses, or Wilder's smoothing with ``method='wilder'``."""
         self.validate_columns(self.close_column)
-        delta = self.data[self.close_column].diff()
-        gain = (delta.where(delta > 0, 0))
-        loss = (-delta.where(delta < 0, 0))
-        avg_gain = gain.rolling(window=window).mean()
-        avg_loss = loss.rolling(window=window).mean()
+        return self._rsi(self._diff(self.data[self.close_column]), window, method)
+
+    def _rsi(self, price_change, window, method='sma'):
+        gain = price_change.where(price_change > 0, 0)
+        loss = -price_change.where(price_change < 0, 0)
+        if method == 'wilder':
+            # Wilder's average is an EMA with alpha = 1 / window; it is reported once a full window of
+            # price changes has been seen
+            positions = self._kernel_positions(len(gain))
+            avg_gain = self._ewm_mean(gain, alpha=1 / window).mask(positions < window)
+            avg_loss = self._ewm_mean(loss, alpha=1 / window).mask(positions < window)
+        elif method == 'sma':
+            avg_gain = self._rolling(gain, window)
+            avg_loss = self._rolling(loss, window)
+        else:
+            raise ValueError(f"Unknown RSI method {method}. Use 'sma' or 'wilder'.")
         rs = avg_gain / avg_loss
         return 100 - (100 / (1 + rs))
 
     def bollinger_bands(self, window=20):
         self.validate_columns(self.close_column)
-        sma = self.data[self.close_column].rolling(window=window).mean()
-        rolling_std = self.data[self.close_column].rolling(window=window).std()
+        close = self.data[self.close_column]
+        sma, rolling_std = self._rolling(close, window), self._rolling(close, window, 'std')
         self.data['Bollinger Upper Band'] = sma + (rolling_std * 2)
         self.data['Bollinger Lower Band'] = sma - (rolling_std * 2)
         return self.data[['Bollinger Upper Band', 'Bollinger Lower Band']]
 
     def sharpe_ratio(self, window=14):
         self.validate_columns('ROI', 'Volatility')
-        self.data['Sharpe Ratio'] = self.data['ROI'].rolling(window=window).mean() / self.data['Volatility'].rolling(window=window).mean()
+        self.data['Sharpe Ratio'] = self._sharpe(self.data['ROI'], self.data['Volatility'], window)
         return self.data['Sharpe Ratio']
 
+    def _sharpe(self, roi, volatility, window):
+        return self._rolling(roi, window) / self._rolling(volatility, window)
+
     def sortino_ratio(self, window=14):
         self.validate_columns('ROI', 'Volatility')
-        self.data['Sortino Ratio'] = self.data['ROI'].rolling(window=window).mean() / self.data[self.data['ROI'] < 0]['Volatility'].rolling(window=window).mean()
+        self.data['Sortino Ratio'] = self._sortino(self.data['ROI'], self.data['Volatility'], window)
         return self.data['Sortino Ratio']
 
+    def _sortino(self, roi, volatility, window):
+        # Downside volatility only averages rows with a negative return; other rows come out NaN
+        downside = (roi < 0).to_numpy()
+        downside_keys = None if self._keys is None else self._keys[downside]
+        # Placed back by position: dividing the Series would align (and sort) their indexes
+        downside_volatility = np.full(len(roi), np.nan)
+        downside_volatility[downside] = self._rolling(volatility[downside], window, keys=downside_keys).to_numpy()
+        return pd.Series(self._rolling(roi, window).to_numpy() / downside_volatility, index=roi.index)
+
     def atr(self, window=14, calculate=True):
         if calculate:
             self.data['ATR'] = self.calculate_atr(window)
@@ -97,36 +231,117 @@ class FinancialData:
 
     def calculate_atr(self, window):
         self.validate_columns(self.high_column, self.low_column, self.close_column)
-        high_low = self.data[self.high_column] - self.data[self.low_column]
-        high_close = np.abs(self.data[self.high_column] - self.data[self.close_column].shift())
-        low_close = np.abs(self.data[self.low_column] - self.data[self.close_column].shift())
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = np.max(ranges, axis=1)
-        return true_range.rolling(window=window).mean()
-
-    def get_features(self, window=14, calculate=True):
-        features = pd.concat([
-            self.price_change(),
-            self.price_percentage_change(),
-            self.moving_average(window),
-            self.trading_volume(),
-            self.vwap(),
-            self.on_balance_volume(),
-            self.volatility(window),
-            self.roi(),
-            self.rsi(window),
-            # pass in the window for macd
-            self.macd(),
-            self.bollinger_bands(window),
-            self.sharpe_ratio(window),
-            self.sortino_ratio(window),
-            self.atr(window, calculate)
-        ], axis=1)
-        return features
-
-    def get_data(self, window=14, calculate=True):
-        data = pd.concat([
-            self.data,
-            self.get_features(window, calculate)
-        ], axis=1)
-        return data.copy()
+        true_range = self._true_range(self.data[self.high_column], self.data[self.low_column],
+                                      self._shift(self.data[self.close_column]))
+        return self._rolling(true_range, window)
+
+    @staticmethod
+    def _true_range(high, low, previous_close):
+        # fmax skips NaN like a row-wise max, so the first bar falls back to High - Low
+        return np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+
+    @staticmethod
+    def feature_names(window=14):
+        return ['Price Change', 'Price Percentage Change', f'SMA{window}', 'Trading Volume', 'VWAP', 'OBV',
+                'Volatility', 'ROI', 'RSI', 'MACD', 'Signal', 'Bollinger Upper Band', 'Bollinger Lower Band',
+                'Sharpe Ratio', 'Sortino Ratio', 'ATR']
+
+    def feature_graph(self, window=14, calculate=True):
+        """The indicators of ``get_features`` as a graph over shared intermediates.
+
+        Close is diffed, shifted and converted to returns once, and the rolling mean and standard
+        deviation of Close are computed once for the SMA, Volatility and Bollinger Bands. Input
+        columns are only validated when a node that reads them is evaluated.
+        """
+        def column(name):
+            def read():
+                self.validate_columns(name)
+                return self.data[name]
+            return read
+
+        graph = FeatureGraph()
+        graph.add('close', [], column(self.close_column), output=False)
+        graph.add('volume', [], column(self.volume_column), output=False)
+        graph.add('high', [], column(self.high_column), output=False)
+        graph.add('low', [], column(self.low_column), output=False)
+        graph.add('close_diff', ['close'], self._diff, output=False)
+        graph.add('close_shift', ['close'], self._shift, output=False)
+        graph.add('close_pct_change', ['close'], self._pct_change, output=False)
+        graph.add('close_mean', ['close'], lambda close: self._rolling(close, window), output=False)
+        graph.add('close_std', ['close'], lambda close: self._rolling(close, window, 'std'), output=False)
+        graph.add('close_ema_12', ['close'], lambda close: self._ewm_mean(close, 12), output=False)
+        graph.add('close_ema_26', ['close'], lambda close: self._ewm_mean(close, 26), output=False)
+        graph.add('true_range', ['high', 'low', 'close_shift'], self._true_range, output=False)
+
+        graph.add('Price Change', ['close_diff'], lambda price_change: price_change)
+        graph.add('Price Percentage Change', ['close_pct_change'], lambda returns: returns * 100)
+        graph.add(f'SMA{window}', ['close_mean'], lambda sma: sma.rename(f'SMA{window}'))
+        graph.add('Trading Volume', ['volume'], lambda volume: volume)
+        graph.add('VWAP', ['close', 'volume'], self._vwap)
+        graph.add('OBV', ['volume', 'close_diff'], self._obv)
+        graph.add('Volatility', ['close_std'], lambda rolling_std: rolling_std)
+        graph.add('ROI', ['close_pct_change'], lambda returns: returns)
+        graph.add('RSI', ['close_diff'], lambda price_change: self._rsi(price_change, window))
+        graph.add('MACD', ['close_ema_12', 'close_ema_26'], self._macd)
+        graph.add('Signal', ['MACD'], lambda macd: self._ewm_mean(macd, 9))
+        graph.add('Bollinger Upper Band', ['close_mean', 'close_std'], lambda sma, rolling_std: sma + rolling_std * 2)
+        graph.add('Bollinger Lower Band', ['close_mean', 'close_std'], lambda sma, rolling_std: sma - rolling_std * 2)
+        graph.add('Sharpe Ratio', ['ROI', 'Volatility'], lambda roi, vol: self._sharpe(roi, vol, window))
+        graph.add('Sortino Ratio', ['ROI', 'Volatility'], lambda roi, vol: self._sortino(roi, vol, window))
+        if calculate:
+            graph.add('ATR', ['true_range'], lambda true_range: self._rolling(true_range, window))
+        else:
+            graph.add('ATR', [], column('ATR'))
+        return graph
+
+    def get_features(self, window=14, calculate=True, features=None):
+        """Indicators written column by column into one preallocated float array.
+
+        ``features`` selects a subset of ``feature_names(window)``; only the graph nodes those
+        features need are evaluated, and intermediates are released after their last use. The
+        frame is built around the array without copying it. ``self.data`` is not modified.
+        """
+        names = self.feature_names(window) if features is None else list(dict.fromkeys(features))
+        index = self.data.index
+        result = np.empty((len(index), len(names)), dtype='float64', order='F')
+        column = dict(zip(names, range(len(names))))
+
+        def put(name, values):
+            # Values are written by position, so a Series must be in the frame's row order
+            if isinstance(values, pd.Series) and not values.index.equals(index):
+                raise ValueError(f"Feature {name} is not aligned with the data's index.")
+            result[:, column[name]] = values
+
+        self.feature_graph(window, calculate).evaluate(names, on_result=put)
+        return pd.DataFrame(result, index=index, columns=names, copy=False)
+
+    def get_data(self, window=14, calculate=True, features=None):
+        # concat already returns a new frame, so no extra copy is needed
+        return pd.concat([self.data, self.get_features(window, calculate, features)], axis=1)
+
+
+class _GroupWindowIndexer(BaseIndexer):
+    """Trailing windows of ``window_size`` rows that never reach back past ``group_starts``."""
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        start = np.maximum(end - self.window_size, self.group_starts).astype(np.int64)
+        return start, end
+
+
+def _is_contiguous(codes):
+    # Every group forms a single run when the number of runs equals the number of groups
+    if len(codes) == 0:
+        return True
+    return np.count_nonzero(codes[1:] != codes[:-1]) + 1 == len(np.unique(codes))
+
+
+def _group_positions(codes):
+    """Position of each row within its run of equal group codes."""
+    positions = np.arange(len(codes))
+    if len(codes) == 0:
+        return positions
+    starts = np.empty(len(codes), dtype=bool)
+    starts[0] = True
+    starts[1:] = codes[1:] != codes[:-1]
+    return positions - np.maximum.accumulate(np.where(starts, positions, 0))
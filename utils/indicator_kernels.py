@@ -0,0 +1,207 @@
+import math
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    import numba
+except ImportError:  # Optional; the numba backend falls back to pandas without it
+    numba = None
+
+
+class NumpyKernels:
+    """Rolling and exponential kernels built from NumPy array operations and ``scipy.signal.lfilter``.
+
+    Every kernel takes a float64 array and the position of each row within its symbol
+    (``FinancialData.symbol_positions``), so windows and EMAs restart at each symbol's first row.
+    NaN handling matches pandas: a rolling window containing NaN has no value. EMAs of symbols
+    with gaps are left to pandas' compiled loop.
+    """
+
+    name = 'numpy'
+
+    def rolling_mean(self, values, window, positions):
+        out = np.full(len(values), np.nan)
+        if len(values) >= window:
+            out[window - 1:] = _window_sum(values, window) / window
+        return _mask_partial_windows(out, window, positions)
+
+    def rolling_std(self, values, window, positions, ddof=1):
+        out = np.full(len(values), np.nan)
+        if len(values) >= window and window > ddof:
+            # Two passes (mean, then squared deviations) avoid the cancellation of sum-of-squares
+            count = len(values) - window + 1
+            mean = _window_sum(values, window) / window
+            squares, deviation = np.zeros(count), np.empty(count)
+            for offset in range(window):
+                np.subtract(values[offset:offset + count], mean, out=deviation)
+                squares += np.square(deviation, out=deviation)
+            out[window - 1:] = np.sqrt(squares / (window - ddof))
+        return _mask_partial_windows(out, window, positions)
+
+    def ewm_mean(self, values, alpha, positions):
+        from scipy.signal import lfilter
+
+        out = np.empty(len(values))
+        starts = np.flatnonzero(positions == 0)
+        for start, end in zip(starts, np.append(starts[1:], len(values))):
+            segment = values[start:end]
+            if np.isnan(segment).any():
+                # Gaps make the decay vary per row, which lfilter cannot express; pandas' loop is compiled
+                out[start:end] = pd.Series(segment).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+            else:
+                # y[n] = alpha * x[n] + (1 - alpha) * y[n - 1], seeded so that y[0] = x[0]
+                out[start:end] = lfilter([alpha], [1, alpha - 1], segment, zi=[(1 - alpha) * segment[0]])[0]
+        return out
+
+
+def _window_sum(values, window):
+    # Sum of every full trailing window as ``window`` in-place adds of shifted slices; NaN propagates
+    count = len(values) - window + 1
+    total = values[:count].copy()
+    for offset in range(1, window):
+        total += values[offset:offset + count]
+    return total
+
+
+def _mask_partial_windows(out, window, positions):
+    # Windows that reach back into the previous symbol
+    out[positions < window - 1] = np.nan
+    return out
+
+
+def _rolling_mean_kernel(values, window, positions):
+    # Kahan-compensated running sum, restarted at every symbol's first row
+    out = np.empty(len(values))
+    total = compensation = 0.0
+    nan_count = 0
+    for i in range(len(values)):
+        if positions[i] == 0:
+            total = compensation = 0.0
+            nan_count = 0
+        x = values[i]
+        if x == x:
+            y = x - compensation
+            t = total + y
+            compensation = (t - total) - y
+            total = t
+        else:
+            nan_count += 1
+        if positions[i] >= window:
+            x = values[i - window]
+            if x == x:
+                y = -x - compensation
+                t = total + y
+                compensation = (t - total) - y
+                total = t
+            else:
+                nan_count -= 1
+        out[i] = total / window if positions[i] >= window - 1 and nan_count == 0 else np.nan
+    return out
+
+
+def _rolling_std_kernel(values, window, positions, ddof):
+    # Welford's add/remove updates, as in pandas' rolling variance
+    out = np.empty(len(values))
+    count = 0
+    mean = m2 = 0.0
+    nan_count = 0
+    for i in range(len(values)):
+        if positions[i] == 0:
+            count = 0
+            mean = m2 = 0.0
+            nan_count = 0
+        x = values[i]
+        if x == x:
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+        else:
+            nan_count += 1
+        if positions[i] >= window:
+            x = values[i - window]
+            if x == x:
+                count -= 1
+                if count == 0:
+                    mean = m2 = 0.0
+                else:
+                    delta = x - mean
+                    mean -= delta / count
+                    m2 -= delta * (x - mean)
+            else:
+                nan_count -= 1
+        if positions[i] >= window - 1 and nan_count == 0 and window > ddof:
+            out[i] = math.sqrt(max(m2, 0.0) / (window - ddof))
+        else:
+            out[i] = np.nan
+    return out
+
+
+def _ewm_mean_kernel(values, alpha, positions):
+    # pandas' ewm(adjust=False) recursion: NaNs hold the average and decay the weight of the past
+    out = np.empty(len(values))
+    weighted = np.nan
+    old_weight = 1.0
+    for i in range(len(values)):
+        x = values[i]
+        if positions[i] == 0:
+            weighted = x
+            old_weight = 1.0
+        elif weighted == weighted:
+            old_weight *= 1 - alpha
+            if x == x:
+                if weighted != x:
+                    weighted = (old_weight * weighted + alpha * x) / (old_weight + alpha)
+                old_weight = 1.0
+        elif x == x:
+            weighted = x
+        out[i] = weighted
+    return out
+
+
+class NumbaKernels:
+    """The same kernels as single-pass loops compiled with Numba; each costs O(1) per row."""
+
+    name = 'numba'
+
+    def __init__(self):
+        jit = numba.njit(cache=True, nogil=True)
+        self._rolling_mean = jit(_rolling_mean_kernel)
+        self._rolling_std = jit(_rolling_std_kernel)
+        self._ewm_mean = jit(_ewm_mean_kernel)
+
+    def rolling_mean(self, values, window, positions):
+        return self._rolling_mean(values, window, positions)
+
+    def rolling_std(self, values, window, positions, ddof=1):
+        return self._rolling_std(values, window, positions, ddof)
+
+    def ewm_mean(self, values, alpha, positions):
+        return self._ewm_mean(values, alpha, positions)
+
+
+BACKENDS = {'numpy': NumpyKernels, 'numba': NumbaKernels}
+_instances = {}
+
+
+def available_backends():
+    return ['pandas', 'numpy'] + (['numba'] if numba is not None else [])
+
+
+def get_kernels(backend):
+    """Kernels for ``backend``, or None for plain pandas.
+
+    Asking for ``'numba'`` when Numba is not installed warns and falls back to pandas.
+    """
+    if backend == 'pandas':
+        return None
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend}. Available backends: {available_backends()}")
+    if backend == 'numba' and numba is None:
+        warnings.warn("Numba is not installed; falling back to the pandas backend.")
+        return None
+    if backend not in _instances:
+        _instances[backend] = BACKENDS[backend]()
+    return _instances[backend]
@@ -0,0 +1,224 @@
+import glob
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.training import model_path, scalers_path
+
+MODEL_FILE_PATTERN = re.compile(r'^(?P<symbol>.+)_(?P<interval>[^_]+)_model\.h5$')
+
+
+class LoadedModel:
+    """A saved network with the scalers and look-back it was trained with."""
+
+    def __init__(self, symbol, interval, model, feature_scaler, target_scaler, lookback, feature_spec=None):
+        self.symbol = symbol
+        self.interval = interval
+        self.model = model
+        self.feature_scaler = feature_scaler
+        self.target_scaler = target_scaler
+        self.lookback = lookback
+        self.feature_spec = feature_spec
+
+    def predict(self, windows):
+        """Prices for a ``(samples, lookback, features)`` stack of unscaled feature windows."""
+        # MinMaxScaler.transform is x * scale_ + min_; applying it directly keeps the 3D shape
+        scaled = (windows * self.feature_scaler.scale_ + self.feature_scaler.min_).astype('float32')
+        predictions = np.asarray(self.model.predict_on_batch(scaled)).reshape(-1, 1)
+        return self.target_scaler.inverse_transform(predictions).ravel()
+
+
+def load_saved_model(models_dir, symbol, interval):
+    from tensorflow.keras.models import load_model
+
+    artifacts = scalers_path(models_dir, symbol, interval)
+    if not os.path.exists(artifacts):
+        raise FileNotFoundError(f"No scalers saved for {symbol} {interval} at {artifacts}; retrain the model "
+                                f"so they are saved next to it.")
+    with open(artifacts, 'rb') as file:
+        saved = pickle.load(file)
+    # Inference never trains, so the optimizer state does not need to be restored
+    model = load_model(model_path(models_dir, symbol, interval), compile=False)
+    return LoadedModel(symbol, interval, model, saved['feature_scaler'], saved['target_scaler'], saved['lookback'],
+                       saved.get('feature_spec'))
+
+
+def saved_models(models_dir='models', interval=None):
+    """``(symbol, interval)`` of every saved model in ``models_dir``."""
+    found = []
+    for path in sorted(glob.glob(os.path.join(models_dir, '*_model.h5'))):
+        match = MODEL_FILE_PATTERN.match(os.path.basename(path))
+        if match and (interval in (None, 'all') or match['interval'] == interval):
+            found.append((match['symbol'], match['interval']))
+    return found
+
+
+class ModelCache:
+    """At most ``max_models`` loaded models, evicting the least recently used."""
+
+    def __init__(self, models_dir='models', max_models=16, load=load_saved_model):
+        self.models_dir = models_dir
+        self.max_models = max_models
+        self.load = load
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_time = 0.0
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            if key in self._models:
+                self.hits += 1
+                self._models.move_to_end(key)
+                return self._models[key]
+            self.misses += 1
+            start = time.perf_counter()
+            model = self.load(self.models_dir, symbol, interval)
+            self.load_time += time.perf_counter() - start
+            self._models[key] = model
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+                self.evictions += 1
+            return model
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'loaded': len(self._models), 'load_time': self.load_time}
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+
+class PredictionRequest:
+    def __init__(self, symbol, interval, window, timestamp=None):
+        self.symbol = symbol
+        self.interval = interval
+        self.window = window  # (lookback, features) unscaled feature rows, oldest first
+        self.timestamp = timestamp
+
+
+class InferenceReport:
+    def __init__(self, requests, predictions, errors, latencies, elapsed, cache_stats):
+        self.requests = requests
+        self.predictions = predictions
+        self.errors = errors
+        self.latencies = latencies
+        self.elapsed = elapsed
+        self.cache_stats = cache_stats
+
+    @property
+    def throughput(self):
+        return len(self.requests) / self.elapsed if self.elapsed else float('inf')
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        latencies = np.asarray(self.latencies)
+        if not len(latencies):
+            return {}
+        result = {f'p{p}': float(np.percentile(latencies, p)) for p in percentiles}
+        result['max'] = float(latencies.max())
+        return result
+
+    def summary(self):
+        return pd.DataFrame({'symbol': [request.symbol for request in self.requests],
+                             'interval': [request.interval for request in self.requests],
+                             'timestamp': [request.timestamp for request in self.requests],
+                             'prediction': self.predictions, 'latency': self.latencies, 'error': self.errors})
+
+    def __str__(self):
+        failed = sum(error is not None for error in self.errors)
+        percentiles = ', '.join(f'{name} {value * 1000:.1f} ms' for name, value in self.latency_percentiles().items())
+        return (f"{len(self.requests) - failed} of {len(self.requests)} predictions in {self.elapsed:.3f}s "
+                f"({self.throughput:.1f}/s); latency {percentiles}; cache {self.cache_stats}")
+
+
+class BatchPredictor:
+    """Scores prediction requests in batches against a warm cache of saved models.
+
+    Requests are grouped per model so every model is fetched once per call, and each group runs as
+    vectorized ``predict`` calls of up to ``micro_batch_size`` windows. Predictions are returned as
+    prices (inverse-scaled). A request whose model cannot be loaded gets an error instead of
+    failing the batch.
+    """
+
+    def __init__(self, models_dir='models', cache=None, max_models=16, micro_batch_size=256):
+        self.cache = cache if cache is not None else ModelCache(models_dir, max_models)
+        self.micro_batch_size = micro_batch_size
+
+    def predict(self, requests):
+        requests = list(requests)
+        predictions = [None] * len(requests)
+        errors = [None] * len(requests)
+        latencies = [None] * len(requests)
+        groups = OrderedDict()
+        for position, request in enumerate(requests):
+            groups.setdefault((request.symbol, request.interval), []).append(position)
+
+        start = time.perf_counter()
+        for (symbol, interval), positions in groups.items():
+            try:
+                model = self.cache.get(symbol, interval)
+                for batch_start in range(0, len(positions), self.micro_batch_size):
+                    batch = positions[batch_start:batch_start + self.micro_batch_size]
+                    windows = np.stack([np.asarray(requests[position].window, dtype='float64')[-model.lookback:]
+                                        for position in batch])
+                    for position, prediction in zip(batch, model.predict(windows)):
+                        predictions[position] = float(prediction)
+                    done = time.perf_counter() - start
+                    for position in batch:
+                        latencies[position] = done
+            except Exception as e:
+                done = time.perf_counter() - start
+                for position in positions:
+                    if predictions[position] is None:
+                        errors[position] = f'{type(e).__name__}: {e}'
+                        latencies[position] = done
+        return InferenceReport(requests, predictions, errors, latencies, time.perf_counter() - start,
+                               self.cache.stats())
+
+    def latest_request(self, symbol, interval):
+        """A request for the bar after the latest stored one, built with the training feature recipe."""
+        from LSTM_model import LSTMModel
+
+        model = self.cache.get(symbol, interval)
+        features, _ = LSTMModel(symbol=symbol, interval=interval, feature_cache=None).build_features()
+        if hasattr(model.feature_scaler, 'feature_names_in_'):
+            features = features[list(model.feature_scaler.feature_names_in_)]
+        window = features.iloc[-model.lookback:]
+        return PredictionRequest(symbol, interval, window.to_numpy(dtype='float64'), timestamp=window.index[-1])
+
+
+def main(models_dir, interval, symbols, micro_batch_size):
+    targets = [(symbol, model_interval) for symbol, model_interval in saved_models(models_dir, interval)
+               if symbols == ['all'] or symbol in symbols]
+    if not targets:
+        print(f'No saved models for interval {interval} in {models_dir}.')
+        return None
+    predictor = BatchPredictor(models_dir, max_models=len(targets), micro_batch_size=micro_batch_size)
+    requests = [predictor.latest_request(symbol, model_interval) for symbol, model_interval in targets]
+    report = predictor.predict(requests)
+    print(report.summary().to_string(index=False))
+    print(report)
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Predict the next close of every symbol with its saved LSTM model.")
+    parser.add_argument('--models-dir', default='models', help='Directory of saved models (default: models).')
+    parser.add_argument('--interval', default='1d', help='Model interval (default: 1d). Use "all" for every interval.')
+    parser.add_argument('--symbols', nargs='+', default=['all'], help='Symbols to score (default: all).')
+    parser.add_argument('--micro-batch-size', type=int, default=256, help='Windows per predict call.')
+    args = parser.parse_args()
+    main(args.models_dir, args.interval, args.symbols, args.micro_batch_size)
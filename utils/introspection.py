@@ -1,11 +1,17 @@
+import hashlib
+import os
 import re
+import threading
 from enum import Enum
 from typing import List, Dict, Any, Union, Callable
 import inspect
 
+# Marks a lazily loaded FunctionMetadata attribute that has not been loaded yet
+_UNSET = object()
 
-def get_params_metadata(func):
-    sig = inspect.signature(func)
+
+def get_params_metadata(func, sig=None):
+    sig = sig or inspect.signature(func)
     params = [{'name': k,
                'type': str(v.annotation),
                'default': v.default if v.default is not inspect.Parameter.empty else None,
@@ -14,25 +20,69 @@ def get_params_metadata(func):
     return params
 
 
-def create_executable_function(code_string):
-    # Create an empty dictionary to serve as the local namespace for the code
-    local_vars = {}
+class StepRegistry:
+    """Functions compiled from step source strings, interned by a hash of the source.
+
+    Every distinct source string is compiled and executed once per process; rebuilding a step
+    from the same source (e.g. on each Streamlit rerun, or when a saved pipeline is loaded)
+    returns the same function object. The source of every compiled function is kept, so it can
+    be shown even though ``inspect.getsource`` cannot read it back.
+    """
+
+    def __init__(self):
+        self.compiled = 0
+        self.hits = 0
+        self._functions = {}  # source hash -> function
+        self._sources = {}  # code object -> source
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def source_hash(code_string):
+        return hashlib.sha256(code_string.encode()).hexdigest()
+
+    def compile(self, code_string):
+        key = self.source_hash(code_string)
+        with self._lock:
+            if key in self._functions:
+                self.hits += 1
+                return self._functions[key]
+
+        # Create an empty dictionary to serve as the local namespace for the code
+        local_vars = {}
+        # Compile the code string into a code object and execute it within the local namespace
+        exec(compile(code_string, '<string>', 'exec'), globals(), local_vars)
+
+        # Extract the function from the executed code
+        func = next((v for v in local_vars.values() if callable(v)), None)
+        if func is None:
+            raise ValueError("No function found in the provided code string")
 
-    try:
-        # Compile the code string into a code object
-        compiled_code = compile(code_string, '<string>', 'exec')
+        with self._lock:
+            self.compiled += 1
+            func = self._functions.setdefault(key, func)
+            self._sources[func.__code__] = code_string
+        return func
 
-        # Execute the compiled code within the local namespace
-        exec(compiled_code, globals(), local_vars)
+    def source_of(self, func):
+        return self._sources.get(getattr(func, '__code__', None))
 
-        # Extract the function name from the executed code
-        func_name = next((k for k, v in local_vars.items() if callable(v)), None)
-        if not func_name:
-            raise ValueError("No function found in the provided code string")
+    def stats(self):
+        with self._lock:
+            return {'functions': len(self._functions), 'compiled': self.compiled, 'hits': self.hits}
 
-        # Return the executable function
-        return local_vars.get(func_name)
+    def clear(self):
+        with self._lock:
+            self._functions.clear()
+            self._sources.clear()
 
+
+step_registry = StepRegistry()
+
+
+def create_executable_function(code_string):
+    try:
+        # Compiled once per distinct source string; later calls return the same function
+        return step_registry.compile(code_string)
     except Exception as e:
         # Handle any exceptions that may occur during execution
         print(f"Error: {e}")
@@ -73,6 +123,11 @@ class FunctionMetadata:
             self.value = default
             self.kind = kind
 
+    # Source text is only read (with inspect, which parses the whole file) when first needed
+    _source_code = _UNSET
+    _line = _UNSET
+    _source_func = None
+
     def __init__(self, func: Union[Dict[str, Dict[str, Any]], Callable, str]):
         if inspect.isfunction(func):
             self.func = func
@@ -82,34 +137,71 @@ class FunctionMetadata:
                     self.func_name = func.__name__
                 else:
                     self.func_name = func.__wrapped__.__name__
-                    self.source_code = inspect.getsource(func.__wrapped__).strip()
-                    self.line = inspect.getsourcelines(func.__wrapped__)[1]
+                    self._source_func = func.__wrapped__
             else:
-                try:
-                    self.func_name = func.__name__
-                    self.source_code = inspect.getsource(func).strip()
-                    self.line = inspect.getsourcelines(func)[1]
-                except OSError:
-                    self.source_code = None
+                self.func_name = func.__name__
+                self._source_func = func
             self.module = inspect.getmodule(func).__name__
-            params_dict = get_params_metadata(func)
+            signature = inspect.signature(func)
+            params_dict = get_params_metadata(func, signature)
             self.params = [self.ParamsMetadata(**param) for param in params_dict]
-            self.return_annotation = str(inspect.signature(func).return_annotation)
+            self.return_annotation = str(signature.return_annotation)
             self.file = inspect.getfile(func)
         elif isinstance(func, dict):
             self.func_name = func['func_name']
             self.docstring = func['docstring']
             self.source_code = func['source_code']
-            self.func = create_executable_function(func['source_code'])
+            # Module function info already holds the function; otherwise compile (once) from source
+            self.func = func.get('func') or create_executable_function(func['source_code'])
             self.module = func['module']
             params_dict = func['params']
-            self.params = [self.ParamsMetadata(**param) for param in params_dict]
+            self.params = [self.ParamsMetadata(**{key: param[key] for key in ('name', 'type', 'default', 'kind')})
+                           for param in params_dict]
+            # Values chosen in the UI are stored on the param dicts
+            for param, param_dict in zip(self.params, params_dict):
+                if 'value' in param_dict:
+                    param.value = param_dict['value']
             self.return_annotation = func['return_annotation']
             self.file = func['file']
             self.line = func['line']
         elif isinstance(func, str):
             self.__init__(create_executable_function(func))
 
+    @property
+    def source_code(self):
+        if self._source_code is _UNSET:
+            self._load_source()
+        return self._source_code
+
+    @source_code.setter
+    def source_code(self, value):
+        self._source_code = value
+
+    @property
+    def line(self):
+        if self._line is _UNSET:
+            self._load_source()
+        return self._line
+
+    @line.setter
+    def line(self, value):
+        self._line = value
+
+    def _load_source(self):
+        source, line = None, None
+        if self._source_func is not None:
+            source = step_registry.source_of(self._source_func)
+            if source is None:
+                try:
+                    lines, line = inspect.getsourcelines(self._source_func)
+                    source = ''.join(lines).strip()
+                except (OSError, TypeError):
+                    pass
+        if self._source_code is _UNSET:
+            self._source_code = source
+        if self._line is _UNSET:
+            self._line = line
+
     def __call__(self, *args, use_saved_params=False, use_default_params=True, use_preset_params=True, **kwargs):
         if use_saved_params:
             # Create a dictionary of parameter names and values from the saved params
@@ -124,6 +216,30 @@ class FunctionMetadata:
             preset_params.update(kwargs)
             return self.func(*args, **preset_params)
 
+    def param_values(self):
+        """The step's parameter values by name, leaving out the first (data) parameter."""
+        return {param.name: param.value for param in self.params[1:]
+                if param.kind not in ('VAR_POSITIONAL', 'VAR_KEYWORD')}
+
+    def apply_params(self):
+        """Keyword arguments the step runs with: its parameter values, leaving unset (None) ones at their default.
+
+        Raises ValueError when a parameter without a default is unset, before the step runs.
+        """
+        # Wrappers (e.g. add_column_operation lambdas) report the wrapped signature but only take the data
+        accepted = inspect.signature(self.func, follow_wrapped=False).parameters
+        values = {name: value for name, value in self.param_values().items() if name in accepted}
+        missing = [name for name, value in values.items()
+                   if value is None and accepted[name].default is inspect.Parameter.empty]
+        if missing:
+            raise ValueError(f"Step {self.func_name} needs a value for {', '.join(missing)}.")
+        return {name: value for name, value in values.items() if value is not None}
+
+    def apply(self, data, **extra):
+        """Run the step on ``data`` with its parameter values (and ``extra`` keyword arguments, e.g. a two-pass
+        step's ``state``)."""
+        return self.func(data, **self.apply_params(), **extra)
+
     # @classmethod
     # def from_code_string(cls, code_string):
     #     code_string = re.sub(r'^import .*$', '', code_string, flags=re.MULTILINE)
@@ -163,26 +279,42 @@ class FunctionMetadata:
 
 def get_function_info(func) -> Dict[str, Any]:
     """Gather information about a function."""
+    source_lines, line = inspect.getsourcelines(func)
+    signature = inspect.signature(func)
     return {
         'func_name': func.__name__,
         'func': func,
         'docstring': inspect.getdoc(func),
-        'source_code': inspect.getsource(func).strip(),
+        'source_code': ''.join(source_lines).strip(),
         'module': inspect.getmodule(func).__name__,
-        'params': get_params_metadata(func),
-        'return_annotation': str(inspect.signature(func).return_annotation),
+        'params': get_params_metadata(func, signature),
+        'return_annotation': str(signature.return_annotation),
         'file': inspect.getfile(func),
-        'line': inspect.getsourcelines(func)[1]
+        'line': line
     }
 
 
+_module_functions_info = {}
+
+
 def get_module_functions_info(module) -> Dict[str, Dict[str, Any]]:
-    """Get information about all functions in a module."""
-    function_dict = {}
-    for name, func in inspect.getmembers(module, inspect.isfunction):
-        function_info = get_function_info(func)
-        function_dict[name] = function_info
-    return function_dict
+    """Get information about all functions in a module.
+
+    The introspection runs once per module (again only if the module is reloaded or its file
+    changes); callers get fresh dicts they can annotate without affecting later calls.
+    """
+    file = getattr(module, '__file__', None)
+    key = (module.__name__, id(module), file, os.path.getmtime(file) if file and os.path.exists(file) else None)
+    if key not in _module_functions_info:
+        _module_functions_info[key] = {name: get_function_info(func)
+                                       for name, func in inspect.getmembers(module, inspect.isfunction)
+                                       if not name.startswith('_')}
+    return {name: dict(info, params=[dict(param) for param in info['params']])
+            for name, info in _module_functions_info[key].items()}
+
+
+def clear_introspection_cache():
+    _module_functions_info.clear()
 
 
 def get_class_info(cls) -> Dict[str, Any]:
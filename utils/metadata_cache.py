@@ -0,0 +1,141 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.downloader import ConcurrentDownloader
+
+
+def fetch_yahoo_info(symbol):
+    import yfinance as yf
+    return yf.Ticker(symbol).info
+
+
+class SymbolMetadataCache:
+    """Symbol info payloads (``yf.Ticker(symbol).info``) cached in memory and in SQLite with a TTL.
+
+    Each symbol's payload is fetched once and shared by every accessor. Expired entries are
+    refetched; if the refetch fails the stale payload is served instead of raising.
+    """
+
+    def __init__(self, path='database/symbol_metadata.sqlite3', ttl=7 * 24 * 3600, fetch=fetch_yahoo_info):
+        self.path = path
+        self.ttl = ttl
+        self.fetch = fetch
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self._memory = {}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS symbol_metadata '
+                         '(symbol TEXT PRIMARY KEY, fetched_at REAL NOT NULL, info TEXT NOT NULL)')
+
+    def get(self, symbol):
+        cached = self._lookup([symbol]).get(symbol)
+        if cached is not None and self._is_fresh(cached[0]):
+            self._count('hits')
+            return cached[1]
+        self._count('misses')
+        try:
+            info = self.fetch(symbol)
+        except Exception:
+            if cached is None:
+                raise
+            self._count('stale_hits')
+            return cached[1]
+        self._save({symbol: info})
+        return info
+
+    def get_many(self, symbols, max_workers=8, requests_per_second=None, max_retries=3):
+        """Return ``{symbol: info}``, fetching all missing or expired symbols concurrently.
+
+        Symbols that cannot be fetched and have no stale copy are left out of the result.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        cached = self._lookup(symbols)
+        result, to_fetch = {}, []
+        for symbol in symbols:
+            if symbol in cached and self._is_fresh(cached[symbol][0]):
+                result[symbol] = cached[symbol][1]
+            else:
+                to_fetch.append(symbol)
+        self._count('hits', len(result))
+        self._count('misses', len(to_fetch))
+
+        if to_fetch:
+            downloader = ConcurrentDownloader(self.fetch, max_workers=max_workers,
+                                              requests_per_second=requests_per_second, max_retries=max_retries)
+            report = downloader.download(to_fetch)
+            self._save({outcome.symbol: outcome.data for outcome in report.succeeded()})
+            for outcome in report.outcomes.values():
+                if outcome.ok:
+                    result[outcome.symbol] = outcome.data
+                elif outcome.symbol in cached:
+                    self._count('stale_hits')
+                    result[outcome.symbol] = cached[outcome.symbol][1]
+        return {symbol: result[symbol] for symbol in symbols if symbol in result}
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._memory.clear()
+            else:
+                self._memory.pop(symbol, None)
+        with self._connect() as conn:
+            if symbol is None:
+                conn.execute('DELETE FROM symbol_metadata')
+            else:
+                conn.execute('DELETE FROM symbol_metadata WHERE symbol = ?', (symbol,))
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'stale_hits': self.stale_hits,
+                    'in_memory': len(self._memory)}
+
+    def _is_fresh(self, fetched_at):
+        return self.ttl is None or time.time() - fetched_at < self.ttl
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _lookup(self, symbols):
+        with self._lock:
+            found = {symbol: self._memory[symbol] for symbol in symbols if symbol in self._memory}
+        missing = [symbol for symbol in symbols if symbol not in found]
+        if missing:
+            with self._connect() as conn:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = conn.execute(f'SELECT symbol, fetched_at, info FROM symbol_metadata '
+                                        f'WHERE symbol IN ({",".join("?" * len(chunk))})', chunk).fetchall()
+                    for symbol, fetched_at, info in rows:
+                        found[symbol] = (fetched_at, json.loads(info))
+            with self._lock:
+                self._memory.update({symbol: found[symbol] for symbol in missing if symbol in found})
+        return found
+
+    def _save(self, infos):
+        if not infos:
+            return
+        fetched_at = time.time()
+        with self._lock:
+            self._memory.update({symbol: (fetched_at, info) for symbol, info in infos.items()})
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO symbol_metadata (symbol, fetched_at, info) VALUES (?, ?, ?)',
+                             [(symbol, fetched_at, json.dumps(info, default=str)) for symbol, info in infos.items()])
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation keeps the cache safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
@@ -0,0 +1,255 @@
+import glob
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+import pyarrow.parquet as pq
+from threadpoolctl import threadpool_limits
+
+from utils.file_utils import write_json
+from utils.pipeline_plan import read_plan
+from utils.step_profiling import peak_rss_since, reset_peak_rss
+
+# Thread pools of OpenMP and the BLAS libraries numpy and pandas use; capped before they are imported
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+INPUT_READERS = {'.csv': pd.read_csv, '.parquet': pd.read_parquet}
+OUTPUT_FORMATS = ('parquet', 'feather')
+# Memory budgeting. A file's peak while it runs measured about twice its loaded frame: the frame,
+# the one copy Pipeline.run makes of it and the steps' output (entries record the measured peak)
+PEAK_PER_FRAME_BYTE = 2
+# A loaded CSV takes about twice its text: numbers shrink to 8 bytes, strings become Python objects
+FRAME_PER_CSV_BYTE = 2
+# Parquet compresses too well to go by file size; its frame is sized from the row count and column types
+STRING_VALUE_BYTES = 64
+
+
+def _init_worker(threads):
+    # Unpickling this initializer already imported numpy, so its BLAS pool is capped at run time;
+    # the variables cover libraries a step imports later
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    threadpool_limits(threads)
+
+
+def total_memory():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return 8 << 30
+
+
+def estimated_frame_size(path):
+    if os.path.splitext(path)[1].lower() != '.parquet':
+        return os.path.getsize(path) * FRAME_PER_CSV_BYTE
+    metadata = pq.read_metadata(path)
+    row_bytes = 0
+    for field in metadata.schema.to_arrow_schema():
+        try:
+            row_bytes += max(field.type.bit_width // 8, 1)
+        except ValueError:  # variable width: strings, binary, lists
+            row_bytes += STRING_VALUE_BYTES
+    return metadata.num_rows * row_bytes
+
+
+def estimated_memory(path):
+    return estimated_frame_size(path) * PEAK_PER_FRAME_BYTE
+
+
+def expand_inputs(patterns):
+    """Input files matching ``patterns`` (recursive globs), in order and without duplicates."""
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern, recursive=True)):
+            if os.path.isfile(path) and os.path.splitext(path)[1].lower() in INPUT_READERS and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def output_path(input_path, input_root, output_dir, output_format):
+    relative = os.path.relpath(input_path, input_root)
+    return os.path.join(output_dir, os.path.splitext(relative)[0] + f'.{output_format}')
+
+
+def write_output(data, path, output_format):
+    if isinstance(data, pd.Series):
+        data = data.to_frame()
+    if not isinstance(data, pd.DataFrame):
+        raise TypeError(f'The pipeline returned {type(data).__name__}, not a table that can be written.')
+    # Columnar formats need string column names
+    data = data.rename(columns=str)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    if output_format == 'feather':
+        data.reset_index(drop=isinstance(data.index, pd.RangeIndex)).to_feather(tmp_path)
+    else:
+        data.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+    return data.shape
+
+
+def run_file(plan, input_path, output, output_format='parquet', chunksize=None):
+    """Apply a pipeline plan to one file and write the result; runs inside a pool worker and never raises.
+
+    With ``chunksize`` the file is streamed through the pipeline (see ``Pipeline.stream``) straight
+    into a Parquet output, so it need not fit in memory; reading and writing then count as run time.
+    """
+    from models.Pipeline import Pipeline
+
+    entry = {'input': input_path, 'output': output, 'status': 'failed', 'rows_in': None, 'rows_out': None,
+             'columns_out': None, 'read_time': None, 'run_time': None, 'write_time': None, 'error': None,
+             'peak_memory': None, 'pid': os.getpid()}
+    # Measured peak (Linux), to check the estimates the memory budget is based on
+    rss_before = reset_peak_rss()
+    try:
+        if chunksize:
+            start = time.perf_counter()
+            pipeline = Pipeline.from_plan(plan, cache=False)
+            entry['rows_out'] = pipeline.run_streaming(input_path, output, chunksize)
+            entry.update(status='succeeded', run_time=time.perf_counter() - start, output_bytes=os.path.getsize(output))
+            return entry
+
+        start = time.perf_counter()
+        data = INPUT_READERS[os.path.splitext(input_path)[1].lower()](input_path)
+        entry.update(rows_in=len(data), read_time=time.perf_counter() - start)
+
+        start = time.perf_counter()
+        # Steps are compiled once per worker process; each file runs once, so nothing is cached
+        pipeline = Pipeline.from_plan(plan, data, cache=False)
+        # Memory is measured for the whole file below; the per-step timings are cheap
+        entry['steps'] = pipeline.run(memory=None)['step_reports']
+        entry['run_time'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        entry['rows_out'], entry['columns_out'] = write_output(pipeline.intermediate_data, output, output_format)
+        entry.update(status='succeeded', write_time=time.perf_counter() - start,
+                     output_bytes=os.path.getsize(output))
+    except Exception as e:
+        entry['error'] = f'{type(e).__name__}: {e}'
+        entry['traceback'] = traceback.format_exc()
+    entry['peak_memory'] = peak_rss_since(rss_before)
+    return entry
+
+
+def run_batch(plan, inputs, output_dir, input_root=None, output_format='parquet', max_workers=None,
+              memory_budget=None, skip_existing=False, report_path=None, chunksize=None):
+    """Apply a pipeline plan to every input file across a pool of worker processes.
+
+    Files are submitted in order while the estimated memory of the files in flight stays within
+    ``memory_budget`` bytes (by default half the machine's memory); one file always runs even
+    if it alone exceeds it. A failing file is reported and the others carry on. With
+    ``skip_existing``, files whose output is newer than the input are skipped, so a run over a
+    directory that receives new daily files only processes the new ones. With ``chunksize``, files
+    are streamed in chunks of that many rows and each counts for at most its share of the budget.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format '{output_format}'; expected one of {OUTPUT_FORMATS}.")
+    if chunksize and output_format != 'parquet':
+        raise ValueError('Streamed (chunked) runs can only write parquet outputs.')
+    input_root = input_root or (os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in inputs])
+                                if inputs else '.')
+    memory_budget = memory_budget or total_memory() // 2
+    cpu_count = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers or cpu_count, len(inputs) or 1))
+
+    started = time.time()
+    report = {'started_at': started, 'finished_at': None, 'output_dir': output_dir, 'output_format': output_format,
+              'max_workers': max_workers, 'memory_budget': memory_budget, 'chunksize': chunksize,
+              'plan_steps': len(plan['steps']), 'files': []}
+    pending = []
+    for path in inputs:
+        output = output_path(os.path.abspath(path), input_root, output_dir, output_format)
+        if skip_existing and os.path.exists(output) and os.path.getmtime(output) >= os.path.getmtime(path):
+            report['files'].append({'input': path, 'output': output, 'status': 'skipped', 'error': None})
+        else:
+            estimate = estimated_memory(path)
+            if chunksize:
+                # Streamed files hold a few chunks at a time, not the whole file
+                estimate = min(estimate, memory_budget // max_workers)
+            pending.append((path, output, estimate))
+
+    def record(entry, estimate):
+        entry['estimated_memory'] = estimate
+        report['files'].append(entry)
+        times = ', '.join(f"{name} {entry[f'{name}_time']:.2f}s" for name in ('read', 'run', 'write')
+                          if entry.get(f'{name}_time') is not None)
+        print(f"[{len(report['files'])}/{len(inputs)}] {entry['input']}: {entry['status']}"
+              + (f" ({entry['error']})" if entry['error'] else f" -> {entry['output']} ({times})"))
+        if report_path:
+            write_json(report, report_path, default=str)
+
+    # Each worker holds one file at a time, so one thread each is enough
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(1,)) as pool:
+        in_flight, reserved = {}, 0
+        while pending or in_flight:
+            while pending and len(in_flight) < max_workers and (not in_flight or
+                                                               reserved + pending[0][2] <= memory_budget):
+                path, output, estimate = pending.pop(0)
+                in_flight[pool.submit(run_file, plan, path, output, output_format, chunksize)] = (path, output, estimate)
+                reserved += estimate
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, output, estimate = in_flight.pop(future)
+                reserved -= estimate
+                try:
+                    entry = future.result()
+                except Exception as e:  # e.g. the worker process died
+                    entry = {'input': path, 'output': output, 'status': 'failed', 'error': f'{type(e).__name__}: {e}'}
+                record(entry, estimate)
+
+    report['finished_at'] = time.time()
+    for status in ('succeeded', 'failed', 'skipped'):
+        report[status] = sum(entry['status'] == status for entry in report['files'])
+    if report_path:
+        write_json(report, report_path, default=str)
+    return report
+
+
+def print_report(report):
+    files = pd.DataFrame(report['files'])
+    columns = [column for column in ('input', 'status', 'rows_in', 'rows_out', 'read_time', 'run_time', 'write_time',
+                                     'error') if column in files.columns]
+    if not files.empty:
+        print(files[columns].to_string(index=False))
+    print(f"{report['succeeded']} succeeded, {report['failed']} failed, {report['skipped']} skipped in "
+          f"{report['finished_at'] - report['started_at']:.1f}s")
+
+
+def main(plan_path, patterns, output_dir, output_format='parquet', max_workers=None, memory_budget_mb=None,
+         skip_existing=False, report_path=None, input_root=None, chunksize=None):
+    plan = read_plan(plan_path)
+    inputs = expand_inputs(patterns)
+    if not inputs:
+        print(f'No CSV or Parquet files match {patterns}.')
+        return None
+    report_path = report_path or os.path.join(output_dir, 'reports', f"batch-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    report = run_batch(plan, inputs, output_dir, input_root, output_format, max_workers,
+                       memory_budget_mb * (1 << 20) if memory_budget_mb else None, skip_existing, report_path,
+                       chunksize)
+    print_report(report)
+    print(f'Report saved to {report_path}')
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Apply a saved pipeline plan to many data files in parallel.')
+    parser.add_argument('plan', help='Pipeline plan JSON file (saved from the Pipeline page or Pipeline.save_plan).')
+    parser.add_argument('inputs', nargs='+', help='Input files or globs, e.g. "financial_data/**/*.csv".')
+    parser.add_argument('--output-dir', default='pipeline_output', help='Directory for the outputs (default: pipeline_output).')
+    parser.add_argument('--input-root', default=None, help='Outputs mirror the input paths relative to this directory.')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='parquet', help='Output format (default: parquet).')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU).')
+    parser.add_argument('--memory-budget', type=int, default=None, help='MB of estimated input data in flight (default: half the RAM).')
+    parser.add_argument('--skip-existing', action='store_true', help='Skip files whose output is newer than the input.')
+    parser.add_argument('--chunksize', type=int, default=None, help='Stream each file in chunks of this many rows (parquet output only).')
+    parser.add_argument('--report', default=None, help='JSON report path (default: <output-dir>/reports/batch-<time>.json).')
+    args = parser.parse_args()
+    report = main(args.plan, args.inputs, args.output_dir, args.format, args.workers, args.memory_budget,
+                  args.skip_existing, args.report, args.input_root, args.chunksize)
+    sys.exit(1 if report is None or report['failed'] else 0)
@@ -0,0 +1,139 @@
+import hashlib
+import importlib
+import inspect
+import json
+import re
+import textwrap
+import time
+
+from utils.file_utils import write_json
+from utils.introspection import FunctionMetadata, step_registry
+
+PLAN_FORMAT = 'alphanetstream.pipeline-plan'
+PLAN_VERSION = 1
+
+
+def code_hash(source):
+    return hashlib.sha256(source.encode()).hexdigest() if source is not None else None
+
+
+def function_reference(func):
+    """``{'module', 'qualname'}`` if ``func`` can be imported back by name, else None."""
+    module_name, qualname = getattr(func, '__module__', None), getattr(func, '__qualname__', '')
+    # <locals>/<lambda> names cannot be looked up, and __main__ is a different module in another process
+    if module_name in (None, '__main__') or '<' in qualname:
+        return None
+    try:
+        target = importlib.import_module(module_name)
+        for part in qualname.split('.'):
+            target = getattr(target, part)
+    except (ImportError, AttributeError):
+        return None
+    return {'module': module_name, 'qualname': qualname} if target is func else None
+
+
+def function_source(func):
+    """Source that defines ``func`` on its own, or None (lambdas and closures cannot be rebuilt from theirs)."""
+    # Decorated steps (e.g. two-pass ones) are wrappers; the source is the decorated function's
+    func = inspect.unwrap(func)
+    if func.__name__ == '<lambda>' or func.__code__.co_freevars:
+        return None
+    source = step_registry.source_of(func)
+    if source is None:
+        try:
+            source = textwrap.dedent(inspect.getsource(func))
+        except (OSError, TypeError):
+            return None
+    # Decorators (e.g. streaming declarations) are not in scope where the source is compiled again
+    return re.sub(r'^(@.*\n)+', '', source)
+
+
+def function_to_dict(func):
+    """How to get ``func`` back: an import reference when it has one, otherwise its source."""
+    reference = function_reference(func)
+    source = function_source(func)
+    if reference is None and source is None:
+        raise ValueError(f'Step function {func!r} can neither be imported by name nor has readable source.')
+    entry = {'ref': reference, 'code_hash': code_hash(source)}
+    if reference is None:
+        entry['source'] = source
+    return entry
+
+
+def function_from_dict(entry, verify=True):
+    if entry.get('ref') is not None:
+        target = importlib.import_module(entry['ref']['module'])
+        for part in entry['ref']['qualname'].split('.'):
+            target = getattr(target, part)
+        if verify and entry.get('code_hash') and code_hash(function_source(target)) != entry['code_hash']:
+            print(f"Warning: {entry['ref']['module']}.{entry['ref']['qualname']} changed since the plan was saved.")
+        return target
+    if code_hash(entry['source']) != entry['code_hash']:
+        raise ValueError('Step source does not match its code hash; the plan file is corrupted or was edited.')
+    # Compiled once per process; loading the same plan again reuses the function
+    return step_registry.compile(entry['source'])
+
+
+def step_to_dict(step):
+    entry = {'name': step.func_name}
+    operation = getattr(step, 'column_operation', None)
+    if operation is not None:
+        # add_column_operation steps: the column function and the arguments bound to it
+        func, args, kwargs = operation
+        entry.update(function_to_dict(func), args=list(args), kwargs=kwargs)
+    else:
+        entry.update(function_to_dict(step.func), params=step.param_values())
+        streaming = getattr(step, 'streaming', None) or getattr(step.func, 'streaming', None)
+        if streaming is not None and 'fit' in streaming:
+            if entry['ref'] is None:
+                raise ValueError(f'Two-pass step {step.func_name} must be importable by name to be saved; its '
+                                 f'fit and combine functions cannot be stored as JSON.')
+        elif streaming is not None:
+            entry['streaming'] = streaming
+    return entry
+
+
+def plan_from_steps(steps):
+    plan = {'format': PLAN_FORMAT, 'version': PLAN_VERSION, 'created_at': time.time(),
+            'steps': [step_to_dict(step) for step in steps]}
+    try:
+        json.dumps(plan)
+    except TypeError as e:
+        raise ValueError(f'Pipeline parameters must be JSON values (strings, numbers, lists, dicts) to be '
+                         f'saved: {e}') from e
+    return plan
+
+
+def check_plan(plan):
+    if plan.get('format') != PLAN_FORMAT:
+        raise ValueError('Not a pipeline plan.')
+    if plan.get('version', 0) > PLAN_VERSION:
+        raise ValueError(f"Pipeline plan version {plan['version']} is newer than this code supports "
+                         f"({PLAN_VERSION}).")
+
+
+def write_plan(plan, path):
+    write_json(plan, path, indent=1)
+
+
+def read_plan(path):
+    with open(path) as file:
+        plan = json.load(file)
+    check_plan(plan)
+    return plan
+
+
+def describe_plan(plan):
+    return [f"Step {index}: {entry['name']}" for index, entry in enumerate(plan['steps'], 1)]
+
+
+def step_from_dict(entry, verify=True):
+    """``(step, None, params)``, or ``(func, args, kwargs)`` for a column operation, rebuilt from a plan entry."""
+    func = function_from_dict(entry, verify)
+    if 'args' in entry:
+        return func, entry['args'], entry['kwargs']
+    func_metadata = FunctionMetadata(func)
+    func_metadata.func_name = entry['name']
+    if 'streaming' in entry:
+        func_metadata.streaming = entry['streaming']
+    return func_metadata, None, entry.get('params', {})
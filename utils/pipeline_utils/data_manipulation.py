@@ -1,7 +1,14 @@
+import pandas as pd
+
+# Imported as a module so the decorators are not listed as pipeline functions
+import utils.chunked_execution as chunked
+
+
 # data manipulation functions
+@chunked.row_local
 def replace_nan(data, value):
     """Replace NaN values with a specified value."""
-    pass
+    return data.fillna(value)
 
 
 def drop_duplicates(data):
@@ -9,9 +16,21 @@ def drop_duplicates(data):
     pass
 
 
-def normalize(data, columns):
-    """Normalize specified columns."""
-    pass
+def _column_range(data, columns):
+    return data[columns].min(), data[columns].max()
+
+
+def _combine_ranges(ranges):
+    lows, highs = zip(*ranges)
+    return pd.concat(lows, axis=1).min(axis=1), pd.concat(highs, axis=1).max(axis=1)
+
+
+@chunked.two_pass(fit=_column_range, combine=_combine_ranges)
+def normalize(data, columns, state):
+    """Normalize specified columns to [0, 1] (min-max over the whole data)."""
+    low, high = state
+    data[columns] = (data[columns] - low) / (high - low).replace(0, 1)
+    return data
 
 
 def encode_categorical(data, columns):
@@ -2,7 +2,8 @@ from utils.financial_features import FinancialData
 from utils.data_loader import DataLoader
 
 
-def build_dataset():
-    data = DataLoader().load_data()
+def build_dataset(interval='1d', symbols=None):
+    # Indicators are computed per symbol on the concatenated frame, so windows never cross symbols
+    data = DataLoader().load(interval, symbols=symbols)
     financial_data = FinancialData(data)
     return financial_data.get_data()
@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from tensorflow.keras.utils import Sequence
+except ImportError:  # The windowing only needs NumPy; Keras is needed to pass it to Model.fit
+    Sequence = object
+
+
+def window_ends(length, lookback, start=0, stop=None, positions=None):
+    """Row indices that can end a full look-back window, limited to ``[start, stop)``.
+
+    With ``positions`` (each row's position within its symbol, see ``FinancialData.symbol_positions``)
+    windows that would span two symbols are left out.
+    """
+    stop = length if stop is None else stop
+    ends = np.arange(max(start, lookback - 1), stop)
+    if positions is not None:
+        ends = ends[positions[ends] >= lookback - 1]
+    return ends
+
+
+class WindowedSequence(Sequence):
+    """Batches of ``(batch, lookback, features)`` windows cut on the fly from a 2D feature matrix.
+
+    Sample ``i`` is the ``lookback`` rows ending at ``ends[i]`` and its target is ``target[ends[i]]``.
+    All windows are one strided view of ``features``, so only the current batch is ever copied and
+    memory stays O(rows x features) whatever the look-back. Usable directly with Keras ``Model.fit``
+    and ``Model.predict``.
+    """
+
+    def __init__(self, features, target, lookback, batch_size=32, ends=None, shuffle=False, seed=None):
+        super().__init__()
+        self.features = np.ascontiguousarray(features, dtype='float32')
+        self.target = None if target is None else np.asarray(target, dtype='float32').reshape(len(self.features), -1)
+        self.lookback = lookback
+        self.batch_size = batch_size
+        self.ends = window_ends(len(self.features), lookback) if ends is None else np.asarray(ends)
+        self.shuffle = shuffle
+        self._rng = np.random.default_rng(seed)
+        self._order = np.arange(len(self.ends))
+        # (rows - lookback + 1, lookback, features) view; window k covers rows k .. k + lookback - 1
+        self._windows = sliding_window_view(self.features, lookback, axis=0).transpose(0, 2, 1)
+        if shuffle:
+            self._rng.shuffle(self._order)
+
+    def __len__(self):
+        return math.ceil(len(self.ends) / self.batch_size)
+
+    def __getitem__(self, index):
+        batch = np.sort(self._order[index * self.batch_size:(index + 1) * self.batch_size])
+        ends = self.ends[batch]
+        # Fancy indexing copies just this batch of windows out of the view
+        windows = self._windows[ends - self.lookback + 1]
+        if self.target is None:
+            return windows
+        return windows, self.target[ends]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self._rng.shuffle(self._order)
+
+    @property
+    def targets(self):
+        """Targets of every sample in order (ignores shuffling)."""
+        return self.target[self.ends]
+
+    @property
+    def sample_count(self):
+        return len(self.ends)
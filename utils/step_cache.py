@@ -0,0 +1,153 @@
+import hashlib
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(value):
+    """Content hash of a step input or parameter value; equal contents give equal fingerprints."""
+    digest = hashlib.sha256()
+    _update(digest, value)
+    return digest.hexdigest()
+
+
+def _update(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr((type(value).__name__, value.shape, list(value.columns), list(map(str, value.dtypes))))
+                      .encode())
+        # Column by column, so a column of unhashable objects only falls back for itself
+        _update(digest, value.index)
+        for _, column in value.items():
+            _update(digest, column)
+    elif isinstance(value, (pd.Series, pd.Index)):
+        digest.update(repr((type(value).__name__, str(value.dtype), len(value))).encode())
+        try:
+            digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+        except TypeError:  # e.g. lists or dicts in an object column
+            digest.update(pickle.dumps(list(value)))
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else pickle.dumps(value))
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__}[{len(value)}]'.encode())
+        for item in value:
+            _update(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f'dict[{len(value)}]'.encode())
+        for key in sorted(value, key=repr):
+            _update(digest, key)
+            _update(digest, value[key])
+    else:
+        digest.update(f'{type(value).__qualname__}:{value!r}'.encode())
+
+
+def step_identity(step):
+    """What a step computes: its source code (or qualified name) and any values captured by closures."""
+    func = step.func
+    identity = [getattr(step, 'source_code', None) or f'{func.__module__}.{func.__qualname__}']
+    # add_column_operation steps are lambdas closing over their arguments
+    for cell in getattr(func, '__closure__', None) or ():
+        try:
+            identity.append(cell.cell_contents)
+        except ValueError:  # empty cell
+            pass
+    return identity
+
+
+def step_key(input_key, step):
+    """Cache key of a step's output: its input's key, the step itself and its parameter values.
+
+    Keys chain, so a step's key changes whenever any earlier step (or the input data) changes.
+    """
+    return fingerprint([input_key, step_identity(step), step.param_values()])
+
+
+def data_size(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum() if isinstance(value, pd.DataFrame)
+                   else value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return sys.getsizeof(value)
+
+
+def copy_data(value):
+    """Copy handed to a step, so steps that modify their input in place cannot corrupt cached results."""
+    return value.copy() if hasattr(value, 'copy') else value
+
+
+class StepCache:
+    """Step outputs in memory by ``step_key``, evicting the least recently used past ``max_bytes``."""
+
+    enabled = True
+
+    def __init__(self, max_bytes=1 << 30):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (output, size)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, output):
+        size = data_size(output)
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (output, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size, 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions}
+
+
+class NullStepCache:
+    """Stores nothing; pipelines using it skip computing step keys altogether."""
+
+    enabled = False
+
+    def __contains__(self, key):
+        return False
+
+    def get(self, key, default=None):
+        return default
+
+    def put(self, key, output):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
@@ -0,0 +1,188 @@
+import cProfile
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from utils.step_cache import data_size
+
+MEMORY_METHODS = ('rss', 'tracemalloc', None)
+REPORT_COLUMNS = ('step', 'name', 'cached', 'wall_time', 'cpu_time', 'peak_memory', 'rows_in', 'columns_in',
+                  'rows_out', 'columns_out', 'output_bytes')
+
+
+def _status_bytes(key):
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith(key):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+def reset_peak_rss():
+    """Reset the process's peak resident memory (Linux only); returns its current resident memory, or None."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return _status_bytes('VmRSS:')
+    except OSError:
+        return None
+
+
+def peak_rss():
+    try:
+        return _status_bytes('VmHWM:')
+    except OSError:
+        return None
+
+
+def peak_rss_since(memory_before):
+    """Peak resident memory above ``memory_before`` (from ``reset_peak_rss``), or None if either is unknown."""
+    peak = peak_rss()
+    if peak is None or memory_before is None:
+        return None
+    # The kernel updates both counters lazily, so tiny allocations can come out slightly negative
+    return max(peak - memory_before, 0)
+
+
+def data_shape(data):
+    """``(rows, columns)`` of a step's data; columns is 1 for a Series and None when it has no shape."""
+    if isinstance(data, pd.DataFrame):
+        return data.shape
+    if isinstance(data, pd.Series):
+        return len(data), 1
+    if isinstance(data, np.ndarray):
+        return (data.shape[0] if data.ndim else None), (data.shape[1] if data.ndim > 1 else 1)
+    return None, None
+
+
+# Held while a profiler measures memory, which is shared by every thread in the process
+_memory_lock = threading.RLock()
+
+
+class StepProfiler:
+    """Measures pipeline steps as they run and collects a report of where time and memory went.
+
+    Every executed step records its wall and CPU time, input and output shape, output size and
+    peak memory above what was in use when it started, measured by ``memory``:
+
+    - ``'rss'``: the process's resident memory high-water mark, which Linux lets us reset per
+      step at no cost (elsewhere ``'tracemalloc'`` is used instead). It counts memory the
+      process had to grow by, so memory freed by earlier steps and reused is not counted.
+    - ``'tracemalloc'``: the step's Python allocations; string and object-heavy steps run many
+      times slower while they are traced.
+    - ``None``: not measured.
+
+    Both measures are process-wide, so runs in other threads of the process (e.g. other
+    Streamlit sessions) wait while one is measured; work outside pipeline runs, and anything
+    else resetting the high-water mark, can still skew them. With ``profile``, every step runs
+    under cProfile and the statistics of the slowest are kept for ``dump_slowest``.
+    """
+
+    def __init__(self, memory='rss', profile=False):
+        if memory not in MEMORY_METHODS:
+            raise ValueError(f"Unknown memory measure '{memory}'; expected one of {MEMORY_METHODS}.")
+        # Probing also resets the high-water mark, harmlessly
+        self.memory_method = 'tracemalloc' if memory == 'rss' and reset_peak_rss() is None else memory
+        self.profile = profile
+        self.steps = []
+        self.slowest_stats = None
+        self.wall_time = None
+        self._started_tracing = False
+        self._started = None
+
+    def __enter__(self):
+        if self.memory_method is not None:
+            _memory_lock.acquire()
+        if self.memory_method == 'tracemalloc' and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_time = time.perf_counter() - self._started
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self.memory_method is not None:
+            _memory_lock.release()
+        return False
+
+    def run(self, index, step, data):
+        """Run ``step`` on ``data`` (already copied for it) and record the measurements; returns its output."""
+        rows_in, columns_in = data_shape(data)
+        profiler = cProfile.Profile() if self.profile else None
+        if self.memory_method == 'tracemalloc':
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        elif self.memory_method == 'rss':
+            memory_before = reset_peak_rss()
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            output = step.apply(data)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+        wall_time, cpu_time = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        peak_memory = (tracemalloc.get_traced_memory()[1] - memory_before if self.memory_method == 'tracemalloc' else
+                       peak_rss_since(memory_before) if self.memory_method == 'rss' else None)
+        rows_out, columns_out = data_shape(output)
+        record = {'step': index + 1, 'name': step.func_name, 'cached': False, 'wall_time': wall_time,
+                  'cpu_time': cpu_time, 'peak_memory': peak_memory, 'rows_in': rows_in, 'columns_in': columns_in,
+                  'rows_out': rows_out, 'columns_out': columns_out, 'output_bytes': data_size(output)}
+        if profiler is not None and wall_time >= max((entry['wall_time'] or 0 for entry in self.steps), default=0):
+            self.slowest_stats = pstats.Stats(profiler)
+        self.steps.append(record)
+        return output
+
+    def cached(self, index, step, output=None):
+        """Record a step whose output came from the cache (``output``, when it was loaded)."""
+        rows_out, columns_out = data_shape(output)
+        self.steps.append({'step': index + 1, 'name': step.func_name, 'cached': True, 'wall_time': None,
+                           'cpu_time': None, 'peak_memory': None, 'rows_in': None, 'columns_in': None,
+                           'rows_out': rows_out, 'columns_out': columns_out,
+                           'output_bytes': data_size(output) if output is not None else None})
+
+    def slowest_step(self):
+        executed = [entry for entry in self.steps if not entry['cached']]
+        return max(executed, key=lambda entry: entry['wall_time']) if executed else None
+
+    def dump_slowest(self, path):
+        """Write the slowest step's cProfile statistics to ``path`` (pstats format, e.g. for snakeviz)."""
+        if self.slowest_stats is None:
+            return None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.slowest_stats.dump_stats(path)
+        return path
+
+    def report(self):
+        executed = [entry for entry in self.steps if not entry['cached']]
+        slowest = self.slowest_step()
+        peaks = [entry['peak_memory'] for entry in executed if entry['peak_memory'] is not None]
+        return {'steps': len(self.steps), 'cached': len(self.steps) - len(executed), 'executed': len(executed),
+                'wall_time': self.wall_time,
+                'step_time': sum(entry['wall_time'] for entry in executed),
+                'cpu_time': sum(entry['cpu_time'] for entry in executed),
+                'peak_memory': max(peaks) if peaks else None, 'memory_method': self.memory_method,
+                'slowest_step': slowest['step'] if slowest else None,
+                'profile_path': None, 'step_reports': self.steps}
+
+
+def report_table(report):
+    """The per-step part of a run report as a DataFrame, one row per step."""
+    return pd.DataFrame(report['step_reports'], columns=list(REPORT_COLUMNS)).set_index('step')
+
+
+def print_report(report):
+    table = report_table(report)
+    print(table.to_string())
+    print(f"{report['executed']} steps run, {report['cached']} cached, {report['step_time']:.3f}s in steps"
+          + (f", slowest: step {report['slowest_step']}" if report['slowest_step'] else '')
+          + (f", profile saved to {report['profile_path']}" if report['profile_path'] else ''))
@@ -0,0 +1,288 @@
+import os
+import re
+import shutil
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Legacy per-symbol CSV files written by data_pipeline.download_ticker_data
+CSV_FILE_PATTERN = re.compile(r'^(?P<symbol>[A-Za-z]+)_(?P<interval>\w+)_data\.csv$')
+
+# Columns yfinance uses for the bar timestamp (daily bars use 'Date', intraday bars use 'Datetime')
+TIMESTAMP_COLUMNS = ('Datetime', 'Date')
+
+PRICE_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Adj Close', 'Dividends', 'Stock Splits')
+INTEGER_COLUMNS = ('Volume',)
+
+
+def get_timestamp_column(columns):
+    """Return the name of the bar timestamp column, or None if there is none."""
+    return next((column for column in TIMESTAMP_COLUMNS if column in columns), None)
+
+
+def to_utc_timestamp(value):
+    """Convert a date-like value to a UTC timestamp; naive values are taken to be UTC."""
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize('UTC')
+    return timestamp.tz_convert('UTC')
+
+
+def normalize_price_frame(data):
+    """Return a copy of a price frame with the timestamp as a column and typed columns."""
+    data = data.copy()
+    if data.index.name in TIMESTAMP_COLUMNS:
+        data = data.reset_index()
+    elif not isinstance(data.index, pd.RangeIndex):
+        data = data.reset_index(drop=True)
+
+    # Timestamps come with per-row UTC offsets (DST), so they are stored as UTC
+    timestamp_column = get_timestamp_column(data.columns)
+    if timestamp_column is not None:
+        data[timestamp_column] = pd.to_datetime(data[timestamp_column], utc=True)
+    if 'date' in data.columns:
+        data['date'] = pd.to_datetime(data['date'])
+
+    for column in data.columns:
+        if column in PRICE_COLUMNS:
+            data[column] = pd.to_numeric(data[column], errors='coerce').astype('float64')
+        elif column in INTEGER_COLUMNS:
+            values = pd.to_numeric(data[column], errors='coerce')
+            data[column] = values.astype('float64' if values.isna().any() else 'int64')
+        elif column == 'Symbol':
+            data[column] = data[column].astype('string')
+    return data
+
+
+class PriceStore:
+    """Columnar store of price history partitioned as ``interval=<interval>/symbol=<symbol>/part-*.parquet``."""
+
+    def __init__(self, root='financial_data', compression='zstd', row_group_size=65536, max_parts=32):
+        self.root = root
+        self.compression = compression
+        # Smaller row groups let date-range filters skip more of a long minute history
+        self.row_group_size = row_group_size
+        # Appends add part files; once a partition has more than this many they are compacted into one
+        self.max_parts = max_parts
+
+    def partition_path(self, interval, symbol):
+        return os.path.join(self.root, f'interval={interval}', f'symbol={symbol}')
+
+    def partition_files(self, interval, symbol):
+        path = self.partition_path(interval, symbol)
+        if not os.path.isdir(path):
+            return []
+        return sorted(os.path.join(path, f) for f in os.listdir(path)
+                      if f.startswith('part-') and f.endswith('.parquet'))
+
+    def intervals(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d.split('=', 1)[1] for d in os.listdir(self.root)
+                      if d.startswith('interval=') and os.path.isdir(os.path.join(self.root, d)))
+
+    def symbols(self, interval):
+        path = os.path.join(self.root, f'interval={interval}')
+        if not os.path.isdir(path):
+            return []
+        return sorted(d.split('=', 1)[1] for d in os.listdir(path)
+                      if d.startswith('symbol=') and self.partition_files(interval, d.split('=', 1)[1]))
+
+    def exists(self, interval, symbol):
+        return bool(self.partition_files(interval, symbol))
+
+    def write(self, data, interval, symbol):
+        """Replace the stored history of one symbol at one interval."""
+        data = normalize_price_frame(data)
+        path = self.partition_path(interval, symbol)
+        os.makedirs(path, exist_ok=True)
+        old_files = self.partition_files(interval, symbol)
+        target = os.path.join(path, 'part-00000.parquet')
+        self._write_file(data, target)
+        for file in old_files:
+            if file != target:
+                os.remove(file)
+        return target
+
+    def append(self, data, interval, symbol):
+        """Add rows to a partition as a new part file.
+
+        Rows whose timestamp is already stored replace the stored ones when the partition is read,
+        so a refresh can safely overlap the last stored bar.
+        """
+        files = self.partition_files(interval, symbol)
+        if not files:
+            return self.write(data, interval, symbol)
+        data = normalize_price_frame(data)
+        # Keep the stored column order so the parts concatenate into one schema
+        stored_columns = pq.read_schema(files[-1]).names
+        data = data[[c for c in stored_columns if c in data.columns] +
+                    [c for c in data.columns if c not in stored_columns]]
+        last_part = int(os.path.basename(files[-1])[len('part-'):-len('.parquet')])
+        target = os.path.join(self.partition_path(interval, symbol), f'part-{last_part + 1:05d}.parquet')
+        self._write_file(data, target)
+        if len(files) + 1 > self.max_parts:
+            self.compact(interval, symbol)
+        return target
+
+    def compact(self, interval, symbol):
+        """Merge all part files of a partition into one."""
+        return self.write(self.read(interval, symbol), interval, symbol)
+
+    def last_timestamp(self, interval, symbol):
+        """Latest stored bar timestamp, read from the Parquet column statistics where possible."""
+        files = self.partition_files(interval, symbol)
+        if not files:
+            return None
+        timestamp_column = get_timestamp_column(pq.read_schema(files[0]).names)
+        if timestamp_column is None:
+            raise ValueError(f"Stored data for {symbol} at interval {interval} has no timestamp column")
+        latest = None
+        for file in files:
+            metadata = pq.ParquetFile(file).metadata
+            column_index = metadata.schema.names.index(timestamp_column)
+            for row_group in range(metadata.num_row_groups):
+                statistics = metadata.row_group(row_group).column(column_index).statistics
+                if statistics is None or not statistics.has_min_max:
+                    # No statistics in this file, fall back to reading the column
+                    values = pq.read_table(file, columns=[timestamp_column]).column(0).to_pandas()
+                    value = values.max()
+                else:
+                    value = statistics.max
+                if value is not None and not pd.isna(value):
+                    value = to_utc_timestamp(value)
+                    latest = value if latest is None else max(latest, value)
+        return latest
+
+    def read_tail(self, interval, symbol, rows):
+        """Read the last ``rows`` stored bars, opening only the trailing row groups."""
+        files = self.partition_files(interval, symbol)
+        if not files:
+            raise FileNotFoundError(f"No stored data for {symbol} at interval {interval}")
+        tables, collected = [], 0
+        for file in reversed(files):
+            parquet_file = pq.ParquetFile(file)
+            for row_group in reversed(range(parquet_file.num_row_groups)):
+                table = parquet_file.read_row_group(row_group)
+                tables.insert(0, table)
+                collected += table.num_rows
+                if collected >= rows:
+                    break
+            if collected >= rows:
+                break
+        data = self._deduplicate(pa.concat_tables(tables, promote=True).to_pandas(), len(tables) > 1)
+        return data.iloc[-rows:].reset_index(drop=True)
+
+    def schema(self, interval, symbol):
+        files = self.partition_files(interval, symbol)
+        if not files:
+            raise FileNotFoundError(f"No stored data for {symbol} at interval {interval}")
+        return pq.read_schema(files[0])
+
+    def read(self, interval, symbol, columns=None, start=None, end=None):
+        """Read one partition, projecting ``columns`` and pushing the ``[start, end]`` range down to the files."""
+        files = self.partition_files(interval, symbol)
+        if not files:
+            raise FileNotFoundError(f"No stored data for {symbol} at interval {interval}")
+        timestamp_column = get_timestamp_column(pq.read_schema(files[0]).names)
+        filters = None
+        if start is not None or end is not None:
+            if timestamp_column is None:
+                raise ValueError(f"Stored data for {symbol} at interval {interval} has no timestamp column")
+            filters = []
+            if start is not None:
+                filters.append((timestamp_column, '>=', to_utc_timestamp(start)))
+            if end is not None:
+                filters.append((timestamp_column, '<=', to_utc_timestamp(end)))
+        # Overlapping parts are de-duplicated on the timestamp, so it has to be read even if not requested
+        read_columns = columns
+        if len(files) > 1 and columns is not None and timestamp_column not in (None, *columns):
+            read_columns = list(columns) + [timestamp_column]
+        tables = [pq.read_table(file, columns=read_columns, filters=filters) for file in files]
+        data = self._deduplicate(pa.concat_tables(tables, promote=True).to_pandas(), len(files) > 1)
+        return data if read_columns is columns else data[list(columns)]
+
+    def delete(self, interval, symbol):
+        shutil.rmtree(self.partition_path(interval, symbol), ignore_errors=True)
+
+    def size_on_disk(self):
+        total = 0
+        for dir_path, _, files in os.walk(self.root):
+            total += sum(os.path.getsize(os.path.join(dir_path, f)) for f in files if f.endswith('.parquet'))
+        return total
+
+    @staticmethod
+    def _deduplicate(data, multiple_parts):
+        # Later parts win for timestamps that were appended more than once
+        timestamp_column = get_timestamp_column(data.columns)
+        if not multiple_parts or timestamp_column is None:
+            return data
+        return data.drop_duplicates(subset=timestamp_column, keep='last').reset_index(drop=True)
+
+    def _write_file(self, data, target):
+        # Write to a temporary file first so readers never see a half-written partition
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        fd, tmp_path = tempfile.mkstemp(suffix='.parquet.tmp', dir=os.path.dirname(target))
+        os.close(fd)
+        try:
+            pq.write_table(table, tmp_path, compression=self.compression, row_group_size=self.row_group_size)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def list_csv_files(directory='financial_data'):
+    """Return (symbol, interval, path) for every legacy CSV file in a directory."""
+    if not os.path.isdir(directory):
+        return []
+    csv_files = []
+    for file in sorted(os.listdir(directory)):
+        match = CSV_FILE_PATTERN.match(file)
+        if match:
+            csv_files.append((match.group('symbol'), match.group('interval'), os.path.join(directory, file)))
+    return csv_files
+
+
+def migrate_csv_directory(directory='financial_data', store=None, remove_csv=False, overwrite=False):
+    """Convert every ``{SYMBOL}_{interval}_data.csv`` in a directory into the columnar store."""
+    store = store if store is not None else PriceStore(directory)
+    migrated, skipped = [], []
+    for symbol, interval, path in list_csv_files(directory):
+        if store.exists(interval, symbol) and not overwrite:
+            skipped.append((symbol, interval, 'already stored'))
+            continue
+        data = pd.read_csv(path)
+        if data.empty:
+            skipped.append((symbol, interval, 'empty file'))
+            continue
+        store.write(data, interval, symbol)
+        migrated.append((symbol, interval))
+        if remove_csv:
+            os.remove(path)
+    return migrated, skipped
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage the columnar price store.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = subparsers.add_parser('migrate', help='Convert legacy per-symbol CSV files into the store.')
+    migrate_parser.add_argument('--directory', default='financial_data', help='Directory holding the CSV files.')
+    migrate_parser.add_argument('--store', default=None, help='Store root (default: same as --directory).')
+    migrate_parser.add_argument('--remove-csv', action='store_true', help='Delete each CSV once it is migrated.')
+    migrate_parser.add_argument('--overwrite', action='store_true', help='Replace partitions that already exist.')
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        price_store = PriceStore(args.store or args.directory)
+        migrated_files, skipped_files = migrate_csv_directory(args.directory, price_store, remove_csv=args.remove_csv,
+                                                              overwrite=args.overwrite)
+        for symbol_name, interval_name in migrated_files:
+            print(f'Migrated {symbol_name} at interval {interval_name}')
+        for symbol_name, interval_name, reason in skipped_files:
+            print(f'Skipped {symbol_name} at interval {interval_name}: {reason}')
@@ -0,0 +1,484 @@
+import math
+from abc import ABC, abstractmethod
+from collections import deque
+
+import pandas as pd
+
+NAN = float('nan')
+
+
+class StreamingIndicator(ABC):
+    """Base class for indicators that update in constant time per bar.
+
+    ``update`` takes one bar and returns the indicator's latest value, ``update_many`` feeds a
+    micro-batch and returns one value per bar. ``snapshot`` returns the full state as plain
+    Python values (JSON serializable) and ``StreamingIndicator.restore`` rebuilds the indicator
+    from it, so a live process can persist its state and resume without replaying history.
+    """
+
+    registry = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        StreamingIndicator.registry[cls.__name__] = cls
+
+    @abstractmethod
+    def update(self, *bar):
+        pass
+
+    def update_many(self, *columns):
+        return [self.update(*bar) for bar in zip(*columns)]
+
+    @property
+    @abstractmethod
+    def value(self):
+        pass
+
+    def params(self):
+        return {}
+
+    def state(self):
+        return {}
+
+    def set_state(self, state):
+        pass
+
+    def snapshot(self):
+        return {'type': type(self).__name__, 'params': self.params(), 'state': self.state()}
+
+    @staticmethod
+    def restore(snapshot):
+        indicator = StreamingIndicator.registry[snapshot['type']](**snapshot['params'])
+        indicator.set_state(snapshot['state'])
+        return indicator
+
+
+class RollingWindow(StreamingIndicator):
+    """Mean and sample standard deviation over the last ``window`` values.
+
+    Uses Welford's add/remove updates like pandas' rolling kernels. A window that is not yet full
+    or that contains a NaN has no value. The running moments are recomputed from the buffer every
+    ``resync_every`` windows so floating point drift stays bounded at amortized O(1) cost.
+    """
+
+    def __init__(self, window, ddof=1, resync_every=16):
+        self.window = window
+        self.ddof = ddof
+        self.resync_every = resync_every
+        self._values = deque(maxlen=window)
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._nan_count = 0
+        self._since_resync = 0
+
+    def update(self, x):
+        x = float(x)
+        if len(self._values) == self.window:
+            self._remove(self._values[0])
+        self._values.append(x)
+        if math.isnan(x):
+            self._nan_count += 1
+        else:
+            self._count += 1
+            delta = x - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (x - self._mean)
+        self._since_resync += 1
+        if self._since_resync >= self.resync_every * self.window:
+            self._resync()
+        return self.mean
+
+    def _remove(self, x):
+        if math.isnan(x):
+            self._nan_count -= 1
+            return
+        self._count -= 1
+        if self._count == 0:
+            self._mean = self._m2 = 0.0
+            return
+        delta = x - self._mean
+        self._mean -= delta / self._count
+        self._m2 -= delta * (x - self._mean)
+
+    def _resync(self):
+        valid = [x for x in self._values if not math.isnan(x)]
+        self._count = len(valid)
+        self._mean = math.fsum(valid) / len(valid) if valid else 0.0
+        self._m2 = math.fsum((x - self._mean) ** 2 for x in valid)
+        self._since_resync = 0
+
+    @property
+    def ready(self):
+        return len(self._values) == self.window and self._nan_count == 0
+
+    @property
+    def mean(self):
+        return self._mean if self.ready else NAN
+
+    @property
+    def std(self):
+        if not self.ready or self.window - self.ddof <= 0:
+            return NAN
+        return math.sqrt(max(self._m2, 0.0) / (self.window - self.ddof))
+
+    @property
+    def value(self):
+        return self.mean
+
+    def params(self):
+        return {'window': self.window, 'ddof': self.ddof, 'resync_every': self.resync_every}
+
+    def state(self):
+        # NaN is not valid JSON, so missing values are stored as None
+        return {'values': [None if math.isnan(x) else x for x in self._values]}
+
+    def set_state(self, state):
+        self._values = deque((NAN if x is None else x for x in state['values']), maxlen=self.window)
+        self._nan_count = sum(math.isnan(x) for x in self._values)
+        self._resync()
+
+
+class SMA(StreamingIndicator):
+    """Simple moving average of the close.
+
+    ``rolling`` shares a ``RollingWindow`` with other indicators over the same closes; its owner
+    then feeds it and this indicator only reads from it.
+    """
+
+    def __init__(self, window, rolling=None):
+        self.window = window
+        self._rolling = RollingWindow(window) if rolling is None else rolling
+
+    def update(self, close):
+        return self._rolling.update(close)
+
+    @property
+    def value(self):
+        return self._rolling.mean
+
+    def params(self):
+        return {'window': self.window}
+
+    def state(self):
+        return self._rolling.state()
+
+    def set_state(self, state):
+        self._rolling.set_state(state)
+
+
+class RollingStd(SMA):
+    def update(self, close):
+        self._rolling.update(close)
+        return self.value
+
+    @property
+    def value(self):
+        return self._rolling.std
+
+
+class BollingerBands(SMA):
+    """Upper and lower band as ``(upper, lower)``, ``num_std`` standard deviations around the SMA."""
+
+    def __init__(self, window=20, num_std=2, rolling=None):
+        super().__init__(window, rolling)
+        self.num_std = num_std
+
+    def update(self, close):
+        self._rolling.update(close)
+        return self.value
+
+    @property
+    def value(self):
+        mean, std = self._rolling.mean, self._rolling.std
+        return mean + std * self.num_std, mean - std * self.num_std
+
+    def params(self):
+        return {'window': self.window, 'num_std': self.num_std}
+
+
+class EMA(StreamingIndicator):
+    """Exponential moving average matching ``ewm(span=span, adjust=False)``.
+
+    Like pandas (``ignore_na=False``), a NaN input repeats the last value while that value's
+    weight keeps decaying, so the first input after a gap weighs more than usual.
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2 / (span + 1)
+        self._value = NAN
+        self._weight = 1.0  # weight of the current value against the next input's ``alpha``
+
+    def update(self, x):
+        x = float(x)
+        if math.isnan(self._value):
+            self._value = x
+        elif math.isnan(x):
+            self._weight *= 1 - self.alpha
+        else:
+            weight = self._weight * (1 - self.alpha)
+            self._value = (weight * self._value + self.alpha * x) / (weight + self.alpha)
+            self._weight = 1.0
+        return self._value
+
+    @property
+    def value(self):
+        return self._value
+
+    def params(self):
+        return {'span': self.span}
+
+    def state(self):
+        return {'value': None if math.isnan(self._value) else self._value, 'weight': self._weight}
+
+    def set_state(self, state):
+        self._value = NAN if state['value'] is None else state['value']
+        # Snapshots from before gaps were weighted have no weight
+        self._weight = state.get('weight', 1.0)
+
+
+class MACD(StreamingIndicator):
+    """MACD line and signal line as ``(macd, signal)``."""
+
+    def __init__(self, short_window=12, long_window=26, signal_window=9):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.signal_window = signal_window
+        self._short = EMA(short_window)
+        self._long = EMA(long_window)
+        self._signal = EMA(signal_window)
+
+    def update(self, close):
+        macd = self._short.update(close) - self._long.update(close)
+        return macd, self._signal.update(macd)
+
+    @property
+    def value(self):
+        return self._short.value - self._long.value, self._signal.value
+
+    def params(self):
+        return {'short_window': self.short_window, 'long_window': self.long_window,
+                'signal_window': self.signal_window}
+
+    def state(self):
+        return {'short': self._short.state(), 'long': self._long.state(), 'signal': self._signal.state()}
+
+    def set_state(self, state):
+        self._short.set_state(state['short'])
+        self._long.set_state(state['long'])
+        self._signal.set_state(state['signal'])
+
+
+class RSI(StreamingIndicator):
+    """RSI from simple rolling means of gains and losses, as in ``FinancialData.rsi``."""
+
+    def __init__(self, window=14):
+        self.window = window
+        self._previous_close = NAN
+        self._gains = RollingWindow(window)
+        self._losses = RollingWindow(window)
+
+    def update(self, close):
+        close = float(close)
+        # The first bar has no change; like the batch version it counts as neither gain nor loss
+        delta = close - self._previous_close
+        self._gains.update(delta if delta > 0 else 0.0)
+        self._losses.update(-delta if delta < 0 else 0.0)
+        self._previous_close = close
+        return self.value
+
+    @property
+    def value(self):
+        avg_gain, avg_loss = self._gains.mean, self._losses.mean
+        if math.isnan(avg_gain) or math.isnan(avg_loss):
+            return NAN
+        if avg_loss == 0:
+            return NAN if avg_gain == 0 else 100.0
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+    def params(self):
+        return {'window': self.window}
+
+    def state(self):
+        return {'previous_close': None if math.isnan(self._previous_close) else self._previous_close,
+                'gains': self._gains.state(), 'losses': self._losses.state()}
+
+    def set_state(self, state):
+        self._previous_close = NAN if state['previous_close'] is None else state['previous_close']
+        self._gains.set_state(state['gains'])
+        self._losses.set_state(state['losses'])
+
+
+class VWAP(StreamingIndicator):
+    """Cumulative volume-weighted average price since the first bar.
+
+    As in ``FinancialData.vwap``, missing values are left out of the running sums (a bar without a
+    close still adds its volume) and a bar without a close has no value.
+    """
+
+    def __init__(self):
+        self._price_volume = 0.0
+        self._volume = 0.0
+
+    def update(self, close, volume):
+        price_volume, volume = float(close) * float(volume), float(volume)
+        if not math.isnan(volume):
+            self._volume += volume
+        if math.isnan(price_volume):
+            return NAN
+        self._price_volume += price_volume
+        return self.value
+
+    @property
+    def value(self):
+        return self._price_volume / self._volume if self._volume else NAN
+
+    def state(self):
+        return {'price_volume': self._price_volume, 'volume': self._volume}
+
+    def set_state(self, state):
+        self._price_volume = state['price_volume']
+        self._volume = state['volume']
+
+
+class OBV(StreamingIndicator):
+    """On-balance volume as in ``FinancialData.on_balance_volume``: volume counts unless the close fell or held."""
+
+    def __init__(self):
+        self._previous_close = NAN
+        self._value = 0
+
+    def update(self, close, volume):
+        close = float(close)
+        if not close - self._previous_close <= 0:
+            self._value += int(volume)
+        self._previous_close = close
+        return self._value
+
+    @property
+    def value(self):
+        return self._value
+
+    def state(self):
+        return {'previous_close': None if math.isnan(self._previous_close) else self._previous_close,
+                'value': self._value}
+
+    def set_state(self, state):
+        self._previous_close = NAN if state['previous_close'] is None else state['previous_close']
+        self._value = state['value']
+
+
+class ATR(StreamingIndicator):
+    """Simple rolling mean of the true range; the first bar's true range is ``high - low``."""
+
+    def __init__(self, window=14):
+        self.window = window
+        self._previous_close = NAN
+        self._true_ranges = RollingWindow(window)
+
+    def update(self, high, low, close):
+        high, low = float(high), float(low)
+        true_range = high - low
+        if not math.isnan(self._previous_close):
+            true_range = max(true_range, abs(high - self._previous_close), abs(low - self._previous_close))
+        self._previous_close = float(close)
+        return self._true_ranges.update(true_range)
+
+    @property
+    def value(self):
+        return self._true_ranges.mean
+
+    def params(self):
+        return {'window': self.window}
+
+    def state(self):
+        return {'previous_close': None if math.isnan(self._previous_close) else self._previous_close,
+                'true_ranges': self._true_ranges.state()}
+
+    def set_state(self, state):
+        self._previous_close = NAN if state['previous_close'] is None else state['previous_close']
+        self._true_ranges.set_state(state['true_ranges'])
+
+
+class StreamingFeatures(StreamingIndicator):
+    """The streaming counterparts of ``FinancialData``'s indicators for one symbol.
+
+    ``update`` takes one bar as a mapping with Close, Volume, High and Low and returns a dict of
+    feature values named like ``FinancialData.feature_names``; ``value`` is the last such dict.
+    ``update_frame`` feeds a micro-batch of bars and returns a frame with the same index. The SMA,
+    volatility and Bollinger bands read one window of closes (two when ``bollinger_window``
+    differs), kept and snapshotted once.
+
+    Returns (ROI, Price Percentage Change) are NaN on a missing close and on the bar after it,
+    unlike ``FinancialData`` on pandas < 2.1, whose ``pct_change`` fills the gap with the last close.
+    """
+
+    def __init__(self, window=14, bollinger_window=None, macd_windows=(12, 26, 9)):
+        self.window = window
+        self.bollinger_window = bollinger_window or window
+        self.macd_windows = tuple(macd_windows)
+        self.indicators = {
+            'RSI': RSI(window),
+            'MACD': MACD(*self.macd_windows),
+            'VWAP': VWAP(),
+            'OBV': OBV(),
+            'ATR': ATR(window),
+        }
+        self._closes = {size: RollingWindow(size) for size in {self.window, self.bollinger_window}}
+        # Read-only views of the shared windows, which update() feeds once per bar
+        self._sma = SMA(self.window, self._closes[self.window])
+        self._volatility = RollingStd(self.window, self._closes[self.window])
+        self._bollinger = BollingerBands(self.bollinger_window, rolling=self._closes[self.bollinger_window])
+        self._previous_close = NAN
+        self._value = None
+
+    def update(self, bar):
+        close, volume = float(bar['Close']), float(bar['Volume'])
+        for rolling in self._closes.values():
+            rolling.update(close)
+        indicators = self.indicators
+        macd, signal = indicators['MACD'].update(close)
+        upper, lower = self._bollinger.value
+        self._value = {
+            'Price Change': close - self._previous_close,
+            'Price Percentage Change': (close / self._previous_close - 1) * 100,
+            f'SMA{self.window}': self._sma.value,
+            'Trading Volume': volume,
+            'VWAP': indicators['VWAP'].update(close, volume),
+            'OBV': indicators['OBV'].update(close, volume),
+            'Volatility': self._volatility.value,
+            'ROI': close / self._previous_close - 1,
+            'RSI': indicators['RSI'].update(close),
+            'MACD': macd,
+            'Signal': signal,
+            'Bollinger Upper Band': upper,
+            'Bollinger Lower Band': lower,
+            'ATR': indicators['ATR'].update(bar['High'], bar['Low'], close),
+        }
+        self._previous_close = close
+        return self._value
+
+    @property
+    def value(self):
+        return self._value
+
+    def update_frame(self, bars):
+        return pd.DataFrame([self.update(bar) for bar in bars.to_dict('records')], index=bars.index)
+
+    def params(self):
+        return {'window': self.window, 'bollinger_window': self.bollinger_window,
+                'macd_windows': list(self.macd_windows)}
+
+    def state(self):
+        # JSON object keys are strings
+        return {'previous_close': None if math.isnan(self._previous_close) else self._previous_close,
+                'closes': {str(size): rolling.state() for size, rolling in self._closes.items()},
+                'indicators': {name: indicator.snapshot() for name, indicator in self.indicators.items()}}
+
+    def set_state(self, state):
+        self._previous_close = NAN if state['previous_close'] is None else state['previous_close']
+        for size, rolling in self._closes.items():
+            rolling.set_state(state['closes'][str(size)])
+        self.indicators = {name: StreamingIndicator.restore(snapshot)
+                           for name, snapshot in state['indicators'].items()}
@@ -0,0 +1,159 @@
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.file_utils import write_json
+
+# Environment variables read by TensorFlow, OpenMP and the BLAS libraries when they start their
+# thread pools; they only take effect if set before those libraries are imported
+THREAD_ENV_VARS = ('TF_NUM_INTRAOP_THREADS', 'OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                   'NUMEXPR_NUM_THREADS')
+
+
+def limit_threads(threads):
+    """Cap the intra-op threads of this process. Call before TensorFlow is imported."""
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    # Inter-op parallelism runs independent ops side by side; one extra thread is plenty per worker
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+
+
+def training_jobs(loader, interval='1d', symbols=('all',)):
+    """``(interval, symbol)`` pairs for every stored partition, filtered to ``symbols`` unless it is ``['all']``."""
+    intervals = loader.intervals() if interval == 'all' else [interval]
+    jobs = []
+    for interval in intervals:
+        available_symbols = loader.symbols(interval)
+        if list(symbols) != ['all']:
+            available_symbols = [symbol for symbol in available_symbols if symbol in symbols]
+        jobs.extend((interval, symbol) for symbol in available_symbols)
+    return jobs
+
+
+def model_path(models_dir, symbol, interval):
+    return os.path.join(models_dir, f'{symbol}_{interval}_model.h5')
+
+
+def scalers_path(models_dir, symbol, interval):
+    return os.path.join(models_dir, f'{symbol}_{interval}_scalers.pkl')
+
+
+def train_symbol(interval, symbol, models_dir='models', epochs=50, batch_size=32):
+    """Train and save one model; runs inside a pool worker and never raises.
+
+    Returns a manifest entry with the status, metrics, saved model path and, on failure, the error.
+    """
+    started = time.time()
+    entry = {'interval': interval, 'symbol': symbol, 'status': 'failed', 'model_path': None, 'metrics': None,
+             'error': None, 'pid': os.getpid(), 'started_at': started}
+    try:
+        import tensorflow as tf
+        from LSTM_model import LSTMModel
+
+        lstm_model = LSTMModel(symbol=symbol, interval=interval, epochs=epochs, batch_size=batch_size,
+                               checkpoints_dir=os.path.join(models_dir, 'checkpoints'))
+        entry['metrics'] = lstm_model.run()
+        path = lstm_model.save(models_dir)
+        entry.update(status='succeeded', model_path=path)
+        # The saved model supersedes the checkpoint; a later run of this job trains from scratch
+        lstm_model.training.clear()
+        # Keras keeps every model built in the process alive until the session is cleared
+        tf.keras.backend.clear_session()
+    except Exception as e:
+        entry['error'] = f'{type(e).__name__}: {e}'
+        entry['traceback'] = traceback.format_exc()
+    entry['elapsed'] = time.time() - started
+    return entry
+
+
+def init_worker(threads):
+    """Process pool initializer for TensorFlow workers: cap each to ``threads`` intra-op threads."""
+    limit_threads(threads)
+    # Spawned workers re-import the parent's __main__ module, which may already have imported
+    # TensorFlow; its thread pools are only created by the first op, so they can still be capped
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _run_pool(jobs, max_workers, threads_per_worker, train, args, record, retried=False):
+    lost = []
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=init_worker, initargs=(threads_per_worker,)) as pool:
+        futures = {pool.submit(train, interval, symbol, *args): (interval, symbol) for interval, symbol in jobs}
+        for future in as_completed(futures):
+            interval, symbol = futures[future]
+            try:
+                record(future.result())
+            except BrokenProcessPool as e:
+                if not retried:
+                    lost.append((interval, symbol))
+                    continue
+                record({'interval': interval, 'symbol': symbol, 'status': 'failed', 'model_path': None,
+                        'metrics': None, 'error': f'Worker process died: {e}'})
+            except Exception as e:  # e.g. the result could not be sent back to the parent
+                record({'interval': interval, 'symbol': symbol, 'status': 'failed', 'model_path': None,
+                        'metrics': None, 'error': f'{type(e).__name__}: {e}'})
+    return lost
+
+
+def train_parallel(jobs, models_dir='models', max_workers=None, threads_per_worker=None, manifest_path=None,
+                   epochs=50, batch_size=32, train=train_symbol, resume=None):
+    """Train one model per ``(interval, symbol)`` job across a pool of worker processes.
+
+    Workers are spawned (TensorFlow is not fork-safe) and each is capped to ``threads_per_worker``
+    intra-op threads, by default an equal share of the CPUs, so the workers together do not
+    oversubscribe the machine. A failing job, or a crashed worker, is recorded as failed in the
+    manifest and the other jobs carry on. The manifest is rewritten after every finished job, so
+    it also reflects the progress of a run that is interrupted.
+
+    ``resume`` is the manifest of an interrupted run: its succeeded jobs are kept and skipped,
+    and the others continue from their last training checkpoint in ``models_dir/checkpoints``.
+    """
+    jobs = list(jobs)
+    finished = []
+    if resume is not None:
+        with open(resume) as file:
+            finished = [entry for entry in json.load(file)['jobs'] if entry['status'] == 'succeeded']
+        done = {(entry['interval'], entry['symbol']) for entry in finished}
+        jobs = [job for job in jobs if tuple(job) not in done]
+        manifest_path = manifest_path or resume
+        print(f'Resuming {resume}: {len(finished)} models already trained, {len(jobs)} to go.')
+    cpu_count = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers or cpu_count, len(jobs) or 1))
+    threads_per_worker = threads_per_worker or max(1, cpu_count // max_workers)
+    os.makedirs(models_dir, exist_ok=True)
+    run_id = time.strftime('%Y%m%d-%H%M%S')
+    manifest_path = manifest_path or os.path.join(models_dir, 'manifests', f'run-{run_id}.json')
+    manifest = {'run_id': run_id, 'started_at': time.time(), 'finished_at': None, 'models_dir': models_dir,
+                'max_workers': max_workers, 'threads_per_worker': threads_per_worker, 'epochs': epochs,
+                'batch_size': batch_size, 'resumed_from': resume, 'jobs': list(finished)}
+
+    def record(entry):
+        manifest['jobs'].append(entry)
+        print(f"[{len(manifest['jobs']) - len(finished)}/{len(jobs)}] {entry['symbol']} {entry['interval']}: {entry['status']}"
+              + (f" ({entry['error']})" if entry['error'] else f" -> {entry['model_path']}"))
+        write_json(manifest, manifest_path, default=str)
+
+    # A worker that dies breaks the whole pool and fails every pending job with it, so jobs lost
+    # that way are retried one at a time in a fresh pool; only the job that crashes again fails
+    lost = _run_pool(jobs, max_workers, threads_per_worker, train, (models_dir, epochs, batch_size), record)
+    for job in lost:
+        _run_pool([job], 1, threads_per_worker, train, (models_dir, epochs, batch_size), record, retried=True)
+
+    manifest['finished_at'] = time.time()
+    manifest['succeeded'] = sum(entry['status'] == 'succeeded' for entry in manifest['jobs'])
+    manifest['failed'] = len(manifest['jobs']) - manifest['succeeded']
+    # Epochs early stopping did not need to run, out of the epochs budget of every trained model
+    manifest['epochs_saved'] = sum((entry['metrics'] or {}).get('epochs_saved', 0) for entry in manifest['jobs'])
+    write_json(manifest, manifest_path, default=str)
+    print(f"Trained {manifest['succeeded']} of {len(manifest['jobs'])} models ({manifest['epochs_saved']} of "
+          f"{len(manifest['jobs']) * epochs} epochs saved by early stopping); manifest saved to {manifest_path}")
+    return manifest
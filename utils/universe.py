@@ -0,0 +1,120 @@
+import json
+import os
+import time
+import warnings
+
+import pandas as pd
+
+from utils.file_utils import write_json
+
+SP500_URL = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+
+
+def fetch_sp500_from_wikipedia(url=SP500_URL):
+    """Scrape the current S&P 500 members and the table of index changes from Wikipedia."""
+    tables = pd.read_html(url)
+    constituents = tables[0]['Symbol'].astype(str).tolist()  # The first table is the current list
+    changes = parse_changes_table(tables[1]) if len(tables) > 1 else []
+    return constituents, changes
+
+
+def parse_changes_table(table):
+    """Turn the 'Selected changes to the list' table into ``[{'date', 'added', 'removed'}]``."""
+    def find_column(top, sub=None):
+        for column in table.columns:
+            parts = column if isinstance(column, tuple) else (column,)
+            if top.lower() in str(parts[0]).lower() and (sub is None or sub.lower() in str(parts[-1]).lower()):
+                return column
+        return None
+
+    date_column = find_column('date')
+    added_column = find_column('added', 'ticker')
+    removed_column = find_column('removed', 'ticker')
+    if date_column is None:
+        return []
+
+    changes = []
+    dates = pd.to_datetime(table[date_column], errors='coerce')
+    for position, date in enumerate(dates):
+        if pd.isna(date):
+            continue
+        added = table[added_column].iloc[position] if added_column is not None else None
+        removed = table[removed_column].iloc[position] if removed_column is not None else None
+        changes.append({'date': date.strftime('%Y-%m-%d'),
+                        'added': added if isinstance(added, str) and added else None,
+                        'removed': removed if isinstance(removed, str) and removed else None})
+    return changes
+
+
+class ConstituentUniverse:
+    """S&P 500 membership served from an on-disk snapshot, refreshed at most every ``refresh_interval``.
+
+    When a refresh fails (e.g. no network) the existing snapshot is used, however old. The snapshot
+    also keeps the list of index changes, so membership can be reconstructed for past dates. No
+    snapshot ships with the repository, so the first call needs network access.
+    """
+
+    def __init__(self, snapshot_path='financial_data/sp500_constituents.json', refresh_interval=7 * 24 * 3600,
+                 fetch=fetch_sp500_from_wikipedia):
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self.fetch = fetch
+        self._snapshot = None
+
+    def snapshot(self, refresh=False):
+        if self._snapshot is None:
+            self._snapshot = self._read_snapshot()
+        if refresh or self._snapshot is None or self.is_stale():
+            try:
+                self.refresh()
+            except Exception as e:
+                if self._snapshot is None:
+                    raise RuntimeError(f"No constituent snapshot at {self.snapshot_path} and the refresh "
+                                       f"failed: {e}") from e
+                warnings.warn(f"Could not refresh constituents ({e}); using the snapshot from "
+                              f"{time.strftime('%Y-%m-%d', time.localtime(self._snapshot['fetched_at']))}.")
+        return self._snapshot
+
+    def is_stale(self):
+        if self._snapshot is None:
+            return True
+        if self.refresh_interval is None:
+            return False
+        return time.time() - self._snapshot['fetched_at'] > self.refresh_interval
+
+    def refresh(self):
+        constituents, changes = self.fetch()
+        self._snapshot = {'fetched_at': time.time(), 'constituents': sorted(set(constituents)),
+                          'changes': sorted(changes, key=lambda change: change['date'])}
+        self._write_snapshot(self._snapshot)
+        return self._snapshot
+
+    def constituents(self, as_of=None, refresh=False):
+        """Members of the index today, or on ``as_of`` by undoing every later change."""
+        snapshot = self.snapshot(refresh=refresh)
+        members = set(snapshot['constituents'])
+        if as_of is None:
+            return sorted(members)
+        as_of = pd.Timestamp(as_of).strftime('%Y-%m-%d')
+        for change in reversed(snapshot['changes']):
+            if change['date'] <= as_of:
+                break
+            if change['added']:
+                members.discard(change['added'])
+            if change['removed']:
+                members.add(change['removed'])
+        return sorted(members)
+
+    def membership_history(self, refresh=False):
+        changes = pd.DataFrame(self.snapshot(refresh=refresh)['changes'], columns=['date', 'added', 'removed'])
+        changes['date'] = pd.to_datetime(changes['date'])
+        return changes
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return None
+        with open(self.snapshot_path) as file:
+            return json.load(file)
+
+    def _write_snapshot(self, snapshot):
+        write_json(snapshot, self.snapshot_path)
@@ -0,0 +1,247 @@
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from utils.sequence_dataset import WindowedSequence, window_ends
+from utils.training import init_worker, training_jobs
+
+WALK_FORWARD_MODES = ('expanding', 'rolling')
+
+
+class Fold:
+    """Row ranges of one walk-forward fold: train on ``[train_start, train_stop)``, test on ``[test_start, test_stop)``."""
+
+    def __init__(self, index, train_start, train_stop, test_start, test_stop):
+        self.index = index
+        self.train_start = train_start
+        self.train_stop = train_stop
+        self.test_start = test_start
+        self.test_stop = test_stop
+
+    def __repr__(self):
+        return (f'Fold({self.index}, train=[{self.train_start}, {self.train_stop}), '
+                f'test=[{self.test_start}, {self.test_stop}))')
+
+
+def walk_forward_folds(length, n_folds=5, test_size=None, mode='expanding', train_size=None, gap=0,
+                       min_train_size=1):
+    """Consecutive test blocks covering the end of ``length`` rows, each trained on the rows before it.
+
+    ``test_size`` defaults to ``length // (n_folds + 1)``. In ``expanding`` mode every fold trains
+    on all rows before its test block (less ``gap`` rows); in ``rolling`` mode on the last
+    ``train_size`` of them, by default as many as the first fold gets.
+    """
+    if mode not in WALK_FORWARD_MODES:
+        raise ValueError(f"Unknown walk-forward mode '{mode}'; expected one of {WALK_FORWARD_MODES}.")
+    test_size = test_size or length // (n_folds + 1)
+    first_test_start = length - n_folds * test_size
+    train_size = train_size or first_test_start - gap
+    too_short = first_test_start - gap < min_train_size or (mode == 'rolling' and train_size < min_train_size)
+    if test_size < 1 or too_short:
+        raise ValueError(f'{length} rows are too few for {n_folds} folds of {test_size} test rows '
+                         f'with at least {min_train_size} training rows.')
+    folds = []
+    for index in range(n_folds):
+        test_start = first_test_start + index * test_size
+        train_stop = test_start - gap
+        train_start = 0 if mode == 'expanding' else max(0, train_stop - train_size)
+        folds.append(Fold(index, train_start, train_stop, test_start, test_start + test_size))
+    return folds
+
+
+class WalkForward:
+    """Walk-forward evaluation of an ``LSTMModel``: train on the past, test on the next block, move on.
+
+    Features are built once per symbol (through the model's feature cache) and every fold fits its
+    own scalers on its training rows only. With ``warm_start`` each fold continues from the
+    previous fold's weights and optimizer state, training ``fine_tune_epochs`` (default: the
+    model's ``epochs``) instead of starting over; folds then depend on each other and run in order.
+    """
+
+    def __init__(self, n_folds=5, mode='expanding', test_size=None, train_size=None, gap=0, warm_start=True,
+                 fine_tune_epochs=None):
+        if mode not in WALK_FORWARD_MODES:
+            raise ValueError(f"Unknown walk-forward mode '{mode}'; expected one of {WALK_FORWARD_MODES}.")
+        self.n_folds = n_folds
+        self.mode = mode
+        self.test_size = test_size
+        self.train_size = train_size
+        self.gap = gap
+        self.warm_start = warm_start
+        self.fine_tune_epochs = fine_tune_epochs
+
+    def folds(self, length, lookback=1):
+        return walk_forward_folds(length, self.n_folds, self.test_size, self.mode, self.train_size, self.gap,
+                                  min_train_size=lookback)
+
+    def evaluate(self, lstm_model, fold_indices=None):
+        """Metrics of every fold (or those in ``fold_indices``) as a list of dicts, one per fold."""
+        features, target, timestamps, _ = lstm_model.feature_matrix()
+        folds = self.folds(len(features), lstm_model.lookback)
+        if fold_indices is not None:
+            folds = [folds[index] for index in fold_indices]
+        return [self.run_fold(lstm_model, features, target, timestamps, fold) for fold in folds]
+
+    def run_fold(self, lstm_model, features, target, timestamps, fold):
+        lookback = lstm_model.lookback
+        started = time.perf_counter()
+
+        # Scalers see the fold's training rows only; only the rows its windows use are transformed
+        feature_scaler = MinMaxScaler().fit(features[fold.train_start:fold.train_stop])
+        target_scaler = MinMaxScaler().fit(target[fold.train_start:fold.train_stop].reshape(-1, 1))
+        first = max(0, min(fold.train_start, fold.test_start - lookback + 1))
+        scaled_features = feature_scaler.transform(features[first:fold.test_stop]).astype('float32')
+        scaled_target = target_scaler.transform(target[first:fold.test_stop].reshape(-1, 1)).astype('float32')
+
+        # Training windows stay inside the training rows; test windows may look back before them
+        train_ends = window_ends(len(scaled_features), lookback, start=fold.train_start - first + lookback - 1,
+                                 stop=fold.train_stop - first)
+        test_ends = window_ends(len(scaled_features), lookback, start=fold.test_start - first,
+                                stop=fold.test_stop - first)
+        train = WindowedSequence(scaled_features, scaled_target, lookback, lstm_model.batch_size, ends=train_ends,
+                                 shuffle=True)
+        test = WindowedSequence(scaled_features, scaled_target, lookback, lstm_model.batch_size, ends=test_ends)
+
+        warm = bool(self.warm_start and lstm_model.model.layers)
+        if not warm:
+            lstm_model.reset_model()
+            lstm_model.build_model(input_shape=(lookback, scaled_features.shape[1]))
+        epochs = self.fine_tune_epochs if warm and self.fine_tune_epochs else lstm_model.epochs
+        history = lstm_model.train_model(train, epochs=epochs, fold=fold.index)
+        fit_time = time.perf_counter() - started
+
+        predicted_scaled = np.asarray(lstm_model.model.predict(test, verbose=0)).reshape(-1)
+        predicted = target_scaler.inverse_transform(predicted_scaled.reshape(-1, 1)).ravel()
+        actual = target[test_ends + first]
+        previous = target[test_ends + first - 1]
+        bounds = [fold.train_start, fold.train_stop - 1, fold.test_start, fold.test_stop - 1]
+        if timestamps is not None:
+            bounds = list(pd.to_datetime(timestamps[bounds], utc=True))
+        return {'fold': fold.index, 'train_start': bounds[0], 'train_end': bounds[1], 'test_start': bounds[2],
+                'test_end': bounds[3], 'train_samples': train.sample_count, 'test_samples': test.sample_count,
+                'warm_start': warm, 'epochs': len(history['loss']), 'train_loss': history['loss'][-1],
+                'mse': float(np.mean((predicted_scaled - test.targets.ravel()) ** 2)),
+                'rmse': float(np.sqrt(np.mean((predicted - actual) ** 2))),
+                'mae': float(np.mean(np.abs(predicted - actual))),
+                # Share of test bars where the predicted move from the previous close has the right sign
+                'direction_accuracy': float(np.mean(np.sign(predicted - previous) == np.sign(actual - previous))),
+                'fit_time': fit_time, 'total_time': time.perf_counter() - started}
+
+
+def evaluate_symbol(interval, symbol, walk_forward, model_options=None, fold_indices=None):
+    """Walk-forward rows of one symbol; runs inside a pool worker and never raises."""
+    rows = []
+    try:
+        import tensorflow as tf
+        from LSTM_model import LSTMModel
+
+        lstm_model = LSTMModel(symbol=symbol, interval=interval, **(model_options or {}))
+        rows = walk_forward.evaluate(lstm_model, fold_indices)
+        for row in rows:
+            row['error'] = None
+        tf.keras.backend.clear_session()
+    except Exception as e:
+        rows.append({'fold': fold_indices[0] if fold_indices and len(fold_indices) == 1 else None,
+                     'error': f'{type(e).__name__}: {e}', 'traceback': traceback.format_exc()})
+    return [dict(row, interval=interval, symbol=symbol) for row in rows]
+
+
+def walk_forward_parallel(jobs, walk_forward, max_workers=None, threads_per_worker=None, model_options=None):
+    """Per-fold metrics table of every ``(interval, symbol)`` job, evaluated across worker processes.
+
+    With ``warm_start`` a symbol's folds run in order inside one worker and symbols run in
+    parallel; without it every fold is independent and each is its own task. A failing symbol or
+    fold gets a row with its error and the rest carry on.
+    """
+    jobs = list(jobs)
+    tasks = [(interval, symbol, None) for interval, symbol in jobs] if walk_forward.warm_start else \
+        [(interval, symbol, [index]) for interval, symbol in jobs for index in range(walk_forward.n_folds)]
+    cpu_count = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers or cpu_count, len(tasks) or 1))
+    threads_per_worker = threads_per_worker or max(1, cpu_count // max_workers)
+
+    rows = []
+    if max_workers == 1:
+        for interval, symbol, fold_indices in tasks:
+            rows.extend(evaluate_symbol(interval, symbol, walk_forward, model_options, fold_indices))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=init_worker, initargs=(threads_per_worker,)) as pool:
+            futures = {pool.submit(evaluate_symbol, interval, symbol, walk_forward, model_options, fold_indices):
+                       (interval, symbol, fold_indices) for interval, symbol, fold_indices in tasks}
+            for future in as_completed(futures):
+                interval, symbol, fold_indices = futures[future]
+                try:
+                    rows.extend(future.result())
+                except Exception as e:  # e.g. the worker process died
+                    rows.append({'interval': interval, 'symbol': symbol,
+                                 'fold': fold_indices[0] if fold_indices else None,
+                                 'error': f'{type(e).__name__}: {e}'})
+                print(f'[{len(rows)}] {symbol} {interval} folds {fold_indices or "all"} done')
+    return fold_table(rows)
+
+
+def fold_table(rows):
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    leading = [column for column in ('interval', 'symbol', 'fold') if column in table.columns]
+    table = table[leading + [column for column in table.columns if column not in leading]]
+    return table.sort_values(leading, na_position='last').reset_index(drop=True)
+
+
+def fold_summary(table, metrics=('mse', 'rmse', 'mae', 'direction_accuracy')):
+    """Mean and standard deviation of each metric across a symbol's successful folds."""
+    succeeded = table[table['error'].isna()] if 'error' in table.columns else table
+    metrics = [metric for metric in metrics if metric in succeeded.columns]
+    return succeeded.groupby(['interval', 'symbol'])[metrics].agg(['mean', 'std'])
+
+
+def main(interval, symbols, walk_forward, max_workers=None, threads_per_worker=None, model_options=None,
+         output=None):
+    from utils.data_loader import DataLoader
+
+    jobs = training_jobs(DataLoader(), interval, symbols)
+    table = walk_forward_parallel(jobs, walk_forward, max_workers, threads_per_worker, model_options)
+    if table.empty:
+        print('No data to evaluate.')
+        return table
+    print(table.drop(columns=['traceback'], errors='ignore').to_string(index=False))
+    if 'mse' in table.columns:
+        print(fold_summary(table).to_string())
+    if output:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        table.drop(columns=['traceback'], errors='ignore').to_csv(output, index=False)
+        print(f'Fold metrics saved to {output}')
+    return table
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Walk-forward cross-validation of the LSTM model.')
+    parser.add_argument('--interval', default='1d', help='Data interval (default: 1d). Use "all" for every interval.')
+    parser.add_argument('--symbols', nargs='+', default=['AAPL'], help='Symbols to evaluate, or "all".')
+    parser.add_argument('--folds', type=int, default=5, help='Number of test blocks (default: 5).')
+    parser.add_argument('--mode', choices=WALK_FORWARD_MODES, default='expanding', help='Training window mode.')
+    parser.add_argument('--test-size', type=int, default=None, help='Rows per test block (default: rows / (folds + 1)).')
+    parser.add_argument('--train-size', type=int, default=None, help='Training rows in rolling mode.')
+    parser.add_argument('--gap', type=int, default=0, help='Rows left out between training and test rows.')
+    parser.add_argument('--epochs', type=int, default=50, help='Epochs of the first (or every cold) fold.')
+    parser.add_argument('--fine-tune-epochs', type=int, default=None, help='Epochs of warm-started folds.')
+    parser.add_argument('--no-warm-start', action='store_true', help='Train every fold from scratch, folds in parallel.')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU).')
+    parser.add_argument('--threads-per-worker', type=int, default=None, help='Intra-op threads per process.')
+    parser.add_argument('--output', default=None, help='CSV file for the per-fold metrics.')
+    args = parser.parse_args()
+    main(args.interval, args.symbols,
+         WalkForward(args.folds, args.mode, args.test_size, args.train_size, args.gap, not args.no_warm_start,
+                     args.fine_tune_epochs),
+         max_workers=args.workers, threads_per_worker=args.threads_per_worker,
+         model_options={'epochs': args.epochs}, output=args.output)